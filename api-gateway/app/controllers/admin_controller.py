@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from app.services.upstream import get_upstream_pools
+from app.services.response_cache import get_response_cache
+from app.services.identity import VerifiedIdentity, get_token_verifier
+from app.services.rate_limiter import get_rate_limiter
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+ADMIN_ROLE = "admin"
+
+def require_admin(authorization: Optional[str] = Header(None)) -> VerifiedIdentity:
+    """The gateway's own endpoints expose topology and reset breakers: a verified admin token only"""
+    identity = None
+    if authorization and authorization.lower().startswith("bearer "):
+        identity = get_token_verifier().verify(authorization[7:].strip())
+    if identity is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if identity.role != ADMIN_ROLE:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin role required")
+    return identity
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+@router.get("/metrics")
+async def get_metrics():
+    """Gateway runtime metrics (upstream pool usage, response cache, verified token cache, rate limiting)"""
+    return {
+        "upstreams": get_upstream_pools().get_stats(),
+        "cache": get_response_cache().get_stats(),
+        "identity": get_token_verifier().get_stats(),
+        "rate_limit": get_rate_limiter().get_stats()
+    }
+
+@router.get("/upstreams")
+async def get_upstreams():
+    """Circuit breaker state and adaptive concurrency limit per upstream"""
+    pools = get_upstream_pools()
+    return {
+        name: {
+            "circuit_breaker": pool.breaker.get_stats(),
+            "concurrency": pool.limiter.get_stats()
+        }
+        for name, pool in pools.pools.items()
+    }
+
+@router.post("/upstreams/{name}/reset")
+async def reset_upstream(name: str, admin: VerifiedIdentity = Depends(require_admin)):
+    """Force an upstream circuit breaker back to closed"""
+    pools = get_upstream_pools()
+    if name not in pools.pools:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upstream not found")
+    pools.get(name).breaker.reset()
+    logger.info(f"Circuit breaker reset for upstream {name} by {admin.email}")
+    return {"detail": "Circuit breaker reset", "state": pools.get(name).breaker.state}
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException, Request, status
+from app.schemas.batch import BatchRequest, BatchResponse
+from app.services.batch import BatchDispatcher, BATCH_MAX_REQUESTS, BATCH_CONCURRENCY, OUTER_EXCLUDED_HEADERS
+from app.services.proxy import filter_headers
+from app.middleware.rate_limit import caller_identity
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["batch"])
+
+@router.post("/batch", response_model=BatchResponse)
+async def batch(request: Request, payload: BatchRequest):
+    """
+    Run several gateway requests in one round trip.
+    Sub-requests inherit the caller's headers (Authorization included) and are
+    dispatched concurrently; each result carries its own status.
+    Every sub-request is charged to its own route's rate limit.
+    """
+    if len(payload.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch is limited to {BATCH_MAX_REQUESTS} requests"
+        )
+    dispatcher = BatchDispatcher(
+        filter_headers(request.headers.items(), OUTER_EXCLUDED_HEADERS),
+        concurrency=BATCH_CONCURRENCY,
+        identity=caller_identity(request.headers.get("authorization"), request.client.host if request.client else None)
+    )
+    responses = await dispatcher.run(payload.requests)
+    return BatchResponse(responses=responses)
@@ -0,0 +1,265 @@
+"""
+Negotiated response compression for the API gateway (zstd, br, gzip).
+
+The encoding is picked from the client's Accept-Encoding (q-values respected,
+ties broken by GATEWAY_COMPRESSION_ENCODINGS order). Bodies below
+GATEWAY_COMPRESSION_MIN_SIZE, non-text content types and responses that
+already carry a Content-Encoding (e.g. compressed by the upstream and
+streamed through as raw bytes) are sent untouched.
+
+Streamed bodies are compressed chunk by chunk, nothing beyond the first
+MIN_SIZE bytes is buffered, and the compressor is flushed after every chunk
+so a client can decode each one as it arrives. Event streams and NDJSON skip
+the MIN_SIZE buffering altogether.
+"""
+
+import logging
+import os
+import zlib
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+COMPRESSION_ENABLED = os.getenv("GATEWAY_COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_SIZE = int(os.getenv("GATEWAY_COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_ENCODINGS = os.getenv("GATEWAY_COMPRESSION_ENCODINGS", "zstd,br,gzip")
+GZIP_LEVEL = int(os.getenv("GATEWAY_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("GATEWAY_BROTLI_QUALITY", "4"))
+ZSTD_LEVEL = int(os.getenv("GATEWAY_ZSTD_LEVEL", "3"))
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "text/",
+)
+
+# Each chunk is a message the client is waiting for; never hold them back
+STREAMING_TYPES = ("text/event-stream", "application/x-ndjson")
+
+
+class GzipCompressor:
+    def __init__(self, level: int = GZIP_LEVEL):
+        # wbits=31 → gzip container
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int = BROTLI_QUALITY):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level: int = ZSTD_LEVEL):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def available_compressors() -> Dict[str, type]:
+    compressors = {"gzip": GzipCompressor}
+    if brotli is not None:
+        compressors["br"] = BrotliCompressor
+    if zstandard is not None:
+        compressors["zstd"] = ZstdCompressor
+    return compressors
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Accept-Encoding → {coding: q}"""
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(header: Optional[str], preference: List[str]) -> Optional[str]:
+    """Best encoding both sides support, or None for identity"""
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in preference:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return any(content_type.startswith(prefix) for prefix in COMPRESSIBLE_TYPES)
+
+
+def is_streaming(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return any(content_type.startswith(prefix) for prefix in STREAMING_TYPES)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE,
+                 encodings: str = COMPRESSION_ENCODINGS, enabled: bool = COMPRESSION_ENABLED):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.enabled = enabled
+        compressors = available_compressors()
+        self.compressors = {}
+        for coding in (item.strip().lower() for item in encodings.split(",")):
+            if coding in compressors:
+                self.compressors[coding] = compressors[coding]
+            elif coding:
+                logger.warning(f"Compression '{coding}' is not available and will not be offered")
+        self.preference = list(self.compressors)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"), self.preference)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = CompressionResponder(send, encoding, self.compressors[encoding], self.minimum_size)
+        await self.app(scope, receive, responder)
+
+
+class CompressionResponder:
+    """Wraps `send` for a single response"""
+
+    def __init__(self, send: Send, encoding: str, compressor_class: type, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.compressor_class = compressor_class
+        self.minimum_size = minimum_size
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.compressor = None
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+
+    async def __call__(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_length = headers.get("content-length")
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] < 200
+                or message["status"] in (204, 304)
+                or not is_compressible(headers.get("content-type", ""))
+                or (content_length is not None and int(content_length) < self.minimum_size)
+            )
+            if self.passthrough:
+                await self.send(message)
+            elif is_streaming(headers.get("content-type", "")):
+                self.minimum_size = 0
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            self.buffer.append(body)
+            self.buffered += len(body)
+            if self.buffered < self.minimum_size:
+                if more_body:
+                    return
+                # Ended below the threshold: send as is
+                await self._flush_uncompressed()
+                return
+            body = b"".join(self.buffer)
+            self.buffer = []
+            self.compressor = self.compressor_class()
+            if not more_body:
+                # Whole body in hand: compress once and send it with a Content-Length
+                compressed = self.compressor.compress(body) + self.compressor.finish()
+                await self._send_start(len(compressed))
+                await self.send({"type": "http.response.body", "body": compressed, "more_body": False})
+                return
+            await self._send_start(None)
+
+        chunk = self.compressor.compress(body)
+        # A sync flush costs a few bytes per chunk but keeps a slow stream from stalling in the compressor
+        chunk += self.compressor.flush() if more_body else self.compressor.finish()
+        if chunk or not more_body:
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    async def _flush_uncompressed(self):
+        body = b"".join(self.buffer)
+        self.buffer = []
+        headers = MutableHeaders(scope=self.start_message)
+        headers["Content-Length"] = str(len(body))
+        await self.send(self.start_message)
+        await self.send({"type": "http.response.body", "body": body, "more_body": False})
+
+    async def _send_start(self, content_length: Optional[int]):
+        headers = MutableHeaders(scope=self.start_message)
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if content_length is not None:
+            headers["Content-Length"] = str(content_length)
+        elif "content-length" in headers:
+            del headers["Content-Length"]
+        # A strong validator describes the identity bytes, the compressed variant gets a weak one
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
+        await self.send(self.start_message)
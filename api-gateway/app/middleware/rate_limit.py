@@ -0,0 +1,64 @@
+"""
+Admission control for the API gateway: rejects requests over the caller's
+token-bucket budget with 429 before they reach an upstream, and adds
+RateLimit-* headers to the responses it lets through.
+"""
+
+import logging
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.identity import get_token_verifier
+from app.services.rate_limiter import get_rate_limiter
+from app.utils.fast_json import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+
+def caller_identity(authorization: Optional[str], client_host: Optional[str]) -> str:
+    """Verified user for bearer tokens, client address otherwise"""
+    if authorization and authorization.lower().startswith("bearer "):
+        identity = get_token_verifier().verify(authorization[7:].strip())
+        if identity is not None:
+            return f"user:{identity.user_id if identity.user_id is not None else identity.email}"
+    return f"ip:{client_host or 'unknown'}"
+
+
+def scope_identity(scope: Scope) -> str:
+    client = scope.get("client")
+    return caller_identity(Headers(scope=scope).get("authorization"), client[0] if client else None)
+
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        result = await get_rate_limiter().check(scope_identity(scope), scope["path"])
+        if result is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not result.allowed:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests"},
+                headers=dict(result.headers()),
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in result.headers():
+                    headers.append(name, value)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,22 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any
+
+class BatchSubRequest(BaseModel):
+    id: Optional[str] = None
+    method: str = "GET"
+    # Gateway path, e.g. "/api/tasks/list?status=new" ("/api" prefix is optional)
+    path: str
+    headers: Dict[str, str] = Field(default_factory=dict)
+    body: Optional[Any] = None
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest]
+
+class BatchSubResponse(BaseModel):
+    id: Optional[str] = None
+    status: int
+    headers: Dict[str, str] = Field(default_factory=dict)
+    body: Optional[Any] = None
+
+class BatchResponse(BaseModel):
+    responses: List[BatchSubResponse]
@@ -0,0 +1,151 @@
+"""
+Batch endpoint support for the API gateway.
+
+A batch is a list of sub-requests addressed by gateway path. They are resolved
+to their upstream, dispatched concurrently over the pooled upstream clients
+(at most GATEWAY_BATCH_CONCURRENCY at a time) and answered together, each with
+its own status. Cacheable GETs go through the response cache and successful
+writes invalidate it, exactly as the single-request proxy does.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.schemas.batch import BatchSubRequest, BatchSubResponse
+from app.services.identity import get_token_verifier
+from app.services.proxy import (
+    CACHE_FILL_EXCLUDED_HEADERS,
+    HOP_BY_HOP_HEADERS,
+    REQUEST_EXCLUDED_HEADERS,
+    cached_fetch,
+    filter_headers,
+    forward_request,
+)
+from app.services.rate_limiter import get_rate_limiter
+from app.services.response_cache import get_response_cache
+from app.services.upstream import UPSTREAM_URLS
+from app.utils import fast_json
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_REQUESTS = int(os.getenv("GATEWAY_BATCH_MAX_REQUESTS", "50"))
+BATCH_CONCURRENCY = int(os.getenv("GATEWAY_BATCH_CONCURRENCY", "8"))
+
+BATCH_METHODS = {"GET", "POST", "PUT", "DELETE", "PATCH"}
+
+# Headers of the outer batch request that describe the batch body, not a sub-request
+OUTER_EXCLUDED_HEADERS = REQUEST_EXCLUDED_HEADERS | {"content-length", "content-type", "content-encoding"}
+
+# Sub-response bodies are returned decoded inside the batch JSON
+RESPONSE_EXCLUDED_HEADERS = {"content-length", "content-encoding", "set-cookie", "date"}
+
+
+def resolve_path(path: str) -> Optional[Tuple[str, str, str, str]]:
+    """
+    Map a gateway path to (upstream, upstream_path, gateway_path, query_string).
+    Returns None for paths the gateway does not route.
+    """
+    parts = urlsplit(path)
+    gateway_path = parts.path if parts.path.startswith("/api/") else "/api" + parts.path
+    segments = gateway_path.split("/")  # ["", "api", "<upstream>", ...]
+    if len(segments) < 4 or segments[2] not in UPSTREAM_URLS or ".." in segments:
+        return None
+    upstream = segments[2]
+    return upstream, gateway_path[len("/api"):], gateway_path, parts.query
+
+
+def decode_body(content_type: str, content: bytes):
+    if not content:
+        return None
+    if "json" in content_type:
+        try:
+            return fast_json.loads(content)
+        except ValueError:
+            pass
+    return content.decode("utf-8", errors="replace")
+
+
+def _content_type(headers: list) -> str:
+    return next((value for name, value in headers if name.lower() == "content-type"), "")
+
+
+class BatchDispatcher:
+    """Runs the sub-requests of one batch with a bounded number in flight"""
+
+    def __init__(self, outer_headers: list, concurrency: int = BATCH_CONCURRENCY, identity: Optional[str] = None):
+        self.outer_headers = outer_headers
+        self.identity = identity
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(self, requests: list) -> list:
+        return list(await asyncio.gather(*(self._run_one(sub) for sub in requests)))
+
+    async def _run_one(self, sub: BatchSubRequest) -> BatchSubResponse:
+        method = sub.method.upper()
+        if method not in BATCH_METHODS:
+            return BatchSubResponse(id=sub.id, status=405, body={"detail": "Method not allowed"})
+        resolved = resolve_path(sub.path)
+        if resolved is None:
+            return BatchSubResponse(id=sub.id, status=404, body={"detail": "Not found"})
+        upstream, path, gateway_path, query_string = resolved
+
+        if self.identity is not None:
+            limit = await get_rate_limiter().check(self.identity, gateway_path)
+            if limit is not None and not limit.allowed:
+                return BatchSubResponse(
+                    id=sub.id, status=429, headers=dict(limit.headers()), body={"detail": "Too many requests"}
+                )
+
+        async with self.semaphore:
+            return await self._dispatch(sub, method, upstream, path, gateway_path, query_string)
+
+    def _headers(self, sub: BatchSubRequest, excluded: set) -> Tuple[list, Optional[str]]:
+        merged = {name.lower(): (name, value) for name, value in self.outer_headers}
+        for name, value in sub.headers.items():
+            merged[name.lower()] = (name, value)
+        headers = filter_headers(merged.values(), excluded)
+        authorization = merged.get("authorization", (None, None))[1]
+        return headers + get_token_verifier().identity_headers(authorization), authorization
+
+    async def _dispatch(self, sub: BatchSubRequest, method: str, upstream: str, path: str,
+                        gateway_path: str, query_string: str) -> BatchSubResponse:
+        cache = get_response_cache()
+        ttl = cache.ttl_for(gateway_path) if method == "GET" else None
+
+        if ttl is not None:
+            headers, authorization = self._headers(sub, CACHE_FILL_EXCLUDED_HEADERS)
+            entry, cache_status = await cached_fetch(
+                upstream, path, gateway_path, query_string, headers, authorization, ttl
+            )
+            response_headers = dict(filter_headers(entry.headers, RESPONSE_EXCLUDED_HEADERS))
+            response_headers.update({"ETag": entry.etag, "X-Cache": cache_status})
+            return BatchSubResponse(
+                id=sub.id,
+                status=entry.status_code,
+                headers=response_headers,
+                body=decode_body(_content_type(entry.headers), entry.body),
+            )
+
+        headers, _ = self._headers(sub, REQUEST_EXCLUDED_HEADERS)
+        body = None
+        if sub.body is not None and method != "GET":
+            body = fast_json.dumps(sub.body)
+            headers = [(k, v) for k, v in headers if k.lower() != "content-type"]
+            headers.append(("Content-Type", "application/json"))
+
+        status_code, response_headers, content = await forward_request(
+            upstream, path, method, headers, body, query_string
+        )
+        if method != "GET" and status_code < 400:
+            cache.invalidate_prefix(f"/api/{upstream}/")
+
+        items = response_headers.multi_items() if hasattr(response_headers, "multi_items") else list(response_headers.items())
+        return BatchSubResponse(
+            id=sub.id,
+            status=status_code,
+            headers=dict(filter_headers(items, HOP_BY_HOP_HEADERS | RESPONSE_EXCLUDED_HEADERS)),
+            body=decode_body(_content_type(items), content),
+        )
@@ -0,0 +1,135 @@
+"""
+Circuit breaker for gateway upstreams.
+
+closed    - calls pass, outcomes are recorded in a sliding window
+open      - calls are rejected immediately until the open period elapses
+half_open - a few probe calls are let through; all succeed → closed, any fails → open
+
+The breaker trips on error rate (exceptions and 5xx) or on slow-call rate,
+so a backend that hangs is cut off before it drains gateway sockets.
+"""
+
+import logging
+import time
+from collections import deque
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling an upstream that should not be called right now"""
+
+    def __init__(self, upstream: str, reason: str, retry_after: float = 1.0):
+        super().__init__(f"Upstream '{upstream}' unavailable: {reason}")
+        self.upstream = upstream
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_rate_threshold: float = 0.5, slow_call_rate_threshold: float = 0.8,
+                 slow_call_seconds: float = 5.0, window_size: int = 50, min_calls: int = 20,
+                 open_seconds: float = 10.0, half_open_max_calls: int = 3,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
+
+        self.state = CLOSED
+        self.window: deque = deque(maxlen=window_size)  # (failed, slow) per call
+        self.opened_at: Optional[float] = None
+        self.half_open_in_flight = 0
+        self.half_open_successes = 0
+        self.rejected_total = 0
+        self.opened_total = 0
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not go out"""
+        if self.state == OPEN:
+            elapsed = self.clock() - self.opened_at
+            if elapsed < self.open_seconds:
+                self.rejected_total += 1
+                raise CircuitOpenError(self.name, "circuit open", retry_after=self.open_seconds - elapsed)
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self.half_open_in_flight >= self.half_open_max_calls:
+                self.rejected_total += 1
+                raise CircuitOpenError(self.name, "circuit half-open, probe limit reached")
+            self.half_open_in_flight += 1
+
+    def record(self, failed: bool, latency: float):
+        slow = latency >= self.slow_call_seconds
+
+        if self.state == HALF_OPEN:
+            self.half_open_in_flight = max(0, self.half_open_in_flight - 1)
+            if failed or slow:
+                self._open()
+                return
+            self.half_open_successes += 1
+            if self.half_open_successes >= self.half_open_max_calls:
+                self._transition(CLOSED)
+            return
+
+        self.window.append((failed, slow))
+        if self.state == CLOSED and len(self.window) >= self.min_calls:
+            failure_rate, slow_rate = self._rates()
+            if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+                self._open()
+
+    def abandon(self):
+        """Forget a call that never produced an outcome (e.g. the client went away)"""
+        if self.state == HALF_OPEN:
+            self.half_open_in_flight = max(0, self.half_open_in_flight - 1)
+
+    def reset(self):
+        self._transition(CLOSED)
+
+    def _rates(self):
+        calls = len(self.window)
+        if not calls:
+            return 0.0, 0.0
+        failures = sum(1 for failed, _ in self.window if failed)
+        slow = sum(1 for _, is_slow in self.window if is_slow)
+        return failures / calls, slow / calls
+
+    def _open(self):
+        self.opened_total += 1
+        self._transition(OPEN)
+        self.opened_at = self.clock()
+
+    def _transition(self, state: str):
+        if state != self.state:
+            logger.warning(f"Circuit breaker '{self.name}': {self.state} → {state}")
+        self.state = state
+        self.half_open_in_flight = 0
+        self.half_open_successes = 0
+        if state != OPEN:
+            self.opened_at = None
+        if state == CLOSED:
+            self.window.clear()
+
+    def get_stats(self) -> dict:
+        failure_rate, slow_rate = self._rates()
+        return {
+            "state": self.state,
+            "failure_rate": round(failure_rate, 4),
+            "slow_call_rate": round(slow_rate, 4),
+            "window_calls": len(self.window),
+            "opened_total": self.opened_total,
+            "rejected_total": self.rejected_total,
+        }
@@ -0,0 +1,61 @@
+"""
+Adaptive (AIMD) concurrency limit for gateway upstreams.
+
+The limit grows by one after a healthy call made while the limit was actually
+being used, and shrinks multiplicatively after an error or a call slower than
+the latency target. Calls over the limit are rejected at once instead of
+queueing, so a degraded backend sheds load at the edge.
+"""
+
+import logging
+
+from app.services.circuit_breaker import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyLimitExceeded(UpstreamUnavailable):
+    pass
+
+
+class AIMDLimiter:
+    def __init__(self, name: str, initial_limit: int = 20, min_limit: int = 1, max_limit: int = 100,
+                 backoff_ratio: float = 0.9, latency_target_seconds: float = 2.0):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_target_seconds = latency_target_seconds
+        self._limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.in_flight = 0
+        self.rejected_total = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self):
+        """Take a slot or raise ConcurrencyLimitExceeded"""
+        if self.in_flight >= self.limit:
+            self.rejected_total += 1
+            raise ConcurrencyLimitExceeded(self.name, f"concurrency limit {self.limit} reached")
+        self.in_flight += 1
+
+    def on_result(self, failed: bool, latency: float):
+        """Adjust the limit from one observed call (called while its slot is still held)"""
+        if failed or latency > self.latency_target_seconds:
+            self._limit = max(float(self.min_limit), self._limit * self.backoff_ratio)
+        elif self.in_flight * 2 >= self.limit:
+            self._limit = min(float(self.max_limit), self._limit + 1)
+
+    def release(self):
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def get_stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "rejected_total": self.rejected_total,
+        }
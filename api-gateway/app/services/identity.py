@@ -0,0 +1,131 @@
+"""
+Edge JWT verification for the API gateway.
+
+Bearer tokens are verified once here and the result is kept in a small LRU
+cache keyed by the token hash (never the raw token) and bounded by the token
+`exp`. The verified identity is forwarded to the backends as X-User-* headers,
+signed with an HMAC over the shared IDENTITY_SIGNING_KEY so a backend can
+trust them without decoding the token or looking the user up again. The key is
+separate from the JWT SECRET_KEY so a leak of one does not forge the other.
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+import jwt
+
+logger = logging.getLogger(__name__)
+
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
+IDENTITY_SIGNING_KEY = os.getenv("IDENTITY_SIGNING_KEY", "your-identity-signing-key-change-in-production")
+ALGORITHM = "HS256"
+IDENTITY_CACHE_MAX_ENTRIES = int(os.getenv("GATEWAY_IDENTITY_CACHE_MAX_ENTRIES", "10000"))
+
+# Clients must never be able to set these themselves
+IDENTITY_HEADERS = {"x-user-id", "x-user-email", "x-user-role", "x-user-exp", "x-identity-signature"}
+
+
+@dataclass
+class VerifiedIdentity:
+    email: str
+    role: Optional[str]
+    user_id: Optional[int]
+    exp: int
+
+
+def sign_identity(user_id: Optional[int], email: str, role: Optional[str], exp: int,
+                  secret: str = IDENTITY_SIGNING_KEY) -> str:
+    """HMAC over the identity fields; backends recompute it with the same IDENTITY_SIGNING_KEY"""
+    message = f"{user_id or ''}|{email}|{role or ''}|{exp}"
+    return hmac.new(secret.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+
+class TokenVerifier:
+    """Verifies HS256 bearer tokens and caches the verified identities"""
+
+    def __init__(self, secret: str = SECRET_KEY, signing_key: str = IDENTITY_SIGNING_KEY,
+                 max_entries: int = IDENTITY_CACHE_MAX_ENTRIES, clock: Callable[[], float] = time.time):
+        self.secret = secret
+        self.signing_key = signing_key
+        self.max_entries = max_entries
+        self.clock = clock
+        self.entries: "OrderedDict[str, VerifiedIdentity]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalid = 0
+
+    def verify(self, token: str) -> Optional[VerifiedIdentity]:
+        key = hashlib.sha256(token.encode()).hexdigest()
+        identity = self.entries.get(key)
+        if identity is not None:
+            if identity.exp > self.clock():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return identity
+            del self.entries[key]
+
+        self.misses += 1
+        try:
+            payload = jwt.decode(token, self.secret, algorithms=[ALGORITHM])
+        except jwt.InvalidTokenError:
+            self.invalid += 1
+            return None
+
+        email = payload.get("sub")
+        exp = payload.get("exp")
+        if email is None or exp is None:
+            self.invalid += 1
+            return None
+
+        user_id = payload.get("user_id")
+        identity = VerifiedIdentity(
+            email=email,
+            role=payload.get("role"),
+            user_id=int(user_id) if user_id is not None else None,
+            exp=int(exp),
+        )
+        self.entries[key] = identity
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return identity
+
+    def identity_headers(self, authorization: Optional[str]) -> List[Tuple[str, str]]:
+        """Signed X-User-* headers for a valid bearer token, otherwise none"""
+        if not authorization or not authorization.lower().startswith("bearer "):
+            return []
+        identity = self.verify(authorization[7:].strip())
+        if identity is None:
+            return []
+        return [
+            ("X-User-Id", str(identity.user_id) if identity.user_id is not None else ""),
+            ("X-User-Email", identity.email),
+            ("X-User-Role", identity.role or ""),
+            ("X-User-Exp", str(identity.exp)),
+            ("X-Identity-Signature", sign_identity(identity.user_id, identity.email, identity.role, identity.exp, self.signing_key)),
+        ]
+
+    def get_stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalid": self.invalid,
+        }
+
+
+# Singleton instance for easy access
+_verifier_instance: Optional[TokenVerifier] = None
+
+def get_token_verifier() -> TokenVerifier:
+    """Get or create the token verifier instance"""
+    global _verifier_instance
+    if _verifier_instance is None:
+        _verifier_instance = TokenVerifier()
+    return _verifier_instance
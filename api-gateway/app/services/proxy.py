@@ -0,0 +1,241 @@
+"""
+Reverse-proxy helpers for the API gateway.
+
+Two modes are supported (GATEWAY_PROXY_MODE):
+- stream: request and response bodies are streamed through without buffering,
+  the upstream status code and end-to-end headers are kept as is
+- wrap: legacy mode, the upstream response is buffered and returned inside
+  a JSON envelope with status_code/content/headers
+"""
+
+import logging
+import os
+from typing import AsyncIterator, Optional, Iterable, Tuple
+
+import anyio
+import httpx
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.services.upstream import UpstreamPool, get_upstream_pools
+from app.services.circuit_breaker import UpstreamUnavailable
+from app.services.identity import IDENTITY_HEADERS, get_token_verifier
+from app.services.response_cache import get_response_cache, etag_matches
+from app.utils.fast_json import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+PROXY_MODE = os.getenv("GATEWAY_PROXY_MODE", "stream").lower()
+
+# RFC 7230 section 6.1 - meaningful only for a single transport-level connection
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
+}
+
+# Set by the HTTP client for the upstream connection, or by the gateway itself
+REQUEST_EXCLUDED_HEADERS = HOP_BY_HOP_HEADERS | IDENTITY_HEADERS | {"host"}
+
+# Cache fills must be unconditional and identity-encoded, whatever the first caller sent
+CACHE_FILL_EXCLUDED_HEADERS = REQUEST_EXCLUDED_HEADERS | {"if-none-match", "if-modified-since", "accept-encoding", "cache-control"}
+
+
+def filter_headers(headers: Iterable[Tuple[str, str]], excluded: set = HOP_BY_HOP_HEADERS) -> list:
+    """Drop hop-by-hop headers, including any listed in the Connection header"""
+    headers = list(headers)
+    excluded = set(excluded)
+    for name, value in headers:
+        if name.lower() == "connection":
+            excluded.update(token.strip().lower() for token in value.split(",") if token.strip())
+    return [(name, value) for name, value in headers if name.lower() not in excluded]
+
+
+def upstream_headers(request: Request, excluded: set = REQUEST_EXCLUDED_HEADERS) -> list:
+    """Client headers to send upstream, plus the signed identity of a verified bearer token"""
+    identity = get_token_verifier().identity_headers(request.headers.get("authorization"))
+    return filter_headers(request.headers.items(), excluded) + identity
+
+
+def encode_headers(headers: Iterable[Tuple[str, str]]) -> list:
+    return [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+
+def retry_after_header(error: UpstreamUnavailable) -> dict:
+    return {"Retry-After": str(max(1, int(error.retry_after + 0.999)))}
+
+
+def build_url(path: str, query_string: str = "") -> str:
+    return f"{path}?{query_string}" if query_string else path
+
+
+def _has_body(request: Request) -> bool:
+    return "content-length" in request.headers or "transfer-encoding" in request.headers
+
+
+async def forward_request(upstream: str, path: str, method: str, headers: list,
+                          body: Optional[bytes] = None, query_string: str = ""):
+    """
+    Buffered forward. Returns (status_code, headers, content).
+    headers are sent as given, build them with upstream_headers().
+    """
+    pool = get_upstream_pools().get(upstream)
+    url = build_url(path, query_string)
+    try:
+        response = await pool.send(
+            method,
+            url,
+            headers=headers,
+            content=body,
+        )
+        return response.status_code, response.headers, response.content
+    except UpstreamUnavailable as e:
+        logger.warning(f"Request to {pool.base_url}{url} rejected: {e.reason}")
+        return 503, retry_after_header(e), b"Service unavailable"
+    except Exception as e:
+        logger.error(f"Error forwarding request to {pool.base_url}{url}: {str(e)}")
+        return 503, {}, b"Service unavailable"
+
+
+async def _release_when_done(pool: UpstreamPool, response: httpx.Response) -> AsyncIterator[bytes]:
+    """
+    The upstream body, raw (still encoded) so an upstream Content-Encoding passes
+    through untouched. However the stream ends (finished, client disconnected,
+    send failed) the response is closed and its pool and limiter slots released.
+    """
+    try:
+        async for chunk in response.aiter_raw():
+            yield chunk
+    finally:
+        # A disconnect arrives as cancellation, which would also cancel the close
+        with anyio.CancelScope(shield=True):
+            await pool.release(response)
+
+
+class UpstreamStreamingResponse(StreamingResponse):
+    """Also releases the upstream response when the body was never iterated (e.g. sending the headers failed)"""
+
+    def __init__(self, pool: UpstreamPool, response: httpx.Response):
+        super().__init__(_release_when_done(pool, response), status_code=response.status_code)
+        self.pool = pool
+        self.upstream_response = response
+        self.raw_headers = encode_headers(filter_headers(response.headers.multi_items()))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.pool.release(self.upstream_response)
+
+
+async def stream_request(request: Request, upstream: str, path: str):
+    """Streaming passthrough: neither body is held in gateway memory"""
+    pool = get_upstream_pools().get(upstream)
+    url = build_url(path, request.url.query)
+    try:
+        response = await pool.send(
+            request.method,
+            url,
+            headers=upstream_headers(request),
+            content=request.stream() if _has_body(request) else None,
+            stream=True,
+        )
+    except UpstreamUnavailable as e:
+        logger.warning(f"Request to {pool.base_url}{url} rejected: {e.reason}")
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Service unavailable", "reason": e.reason},
+            headers=retry_after_header(e)
+        )
+    except Exception as e:
+        logger.error(f"Error forwarding request to {pool.base_url}{url}: {str(e)}")
+        return JSONResponse(status_code=503, content={"detail": "Service unavailable"})
+
+    return UpstreamStreamingResponse(pool, response)
+
+
+async def cached_fetch(upstream: str, path: str, gateway_path: str, query_string: str,
+                       headers: list, authorization: Optional[str], ttl: float, refresh: bool = False):
+    """
+    GET through the response cache. Returns (entry, cache_status).
+    headers are used only on a miss, build them with CACHE_FILL_EXCLUDED_HEADERS.
+    """
+    cache = get_response_cache()
+    key = cache.make_key(gateway_path, query_string, authorization)
+
+    async def fetch():
+        status_code, response_headers, content = await forward_request(
+            upstream, path, "GET", headers, None, query_string
+        )
+        items = response_headers.multi_items() if hasattr(response_headers, "multi_items") else response_headers.items()
+        return status_code, filter_headers(items), content
+
+    return await cache.get_or_fetch(key, gateway_path, ttl, fetch, refresh=refresh)
+
+
+async def cached_request(request: Request, upstream: str, path: str, ttl: float):
+    """GET through the response cache, answering If-None-Match with 304"""
+    cache = get_response_cache()
+    entry, cache_status = await cached_fetch(
+        upstream,
+        path,
+        request.url.path,
+        request.url.query,
+        upstream_headers(request, CACHE_FILL_EXCLUDED_HEADERS),
+        request.headers.get("authorization"),
+        ttl,
+        refresh="no-cache" in request.headers.get("cache-control", "").lower(),
+    )
+
+    extra_headers = [("ETag", entry.etag), ("X-Cache", cache_status)]
+    if entry.status_code == 200 and etag_matches(request.headers.get("if-none-match"), entry.etag):
+        cache.stats.not_modified += 1
+        return Response(status_code=304, headers=dict(extra_headers))
+
+    response = Response(content=entry.body, status_code=entry.status_code)
+    response.raw_headers.extend(encode_headers(entry.headers + extra_headers))
+    return response
+
+
+async def wrap_request(request: Request, upstream: str, path: str):
+    """Legacy buffer-and-wrap mode"""
+    body = await request.body() if request.method != "GET" else None
+    status_code, headers, content = await forward_request(
+        upstream,
+        path,
+        request.method,
+        upstream_headers(request),
+        body,
+        request.url.query
+    )
+    return {
+        "status_code": status_code,
+        "content": content,
+        "headers": dict(headers)
+    }
+
+
+async def proxy_request(request: Request, upstream: str, path: str):
+    if PROXY_MODE == "wrap":
+        return await wrap_request(request, upstream, path)
+
+    cache = get_response_cache()
+    if request.method == "GET":
+        ttl = cache.ttl_for(request.url.path)
+        if ttl is not None:
+            return await cached_request(request, upstream, path, ttl)
+        return await stream_request(request, upstream, path)
+
+    response = await stream_request(request, upstream, path)
+    if response.status_code < 400:
+        # A successful write may change anything this upstream serves
+        cache.invalidate_prefix(f"/api/{upstream}/")
+    return response
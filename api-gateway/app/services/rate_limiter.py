@@ -0,0 +1,274 @@
+"""
+Token-bucket rate limiting for the API gateway.
+
+Every caller (verified user id, or client IP for anonymous requests) gets one
+bucket per matching rule. A bucket holds up to `burst` tokens and refills at
+`rate` tokens per `period` seconds; each request takes one token.
+
+Backends (GATEWAY_RATE_LIMIT_BACKEND):
+- memory: buckets live in this process (single replica, tests)
+- redis: buckets live in Redis and are updated by one Lua script, so all
+  gateway replicas share one global budget. The script reads Redis TIME,
+  replica clocks do not matter. If Redis is unreachable the gateway falls
+  back to in-process buckets instead of rejecting traffic.
+"""
+
+import logging
+import math
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("GATEWAY_RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_BACKEND = os.getenv("GATEWAY_RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_REDIS_URL = os.getenv("GATEWAY_RATE_LIMIT_REDIS_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("GATEWAY_RATE_LIMIT_MAX_KEYS", "100000"))
+# Comma-separated "<path prefix>=<requests>/<period seconds>[:<burst>]", first match wins,
+# "*" matches one path segment
+RATE_LIMIT_RULES = os.getenv(
+    "GATEWAY_RATE_LIMIT_RULES",
+    "/api/auth/login=10/60:10,/api/batch=5/1:10,/api/tasks=20/1:40,/api=50/1:100"
+)
+
+REDIS_KEY_PREFIX = "gateway:ratelimit:"
+
+# KEYS[1] bucket key; ARGV: refill rate (tokens/s), burst, cost
+# Returns {allowed, tokens left (x1000), ms until the next token, ms until full}
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+  tokens = burst
+  ts = now
+end
+
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate / 1000)
+local allowed = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+end
+
+local to_full = math.ceil((burst - tokens) * 1000 / rate)
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.max(1000, to_full))
+
+local retry = 0
+if allowed == 0 then
+  retry = math.ceil((cost - tokens) * 1000 / rate)
+end
+return {allowed, math.floor(tokens * 1000), retry, to_full}
+"""
+
+
+@dataclass
+class RateLimitRule:
+    pattern: str
+    regex: re.Pattern
+    requests: int
+    period: float
+    burst: int
+
+    @property
+    def rate(self) -> float:
+        """Refill rate in tokens per second"""
+        return self.requests / self.period
+
+    @property
+    def policy(self) -> str:
+        return f"{self.requests};w={int(self.period)};burst={self.burst}"
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_seconds: float
+    retry_after: float
+    rule: RateLimitRule
+
+    def headers(self) -> List[tuple]:
+        """RateLimit-* headers (IETF draft) plus Retry-After on rejection"""
+        headers = [
+            ("RateLimit-Limit", str(self.limit)),
+            ("RateLimit-Remaining", str(self.remaining)),
+            ("RateLimit-Reset", str(math.ceil(self.reset_seconds))),
+            ("RateLimit-Policy", self.rule.policy),
+        ]
+        if not self.allowed:
+            headers.append(("Retry-After", str(max(1, math.ceil(self.retry_after)))))
+        return headers
+
+
+def parse_rules(spec: str) -> List[RateLimitRule]:
+    rules = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        pattern, _, limit = item.rpartition("=")
+        rate, _, burst = limit.partition(":")
+        requests, _, period = rate.partition("/")
+        prefix = "/".join("[^/]+" if part == "*" else re.escape(part) for part in pattern.rstrip("/").split("/"))
+        rules.append(RateLimitRule(
+            pattern=pattern,
+            regex=re.compile("^" + prefix + "(/|$)"),
+            requests=int(requests),
+            period=float(period or 1),
+            burst=int(burst or requests),
+        ))
+    return rules
+
+
+class InMemoryBuckets:
+    """Token buckets kept in this process, bounded LRU by key count"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self.buckets: "OrderedDict[str, list]" = OrderedDict()  # key → [tokens, updated_at]
+
+    async def take(self, key: str, rule: RateLimitRule, cost: int = 1):
+        now = self.clock()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = [float(rule.burst), now]
+            self.buckets[key] = bucket
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+
+        tokens = min(float(rule.burst), bucket[0] + max(0.0, now - bucket[1]) * rule.rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        bucket[0], bucket[1] = tokens, now
+
+        retry_after = 0.0 if allowed else (cost - tokens) / rule.rate
+        return allowed, tokens, retry_after, (rule.burst - tokens) / rule.rate
+
+    async def close(self):
+        pass
+
+
+class RedisBuckets:
+    """Token buckets shared by all gateway replicas, updated atomically by a Lua script"""
+
+    def __init__(self, redis_url: str = RATE_LIMIT_REDIS_URL, fallback: Optional[InMemoryBuckets] = None):
+        import redis.asyncio as redis
+
+        self.redis_url = redis_url
+        self.client = redis.from_url(redis_url, socket_connect_timeout=1, socket_timeout=1)
+        self.script = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+        self.fallback = fallback or InMemoryBuckets()
+        self.errors_total = 0
+
+    async def take(self, key: str, rule: RateLimitRule, cost: int = 1):
+        try:
+            allowed, tokens_milli, retry_ms, to_full_ms = await self.script(
+                keys=[REDIS_KEY_PREFIX + key],
+                args=[rule.rate, rule.burst, cost],
+            )
+        except Exception as e:
+            # Fail open to per-replica buckets: Redis trouble must not take the API down
+            self.errors_total += 1
+            if self.errors_total == 1 or self.errors_total % 1000 == 0:
+                logger.warning(f"✗ Redis rate limiting unavailable, using in-process buckets: {e}")
+            return await self.fallback.take(key, rule, cost)
+        return bool(allowed), tokens_milli / 1000, retry_ms / 1000, to_full_ms / 1000
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class RateLimiter:
+    def __init__(self, rules: List[RateLimitRule], buckets, enabled: bool = RATE_LIMIT_ENABLED):
+        self.rules = rules
+        self.buckets = buckets
+        self.enabled = enabled
+        self.allowed_total = 0
+        self.rejected_total = 0
+
+    def rule_for(self, path: str) -> Optional[RateLimitRule]:
+        for rule in self.rules:
+            if rule.regex.match(path):
+                return rule
+        return None
+
+    async def check(self, identity: str, path: str, cost: int = 1) -> Optional[RateLimitResult]:
+        """Take tokens for identity on path; None when no rule applies"""
+        if not self.enabled:
+            return None
+        rule = self.rule_for(path)
+        if rule is None:
+            return None
+
+        allowed, tokens, retry_after, reset_seconds = await self.buckets.take(f"{identity}:{rule.pattern}", rule, cost)
+        if allowed:
+            self.allowed_total += 1
+        else:
+            self.rejected_total += 1
+        return RateLimitResult(
+            allowed=allowed,
+            limit=rule.burst,
+            remaining=max(0, int(tokens)),
+            reset_seconds=reset_seconds,
+            retry_after=retry_after,
+            rule=rule,
+        )
+
+    async def close(self):
+        await self.buckets.close()
+
+    def get_stats(self) -> dict:
+        stats = {
+            "enabled": self.enabled,
+            "backend": "redis" if isinstance(self.buckets, RedisBuckets) else "memory",
+            "rules": {rule.pattern: rule.policy for rule in self.rules},
+            "allowed_total": self.allowed_total,
+            "rejected_total": self.rejected_total,
+        }
+        if isinstance(self.buckets, RedisBuckets):
+            stats["redis_errors_total"] = self.buckets.errors_total
+        return stats
+
+
+def create_buckets(backend: str = RATE_LIMIT_BACKEND):
+    if backend == "redis":
+        try:
+            buckets = RedisBuckets()
+            logger.info(f"✓ Rate limiting uses Redis buckets: {buckets.redis_url}")
+            return buckets
+        except ImportError:
+            logger.warning("redis package not installed, rate limiting falls back to in-process buckets")
+    return InMemoryBuckets()
+
+
+# Singleton instance for easy access
+_limiter_instance: Optional[RateLimiter] = None
+
+def get_rate_limiter() -> RateLimiter:
+    """Get or create the rate limiter instance"""
+    global _limiter_instance
+    if _limiter_instance is None:
+        _limiter_instance = RateLimiter(parse_rules(RATE_LIMIT_RULES), create_buckets())
+    return _limiter_instance
+
+def set_rate_limiter(limiter: Optional[RateLimiter]):
+    """Replace the rate limiter instance (used by tests)"""
+    global _limiter_instance
+    _limiter_instance = limiter
@@ -0,0 +1,233 @@
+"""
+In-gateway response cache for idempotent GET routes.
+Entries are keyed by path, query and caller identity, expire after a per-route
+TTL and are evicted least-recently-used once the memory bound is reached.
+Concurrent misses for the same key share a single upstream call.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.getenv("GATEWAY_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_MAX_BYTES = int(os.getenv("GATEWAY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_MAX_ENTRIES = int(os.getenv("GATEWAY_CACHE_MAX_ENTRIES", "10000"))
+# Comma-separated "<path pattern>=<ttl seconds>", "*" matches one path segment
+CACHE_ROUTES = os.getenv(
+    "GATEWAY_CACHE_ROUTES",
+    "/api/tasks/list=5,/api/auth/users=30,/api/notifications/user/*/unread-count=5"
+)
+
+# Upstream headers that must not be replayed from the cache (bodies are stored decoded)
+NON_CACHEABLE_HEADERS = {"set-cookie", "date", "content-length", "content-encoding"}
+
+ENTRY_OVERHEAD_BYTES = 256
+
+
+def parse_routes(spec: str) -> List[Tuple[re.Pattern, float]]:
+    routes = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        pattern, _, ttl = item.rpartition("=")
+        regex = "^" + "/".join("[^/]+" if part == "*" else re.escape(part) for part in pattern.split("/")) + "/?$"
+        routes.append((re.compile(regex), float(ttl)))
+    return routes
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+@dataclass
+class CacheEntry:
+    path: str
+    status_code: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+    etag: str
+    expires_at: float
+    created_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers) + ENTRY_OVERHEAD_BYTES
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    not_modified: int = 0
+
+
+class ResponseCache:
+    """LRU response cache bounded by entry count and total bytes"""
+
+    def __init__(self, routes: List[Tuple[re.Pattern, float]], max_bytes: int = CACHE_MAX_BYTES,
+                 max_entries: int = CACHE_MAX_ENTRIES, enabled: bool = CACHE_ENABLED):
+        self.routes = routes
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.size_bytes = 0
+        self.stats = CacheStats()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def ttl_for(self, path: str) -> Optional[float]:
+        """TTL for a gateway path, or None if the route is not cacheable"""
+        if not self.enabled:
+            return None
+        for regex, ttl in self.routes:
+            if regex.match(path):
+                return ttl
+        return None
+
+    @staticmethod
+    def make_key(path: str, query: str, authorization: Optional[str]) -> str:
+        identity = hashlib.sha256(authorization.encode()).hexdigest() if authorization else "anonymous"
+        normalized_query = "&".join(sorted(query.split("&"))) if query else ""
+        return f"{identity}:{path}?{normalized_query}"
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats.expirations += 1
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        if entry.size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = entry
+        self.size_bytes += entry.size
+        while self.entries and (self.size_bytes > self.max_bytes or len(self.entries) > self.max_entries):
+            oldest_key = next(iter(self.entries))
+            self._remove(oldest_key)
+            self.stats.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry.size
+
+    def invalidate_prefix(self, path_prefix: str):
+        """Drop every entry whose path starts with the prefix (after a write to that upstream)"""
+        stale = [key for key, entry in self.entries.items() if entry.path.startswith(path_prefix)]
+        for key in stale:
+            self._remove(key)
+        self.stats.invalidations += len(stale)
+
+    def clear(self):
+        self.entries.clear()
+        self.size_bytes = 0
+
+    async def get_or_fetch(self, key: str, path: str, ttl: float,
+                           fetch: Callable[[], Awaitable[Tuple[int, list, bytes]]],
+                           refresh: bool = False) -> Tuple[CacheEntry, str]:
+        """
+        Return (entry, cache_status) where cache_status is HIT, MISS or COALESCED.
+        fetch() returns (status_code, headers, body); only 200 responses are stored.
+        """
+        if not refresh:
+            entry = self.get(key)
+            if entry is not None:
+                self.stats.hits += 1
+                return entry, "HIT"
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats.coalesced += 1
+            return await asyncio.shield(inflight), "COALESCED"
+
+        self.stats.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            status_code, headers, body = await fetch()
+            headers = [(k, v) for k, v in headers if k.lower() not in NON_CACHEABLE_HEADERS]
+            etag = next((v for k, v in headers if k.lower() == "etag"), None) or make_etag(body)
+            entry = CacheEntry(
+                path=path,
+                status_code=status_code,
+                headers=[(k, v) for k, v in headers if k.lower() != "etag"],
+                body=body,
+                etag=etag,
+                expires_at=time.monotonic() + ttl,
+            )
+            if status_code == 200:
+                self.set(key, entry)
+            future.set_result(entry)
+            return entry, "MISS"
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody was waiting on it
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def get_stats(self) -> dict:
+        stats = self.stats
+        lookups = stats.hits + stats.misses + stats.coalesced
+        return {
+            "enabled": self.enabled,
+            "entries": len(self.entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "max_entries": self.max_entries,
+            "hits": stats.hits,
+            "misses": stats.misses,
+            "coalesced": stats.coalesced,
+            "evictions": stats.evictions,
+            "expirations": stats.expirations,
+            "invalidations": stats.invalidations,
+            "not_modified": stats.not_modified,
+            "hit_ratio": round((stats.hits + stats.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Singleton instance for easy access
+_cache_instance: Optional[ResponseCache] = None
+
+def get_response_cache() -> ResponseCache:
+    """Get or create the response cache instance"""
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = ResponseCache(parse_routes(CACHE_ROUTES))
+    return _cache_instance
+
+def set_response_cache(cache: Optional[ResponseCache]):
+    """Replace the cache instance (used by tests)"""
+    global _cache_instance
+    _cache_instance = cache
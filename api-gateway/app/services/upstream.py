@@ -0,0 +1,249 @@
+"""
+Upstream connection pools for the API gateway.
+Each backend service gets one long-lived httpx.AsyncClient, so proxied calls
+reuse keep-alive connections instead of paying TCP setup on every request.
+"""
+
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Any
+
+import httpx
+
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.concurrency_limiter import AIMDLimiter
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_URLS = {
+    "auth": os.getenv("AUTH_SERVICE_URL", "http://auth-service:8001"),
+    "tasks": os.getenv("TASKS_SERVICE_URL", "http://tasks-service:8002"),
+    "notifications": os.getenv("NOTIFICATIONS_SERVICE_URL", "http://notifications-service:8003"),
+}
+
+
+def upstream_setting(name: str, key: str, default: str) -> str:
+    """
+    Read a gateway setting, allowing a per-upstream override.
+    GATEWAY_TASKS_TIMEOUT wins over GATEWAY_TIMEOUT, which wins over the default.
+    """
+    return os.getenv(f"GATEWAY_{name.upper()}_{key}", os.getenv(f"GATEWAY_{key}", default))
+
+
+@dataclass
+class PoolStats:
+    """Usage counters for a single upstream pool"""
+    requests_total: int = 0
+    errors_total: int = 0
+    in_flight: int = 0
+    wait_samples: int = 0
+    wait_time_total: float = 0.0
+    wait_time_max: float = 0.0
+
+    def record_wait(self, seconds: float):
+        self.wait_samples += 1
+        self.wait_time_total += seconds
+        self.wait_time_max = max(self.wait_time_max, seconds)
+
+
+class UpstreamPool:
+    """Pooled HTTP client for one backend service"""
+
+    def __init__(self, name: str, base_url: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.name = name
+        self.base_url = base_url
+        self.timeout = httpx.Timeout(
+            float(upstream_setting(name, "TIMEOUT", "30")),
+            connect=float(upstream_setting(name, "CONNECT_TIMEOUT", "5")),
+            pool=float(upstream_setting(name, "POOL_TIMEOUT", "5")),
+        )
+        self.limits = httpx.Limits(
+            max_connections=int(upstream_setting(name, "POOL_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(upstream_setting(name, "POOL_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(upstream_setting(name, "POOL_KEEPALIVE_EXPIRY", "30")),
+        )
+        self.http2 = upstream_setting(name, "HTTP2", "false").lower() in ("1", "true", "yes")
+        self.client: Optional[httpx.AsyncClient] = None
+        self.stats = PoolStats()
+        self._transport = transport
+        self.breaker = CircuitBreaker(
+            name,
+            failure_rate_threshold=float(upstream_setting(name, "BREAKER_FAILURE_RATE", "0.5")),
+            slow_call_rate_threshold=float(upstream_setting(name, "BREAKER_SLOW_CALL_RATE", "0.8")),
+            slow_call_seconds=float(upstream_setting(name, "BREAKER_SLOW_CALL_SECONDS", "5")),
+            window_size=int(upstream_setting(name, "BREAKER_WINDOW", "50")),
+            min_calls=int(upstream_setting(name, "BREAKER_MIN_CALLS", "20")),
+            open_seconds=float(upstream_setting(name, "BREAKER_OPEN_SECONDS", "10")),
+            half_open_max_calls=int(upstream_setting(name, "BREAKER_HALF_OPEN_CALLS", "3")),
+        )
+        self.limiter = AIMDLimiter(
+            name,
+            initial_limit=int(upstream_setting(name, "LIMIT_INITIAL", "20")),
+            min_limit=int(upstream_setting(name, "LIMIT_MIN", "1")),
+            max_limit=int(upstream_setting(name, "LIMIT_MAX", str(self.limits.max_connections))),
+            backoff_ratio=float(upstream_setting(name, "LIMIT_BACKOFF", "0.9")),
+            latency_target_seconds=float(upstream_setting(name, "LIMIT_LATENCY_SECONDS", "2")),
+        )
+
+    def start(self):
+        """Create the underlying client (idempotent)"""
+        if self.client is not None:
+            return
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning(f"h2 package not installed, upstream '{self.name}' falls back to HTTP/1.1")
+                http2 = False
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            limits=self.limits,
+            http2=http2,
+            transport=self._transport,
+        )
+        logger.info(f"✓ Upstream pool started: {self.name} → {self.base_url}")
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+            logger.info(f"Upstream pool closed: {self.name}")
+
+    async def send(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                   content: Any = None, stream: bool = False) -> httpx.Response:
+        """
+        Send a request through the pool.
+        Raises UpstreamUnavailable without calling the backend when the circuit
+        is open or the adaptive concurrency limit is reached.
+        With stream=True the caller owns the response and must hand it back to release().
+        """
+        self.start()
+        self.limiter.acquire()
+        try:
+            self.breaker.before_call()
+        except Exception:
+            self.limiter.release()
+            raise
+
+        request = self.client.build_request(method, url, headers=headers, content=content)
+
+        started = time.perf_counter()
+        acquired: Dict[str, float] = {}
+
+        async def trace(event_name: str, info: dict):
+            # The first connection-level event marks the moment a pooled connection was handed out
+            if "at" not in acquired and event_name.endswith(".started"):
+                acquired["at"] = time.perf_counter()
+
+        request.extensions["trace"] = trace
+
+        self.stats.requests_total += 1
+        self.stats.in_flight += 1
+        try:
+            response = await self.client.send(request, stream=stream)
+        except Exception:
+            latency = time.perf_counter() - started
+            self.stats.errors_total += 1
+            self.stats.in_flight -= 1
+            self.breaker.record(True, latency)
+            self.limiter.on_result(True, latency)
+            self.limiter.release()
+            raise
+        except BaseException:
+            self.breaker.abandon()
+            self.stats.in_flight -= 1
+            self.limiter.release()
+            raise
+        finally:
+            if "at" in acquired:
+                self.stats.record_wait(acquired["at"] - started)
+
+        latency = time.perf_counter() - started
+        failed = response.status_code >= 500
+        self.breaker.record(failed, latency)
+        self.limiter.on_result(failed, latency)
+        if not stream:
+            self.stats.in_flight -= 1
+            self.limiter.release()
+        return response
+
+    async def release(self, response: httpx.Response):
+        """Close a streamed response and return its connection to the pool; later calls do nothing"""
+        if response.extensions.get("gateway_released"):
+            return
+        response.extensions["gateway_released"] = True
+        try:
+            await response.aclose()
+        finally:
+            self.stats.in_flight -= 1
+            self.limiter.release()
+
+    def _connections(self) -> list:
+        transport = getattr(self.client, "_transport", None)
+        pool = getattr(transport, "_pool", None)
+        return list(getattr(pool, "connections", None) or [])
+
+    def get_stats(self) -> Dict[str, Any]:
+        connections = self._connections() if self.client is not None else []
+        stats = self.stats
+        return {
+            "base_url": self.base_url,
+            "started": self.client is not None,
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "timeout": self.timeout.read,
+            "in_flight": stats.in_flight,
+            "connections": len(connections),
+            "idle_connections": sum(1 for conn in connections if conn.is_idle()),
+            "requests_total": stats.requests_total,
+            "errors_total": stats.errors_total,
+            "pool_wait_avg_ms": round(stats.wait_time_total / stats.wait_samples * 1000, 3) if stats.wait_samples else 0.0,
+            "pool_wait_max_ms": round(stats.wait_time_max * 1000, 3),
+            "circuit_breaker": self.breaker.get_stats(),
+            "concurrency": self.limiter.get_stats(),
+        }
+
+
+class UpstreamPools:
+    """Registry of upstream pools, one per backend service"""
+
+    def __init__(self, urls: Dict[str, str], transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.pools: Dict[str, UpstreamPool] = {
+            name: UpstreamPool(name, url, transport=transport) for name, url in urls.items()
+        }
+
+    def get(self, name: str) -> UpstreamPool:
+        return self.pools[name]
+
+    def start(self):
+        for pool in self.pools.values():
+            pool.start()
+
+    async def close(self):
+        for pool in self.pools.values():
+            await pool.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {name: pool.get_stats() for name, pool in self.pools.items()}
+
+
+# Singleton instance for easy access
+_pools_instance: Optional[UpstreamPools] = None
+
+def get_upstream_pools() -> UpstreamPools:
+    """Get or create the upstream pools registry"""
+    global _pools_instance
+    if _pools_instance is None:
+        _pools_instance = UpstreamPools(UPSTREAM_URLS)
+    return _pools_instance
+
+def set_upstream_pools(pools: UpstreamPools):
+    """Replace the registry (used by tests to inject a mock transport)"""
+    global _pools_instance
+    _pools_instance = pools
@@ -0,0 +1,32 @@
+"""
+Fast JSON encoding for responses the gateway builds itself.
+orjson is used when installed, the stdlib encoder otherwise.
+"""
+
+import json
+import logging
+from typing import Any
+
+from fastapi.responses import JSONResponse as StdJSONResponse
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as JSONResponse
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+    JSONResponse = StdJSONResponse
+    logger.warning("orjson package not installed, gateway falls back to the stdlib JSON encoder")
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,116 @@
+"""
+Bytes on the wire and CPU per request for gateway response encodings.
+
+Builds a task list shaped like tasks-service TaskResponse (with embedded
+comments and history) and measures, per encoder:
+- JSON encoding: stdlib json vs orjson
+- compression: identity, gzip, br, zstd at the gateway's configured levels
+
+Usage (from api-gateway/):
+    python benchmarks/compression_benchmark.py [--tasks 200] [--rounds 50]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.middleware.compression import available_compressors  # noqa: E402
+from app.utils import fast_json  # noqa: E402
+
+STATUSES = ["new", "in_progress", "completed", "rework"]
+PRIORITIES = ["low", "medium", "high", "critical"]
+EVENTS = ["created", "status_changed", "assigned", "comment_added", "worker_completed"]
+
+
+def build_tasks(count: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    started = datetime(2024, 1, 1, 9, 0, 0)
+    tasks = []
+    for task_id in range(1, count + 1):
+        created_at = started + timedelta(minutes=task_id * 17)
+        tasks.append({
+            "id": task_id,
+            "title": f"Task #{task_id}: подготовить отчёт по проекту {rng.randint(1, 40)}",
+            "description": "Собрать данные, согласовать с командой и загрузить итоговый документ. " * rng.randint(1, 4),
+            "status": rng.choice(STATUSES),
+            "priority": rng.choice(PRIORITIES),
+            "created_by": rng.randint(1, 5),
+            "worker_ids": rng.sample(range(1, 50), rng.randint(1, 4)),
+            "created_at": created_at.isoformat(),
+            "updated_at": (created_at + timedelta(hours=3)).isoformat(),
+            "completed_at": None,
+            "comments": [
+                {
+                    "id": task_id * 100 + n,
+                    "task_id": task_id,
+                    "user_id": rng.randint(1, 50),
+                    "full_name": f"Сотрудник {rng.randint(1, 50)}",
+                    "text": "Проверил, есть пара замечаний по оформлению. " * rng.randint(1, 3),
+                    "created_at": (created_at + timedelta(minutes=n * 5)).isoformat(),
+                }
+                for n in range(rng.randint(0, 6))
+            ],
+            "history": [
+                {
+                    "id": task_id * 100 + n,
+                    "task_id": task_id,
+                    "event_type": rng.choice(EVENTS),
+                    "user_id": rng.randint(1, 50),
+                    "details": "Изменён статус задачи",
+                    "created_at": (created_at + timedelta(minutes=n * 3)).isoformat(),
+                }
+                for n in range(rng.randint(1, 8))
+            ],
+        })
+    return tasks
+
+
+def cpu_per_call(func, rounds: int) -> float:
+    """Average process CPU time per call, in milliseconds"""
+    func()
+    started = time.process_time()
+    for _ in range(rounds):
+        func()
+    return (time.process_time() - started) / rounds * 1000
+
+
+def compress(compressor_class, body: bytes) -> bytes:
+    compressor = compressor_class()
+    return compressor.compress(body) + compressor.finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    tasks = build_tasks(args.tasks)
+
+    print(f"Payload: {args.tasks} tasks, {args.rounds} rounds per measurement\n")
+    print(f"{'JSON encoder':<16}{'bytes':>12}{'CPU ms/req':>14}")
+    stdlib = lambda: json.dumps(tasks, ensure_ascii=False).encode("utf-8")  # noqa: E731
+    print(f"{'stdlib json':<16}{len(stdlib()):>12}{cpu_per_call(stdlib, args.rounds):>14.3f}")
+    if fast_json.orjson is not None:
+        fast = lambda: fast_json.dumps(tasks)  # noqa: E731
+        print(f"{'orjson':<16}{len(fast()):>12}{cpu_per_call(fast, args.rounds):>14.3f}")
+    else:
+        print(f"{'orjson':<16}{'not installed':>26}")
+
+    body = fast_json.dumps(tasks)
+    print(f"\n{'encoding':<16}{'bytes':>12}{'ratio':>10}{'CPU ms/req':>14}")
+    print(f"{'identity':<16}{len(body):>12}{1.0:>10.2f}{0.0:>14.3f}")
+    for name, compressor_class in sorted(available_compressors().items()):
+        compressed = compress(compressor_class, body)
+        cpu = cpu_per_call(lambda: compress(compressor_class, body), args.rounds)
+        print(f"{name:<16}{len(compressed):>12}{len(body) / len(compressed):>10.2f}{cpu:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,15 @@
 from fastapi import FastAPI, Request, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-import httpx
 import logging
 import logging.config
-from typing import Optional
+from app.services.upstream import get_upstream_pools
+from app.services.proxy import proxy_request
+from app.controllers.admin_controller import router as admin_router
+from app.controllers.batch_controller import router as batch_router
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.services.rate_limiter import get_rate_limiter
+from app.utils.fast_json import JSONResponse
 
 # Configure logging with GMT+3 timezone
 logging_config = {
@@ -41,7 +47,10 @@ except (AttributeError, OSError):
     # tzset is not available on Windows, but we'll try to handle it
     pass
 
-app = FastAPI(title="API Gateway", version="1.0.0")
+app = FastAPI(title="API Gateway", version="1.0.0", default_response_class=JSONResponse)
+
+# Added before CORS so 429 responses still carry CORS headers
+app.add_middleware(RateLimitMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -51,26 +60,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-AUTH_SERVICE_URL = "http://auth-service:8001"
-TASKS_SERVICE_URL = "http://tasks-service:8002"
-NOTIFICATIONS_SERVICE_URL = "http://notifications-service:8003"
+app.add_middleware(CompressionMiddleware)
+
+@app.on_event("startup")
+async def startup():
+    get_upstream_pools().start()
+    logger.info("Upstream pools initialized")
+
+@app.on_event("shutdown")
+async def shutdown():
+    await get_upstream_pools().close()
+    await get_rate_limiter().close()
+    logger.info("Upstream pools closed")
 
-async def forward_request(service_url: str, path: str, method: str, headers: dict, body: Optional[bytes] = None, query_string: str = ""):
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        url = f"{service_url}{path}"
-        if query_string:
-            url = f"{url}?{query_string}"
-        try:
-            response = await client.request(
-                method=method,
-                url=url,
-                headers=headers,
-                content=body
-            )
-            return response.status_code, response.headers, response.content
-        except Exception as e:
-            logger.error(f"Error forwarding request to {url}: {str(e)}")
-            return 503, {}, b"Service unavailable"
+app.include_router(admin_router)
+app.include_router(batch_router)
 
 @app.get("/health")
 async def health():
@@ -78,57 +82,15 @@ async def health():
 
 @app.api_route("/api/auth/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
 async def auth_gateway(request: Request, path: str):
-    body = await request.body() if request.method != "GET" else None
-    query_string = str(request.url.query) if request.url.query else ""
-    status_code, headers, content = await forward_request(
-        AUTH_SERVICE_URL,
-        f"/auth/{path}",
-        request.method,
-        dict(request.headers),
-        body,
-        query_string
-    )
-    return {
-        "status_code": status_code,
-        "content": content,
-        "headers": dict(headers)
-    }
+    return await proxy_request(request, "auth", f"/auth/{path}")
 
 @app.api_route("/api/tasks/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
 async def tasks_gateway(request: Request, path: str):
-    body = await request.body() if request.method != "GET" else None
-    query_string = str(request.url.query) if request.url.query else ""
-    status_code, headers, content = await forward_request(
-        TASKS_SERVICE_URL,
-        f"/tasks/{path}",
-        request.method,
-        dict(request.headers),
-        body,
-        query_string
-    )
-    return {
-        "status_code": status_code,
-        "content": content,
-        "headers": dict(headers)
-    }
+    return await proxy_request(request, "tasks", f"/tasks/{path}")
 
 @app.api_route("/api/notifications/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
 async def notifications_gateway(request: Request, path: str):
-    body = await request.body() if request.method != "GET" else None
-    query_string = str(request.url.query) if request.url.query else ""
-    status_code, headers, content = await forward_request(
-        NOTIFICATIONS_SERVICE_URL,
-        f"/notifications/{path}",
-        request.method,
-        dict(request.headers),
-        body,
-        query_string
-    )
-    return {
-        "status_code": status_code,
-        "content": content,
-        "headers": dict(headers)
-    }
+    return await proxy_request(request, "notifications", f"/notifications/{path}")
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,9 @@
+import sys
+import os
+
+def pytest_configure(config):
+    """Configure pytest for api-gateway tests"""
+    gateway_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    # Only add to path if not already there
+    if gateway_path not in sys.path:
+        sys.path.insert(0, gateway_path)
@@ -0,0 +1,569 @@
+import pytest
+import httpx
+import json
+import asyncio
+import gzip
+import zstandard
+from fastapi.testclient import TestClient
+import sys
+import os
+
+# Make sure we import from api-gateway
+gateway_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if gateway_path not in sys.path:
+    sys.path.insert(0, gateway_path)
+
+from app.services.upstream import UpstreamPools, UPSTREAM_URLS, set_upstream_pools
+from app.services.response_cache import ResponseCache, CacheEntry, parse_routes, set_response_cache
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.concurrency_limiter import AIMDLimiter, ConcurrencyLimitExceeded
+from app.services.identity import TokenVerifier, SECRET_KEY, sign_identity
+from app.middleware.compression import CompressionResponder, available_compressors, negotiate_encoding
+from app.services.rate_limiter import RateLimiter, InMemoryBuckets, RedisBuckets, parse_rules, set_rate_limiter
+import jwt
+import time
+from main import app
+
+upstream_calls = []
+
+def upstream_response(status_code: int, body: bytes, headers: dict = None) -> httpx.Response:
+    # A real (unread) stream, like the one a network transport returns
+    headers = {"Content-Type": "application/json", "Content-Length": str(len(body)), **(headers or {})}
+    return httpx.Response(status_code, headers=headers, stream=httpx.ByteStream(body))
+
+def upstream_handler(request: httpx.Request) -> httpx.Response:
+    upstream_calls.append(request)
+    if request.method == "POST":
+        return upstream_response(
+            201,
+            request.content,
+            {"Connection": "keep-alive, X-Upstream-Hop", "X-Upstream-Hop": "1"}
+        )
+    if request.url.path == "/tasks/large":
+        return upstream_response(200, json.dumps([{"id": i, "title": "Task title"} for i in range(500)]).encode())
+    if request.url.path == "/tasks/precompressed":
+        return upstream_response(200, gzip.compress(b'{"already": "compressed"}' * 100), {"Content-Encoding": "gzip"})
+    if request.url.path == "/tasks/missing":
+        return upstream_response(404, json.dumps({"detail": "Task not found"}).encode())
+    return upstream_response(200, json.dumps({"path": request.url.path, "query": request.url.query.decode()}).encode())
+
+def make_token(**claims):
+    payload = {"sub": "worker@test.com", "role": "user", "user_id": 7, "exp": int(time.time()) + 600, **claims}
+    return jwt.encode(payload, SECRET_KEY, algorithm="HS256")
+
+def admin_headers():
+    return {"Authorization": f"Bearer {make_token(sub='admin@test.com', role='admin', user_id=1)}"}
+
+@pytest.fixture(scope="function", autouse=True)
+def pools():
+    upstream_calls.clear()
+    pools = UpstreamPools(UPSTREAM_URLS, transport=httpx.MockTransport(upstream_handler))
+    set_upstream_pools(pools)
+    set_response_cache(None)
+    set_rate_limiter(None)
+    yield pools
+    set_upstream_pools(None)
+    set_response_cache(None)
+    set_rate_limiter(None)
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+def test_health(client):
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["service"] == "api-gateway"
+
+def test_forward_reuses_pooled_client(client, pools):
+    tasks_pool = pools.get("tasks")
+    client.get("/api/tasks/list?skip=0&limit=10")
+    first_client = tasks_pool.client
+    client.get("/api/tasks/list?skip=10&limit=10")
+    assert tasks_pool.client is first_client
+    assert len(upstream_calls) == 2
+    assert upstream_calls[0].url.path == "/tasks/list"
+    assert upstream_calls[0].url.query == b"skip=0&limit=10"
+
+def test_pools_closed_on_shutdown(pools):
+    with TestClient(app) as test_client:
+        test_client.get("/api/auth/users")
+        assert pools.get("auth").client is not None
+    assert pools.get("auth").client is None
+
+def test_metrics_expose_pool_usage(client):
+    client.get("/api/notifications/user/1/unread-count")
+    response = client.get("/admin/metrics", headers=admin_headers())
+    assert response.status_code == 200
+    stats = response.json()["upstreams"]
+    assert set(stats) == {"auth", "tasks", "notifications"}
+    assert stats["notifications"]["requests_total"] == 1
+    assert stats["notifications"]["in_flight"] == 0
+    assert "idle_connections" in stats["notifications"]
+    assert "pool_wait_avg_ms" in stats["notifications"]
+
+@pytest.mark.parametrize("method,path", [
+    ("get", "/admin/metrics"), ("get", "/admin/upstreams"), ("post", "/admin/upstreams/tasks/reset")
+])
+def test_admin_endpoints_require_an_admin_token(client, pools, method, path):
+    pools.get("tasks").breaker.min_calls = 1
+    pools.get("tasks").breaker.record(failed=True, latency=0.01)
+    state = pools.get("tasks").breaker.state
+    assert state == "open"
+
+    anonymous = getattr(client, method)(path)
+    assert anonymous.status_code == 401 and anonymous.headers["www-authenticate"] == "Bearer"
+    forged = getattr(client, method)(path, headers={"Authorization": "Bearer forged", "X-User-Role": "admin"})
+    assert forged.status_code == 401
+    worker = getattr(client, method)(path, headers={"Authorization": f"Bearer {make_token()}"})
+    assert worker.status_code == 403
+    # Nothing was reset on the way
+    assert pools.get("tasks").breaker.state == state
+    assert getattr(client, method)(path, headers=admin_headers()).status_code == 200
+
+def test_stream_proxy_keeps_upstream_status_and_body(client):
+    response = client.get("/api/tasks/missing")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Task not found"}
+
+def test_stream_proxy_passes_request_body_through(client):
+    payload = b'{"title": "Big task", "description": "' + b"x" * 200_000 + b'"}'
+    response = client.post("/api/tasks/", content=payload, headers={"Content-Type": "application/json"})
+    assert response.status_code == 201
+    assert response.content == payload
+    assert upstream_calls[0].content == payload
+    assert upstream_calls[0].headers["host"] != "testserver"
+
+def test_stream_proxy_filters_hop_by_hop_headers(client):
+    response = client.post("/api/tasks/", json={"title": "t"}, headers={"Connection": "close", "TE": "trailers"})
+    assert "x-upstream-hop" not in response.headers
+    assert "te" not in upstream_calls[0].headers
+
+def test_stream_proxy_returns_503_when_upstream_down(client, pools):
+    def failing_handler(request):
+        raise httpx.ConnectError("connection refused")
+    pools.get("auth")._transport = httpx.MockTransport(failing_handler)
+    pools.get("auth").client = None
+    response = client.get("/api/auth/me")
+    assert response.status_code == 503
+
+class SlowUpstreamBody(httpx.AsyncByteStream):
+    def __init__(self):
+        self.closed = False
+
+    async def __aiter__(self):
+        for i in range(100):
+            await asyncio.sleep(0.01)
+            yield b'{"line": %d}\n' % i
+
+    async def aclose(self):
+        self.closed = True
+
+@pytest.mark.parametrize("client_side", ["disconnect", "send_fails", "headers_fail"])
+def test_stream_proxy_releases_upstream_when_the_client_goes_away(pools, client_side):
+    from starlette.requests import Request
+    from app.services.proxy import stream_request
+    body = SlowUpstreamBody()
+    tasks_pool = pools.get("tasks")
+    tasks_pool._transport = httpx.MockTransport(lambda request: httpx.Response(200, stream=body))
+    tasks_pool.client = None
+
+    async def scenario():
+        scope = {"type": "http", "method": "GET", "path": "/api/tasks/1/history/export",
+                 "query_string": b"", "headers": []}
+        response = await stream_request(Request(scope), "tasks", "/tasks/1/history/export")
+        assert tasks_pool.stats.in_flight == 1 and tasks_pool.limiter.in_flight == 1
+
+        async def receive():
+            if client_side == "disconnect":
+                await asyncio.sleep(0.05)
+                return {"type": "http.disconnect"}
+            await asyncio.sleep(10)
+
+        async def send(message):
+            if client_side == "headers_fail" or (client_side == "send_fails" and message["type"] == "http.response.body"):
+                raise OSError("connection reset by peer")
+
+        try:
+            await response(scope, receive, send)
+        except Exception:
+            assert client_side != "disconnect"
+        await tasks_pool.close()
+
+    asyncio.run(scenario())
+    assert body.closed
+    assert tasks_pool.stats.in_flight == 0
+    assert tasks_pool.limiter.in_flight == 0
+
+def test_wrap_mode_returns_legacy_envelope(client, monkeypatch):
+    from app.services import proxy
+    monkeypatch.setattr(proxy, "PROXY_MODE", "wrap")
+    response = client.get("/api/tasks/missing")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status_code"] == 404
+    assert "Task not found" in data["content"]
+
+def test_cache_serves_repeated_get_from_memory(client):
+    first = client.get("/api/auth/users", headers={"Authorization": "Bearer a"})
+    second = client.get("/api/auth/users", headers={"Authorization": "Bearer a"})
+    assert first.headers["x-cache"] == "MISS"
+    assert second.headers["x-cache"] == "HIT"
+    assert second.json() == first.json()
+    assert len(upstream_calls) == 1
+
+def test_cache_key_includes_identity(client):
+    client.get("/api/auth/users", headers={"Authorization": "Bearer a"})
+    response = client.get("/api/auth/users", headers={"Authorization": "Bearer b"})
+    assert response.headers["x-cache"] == "MISS"
+    assert len(upstream_calls) == 2
+
+def test_cache_answers_if_none_match_with_304(client):
+    etag = client.get("/api/tasks/list").headers["etag"]
+    response = client.get("/api/tasks/list", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert "if-none-match" not in upstream_calls[0].headers
+
+def test_cache_invalidated_by_write_to_same_upstream(client):
+    client.get("/api/tasks/list")
+    client.post("/api/tasks/", json={"title": "t"})
+    response = client.get("/api/tasks/list")
+    assert response.headers["x-cache"] == "MISS"
+
+def test_cache_does_not_store_errors(client, pools):
+    def failing_handler(request):
+        return upstream_response(500, b'{"detail": "boom"}')
+    pools.get("tasks")._transport = httpx.MockTransport(failing_handler)
+    pools.get("tasks").client = None
+    assert client.get("/api/tasks/list").status_code == 500
+    assert client.get("/api/tasks/list").headers["x-cache"] == "MISS"
+
+def test_cache_coalesces_concurrent_misses():
+    cache = ResponseCache(parse_routes("/api/tasks/list=5"))
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 200, [("content-type", "application/json")], b"[]"
+
+    async def run():
+        return await asyncio.gather(*[
+            cache.get_or_fetch("key", "/api/tasks/list", 5, fetch) for _ in range(10)
+        ])
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert sorted(status for _, status in results).count("COALESCED") == 9
+    assert cache.get_stats()["coalesced"] == 9
+
+def test_cache_evicts_least_recently_used():
+    entry_size = CacheEntry("/p", 200, [], b"x" * 1000, '"e"', float("inf")).size
+    cache = ResponseCache([], max_bytes=entry_size * 2)
+    for key in ("a", "b"):
+        cache.set(key, CacheEntry("/p", 200, [], b"x" * 1000, '"e"', float("inf")))
+    cache.get("a")
+    cache.set("c", CacheEntry("/p", 200, [], b"x" * 1000, '"e"', float("inf")))
+    assert set(cache.entries) == {"a", "c"}
+    assert cache.get_stats()["evictions"] == 1
+
+def test_cache_route_patterns():
+    cache = ResponseCache(parse_routes("/api/notifications/user/*/unread-count=5,/api/auth/users=30"))
+    assert cache.ttl_for("/api/notifications/user/7/unread-count") == 5
+    assert cache.ttl_for("/api/auth/users") == 30
+    assert cache.ttl_for("/api/auth/users/7") is None
+
+def test_circuit_breaker_opens_and_recovers_through_half_open():
+    now = [0.0]
+    breaker = CircuitBreaker("tasks", min_calls=4, window_size=4, open_seconds=10,
+                             half_open_max_calls=2, clock=lambda: now[0])
+    for _ in range(4):
+        breaker.before_call()
+        breaker.record(failed=True, latency=0.01)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    now[0] = 11.0
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    breaker.record(failed=False, latency=0.01)
+    breaker.before_call()
+    breaker.record(failed=False, latency=0.01)
+    assert breaker.state == "closed"
+
+def test_circuit_breaker_trips_on_slow_calls_and_failed_probe():
+    now = [0.0]
+    breaker = CircuitBreaker("tasks", min_calls=3, window_size=3, slow_call_seconds=1,
+                             open_seconds=5, clock=lambda: now[0])
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record(failed=False, latency=2.0)
+    assert breaker.state == "open"
+    now[0] = 6.0
+    breaker.before_call()
+    breaker.record(failed=True, latency=0.01)
+    assert breaker.state == "open"
+    assert breaker.get_stats()["opened_total"] == 2
+
+def test_aimd_limiter_sheds_and_adapts():
+    limiter = AIMDLimiter("tasks", initial_limit=2, max_limit=10, backoff_ratio=0.5, latency_target_seconds=1)
+    limiter.acquire()
+    limiter.acquire()
+    with pytest.raises(ConcurrencyLimitExceeded):
+        limiter.acquire()
+    limiter.on_result(failed=False, latency=0.1)
+    assert limiter.limit == 3
+    limiter.on_result(failed=False, latency=5.0)
+    assert limiter.limit == 1
+    limiter.release()
+    limiter.release()
+    assert limiter.get_stats()["rejected_total"] == 1
+
+def test_gateway_fails_fast_when_circuit_open(client, pools):
+    def failing_handler(request):
+        upstream_calls.append(request)
+        raise httpx.ReadTimeout("upstream too slow")
+    tasks_pool = pools.get("tasks")
+    tasks_pool._transport = httpx.MockTransport(failing_handler)
+    tasks_pool.client = None
+    tasks_pool.breaker.min_calls = 3
+
+    for _ in range(3):
+        assert client.get("/api/tasks/1").status_code == 503
+    response = client.get("/api/tasks/1")
+    assert response.status_code == 503
+    assert response.json()["reason"] == "circuit open"
+    assert "retry-after" in response.headers
+    assert len(upstream_calls) == 3
+
+    upstreams = client.get("/admin/upstreams", headers=admin_headers()).json()
+    assert upstreams["tasks"]["circuit_breaker"]["state"] == "open"
+    assert upstreams["tasks"]["concurrency"]["limit"] < 20
+
+    assert client.post("/admin/upstreams/tasks/reset", headers=admin_headers()).json()["state"] == "closed"
+
+def test_verified_identity_forwarded_as_signed_headers(client):
+    token = make_token()
+    client.get("/api/tasks/1", headers={"Authorization": f"Bearer {token}"})
+    headers = upstream_calls[0].headers
+    assert headers["x-user-id"] == "7"
+    assert headers["x-user-role"] == "user"
+    assert headers["x-identity-signature"] == sign_identity(7, "worker@test.com", "user", int(headers["x-user-exp"]))
+    # The headers are keyed separately from the JWTs
+    assert headers["x-identity-signature"] != sign_identity(7, "worker@test.com", "user", int(headers["x-user-exp"]),
+                                                            secret=SECRET_KEY)
+
+def test_client_supplied_identity_headers_are_stripped(client):
+    client.get("/api/tasks/1", headers={"X-User-Id": "1", "X-User-Role": "admin", "Authorization": "Bearer forged"})
+    headers = upstream_calls[0].headers
+    assert "x-user-id" not in headers
+    assert "x-user-role" not in headers
+    assert headers["authorization"] == "Bearer forged"
+
+def test_token_verifier_caches_until_exp():
+    now = [time.time()]
+    verifier = TokenVerifier(clock=lambda: now[0])
+    token = make_token()
+    assert verifier.verify(token).user_id == 7
+    assert verifier.verify(token).user_id == 7
+    assert verifier.get_stats()["hits"] == 1
+    # Only token hashes are kept in memory
+    assert token not in verifier.entries
+
+    # Past exp the cached entry is dropped and the token is decoded again
+    now[0] += 3600
+    verifier.verify(token)
+    assert verifier.get_stats()["hits"] == 1
+    assert verifier.get_stats()["misses"] == 2
+
+def test_token_verifier_rejects_bad_signature():
+    verifier = TokenVerifier()
+    token = jwt.encode({"sub": "x@test.com", "exp": int(time.time()) + 60}, "other-secret", algorithm="HS256")
+    assert verifier.verify(token) is None
+    assert verifier.get_stats()["invalid"] == 1
+
+def test_batch_dispatches_sub_requests_with_individual_status(client):
+    token = make_token()
+    response = client.post(
+        "/api/batch",
+        json={"requests": [
+            {"id": "task", "path": "/api/tasks/1"},
+            {"id": "missing", "path": "/tasks/missing"},
+            {"id": "comment", "method": "POST", "path": "/api/tasks/1/comments", "body": {"text": "hi"}},
+            {"id": "unknown", "path": "/api/unknown/1"},
+        ]},
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+    results = {item["id"]: item for item in response.json()["responses"]}
+    assert results["task"]["status"] == 200
+    assert results["task"]["body"] == {"path": "/tasks/1", "query": ""}
+    assert results["missing"]["status"] == 404
+    assert results["comment"]["status"] == 201
+    assert results["comment"]["body"] == {"text": "hi"}
+    assert "X-Upstream-Hop" not in results["comment"]["headers"]
+    assert results["unknown"]["status"] == 404
+    # Unroutable sub-requests never reach an upstream
+    assert len(upstream_calls) == 3
+    # Each sub-request carries the caller's identity
+    assert all(call.headers["x-user-id"] == "7" for call in upstream_calls)
+
+def test_batch_get_uses_response_cache(client):
+    batch = {"requests": [{"id": "list", "path": "/api/tasks/list?status=new"}]}
+    client.get("/api/tasks/list?status=new")
+    response = client.post("/api/batch", json=batch)
+    result = response.json()["responses"][0]
+    assert result["headers"]["X-Cache"] == "HIT"
+    assert len(upstream_calls) == 1
+
+def test_batch_concurrency_is_capped(client, monkeypatch):
+    import app.services.batch as batch_module
+    import app.controllers.batch_controller as batch_controller
+    active = {"now": 0, "max": 0}
+    original = batch_module.forward_request
+
+    async def tracking_forward(*args, **kwargs):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.01)
+        try:
+            return await original(*args, **kwargs)
+        finally:
+            active["now"] -= 1
+
+    monkeypatch.setattr(batch_module, "forward_request", tracking_forward)
+    monkeypatch.setattr(batch_controller, "BATCH_CONCURRENCY", 2)
+    response = client.post("/api/batch", json={"requests": [{"path": f"/api/tasks/{i}"} for i in range(6)]})
+    assert response.status_code == 200
+    assert [item["status"] for item in response.json()["responses"]] == [200] * 6
+    assert active["max"] == 2
+
+def test_batch_size_limit(client, monkeypatch):
+    import app.controllers.batch_controller as batch_controller
+    monkeypatch.setattr(batch_controller, "BATCH_MAX_REQUESTS", 2)
+    response = client.post("/api/batch", json={"requests": [{"path": "/api/tasks/1"}] * 3})
+    assert response.status_code == 413
+
+def test_large_json_is_compressed_with_negotiated_encoding(client):
+    response = client.get("/api/tasks/large", headers={"Accept-Encoding": "gzip;q=0.5, zstd"})
+    assert response.headers["content-encoding"] == "zstd"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    body = zstandard.ZstdDecompressor().decompressobj().decompress(response.content)
+    assert len(json.loads(body)) == 500
+
+def test_small_response_is_not_compressed(client):
+    response = client.get("/api/tasks/1", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.json()["path"] == "/tasks/1"
+
+def test_upstream_compressed_body_passes_through(client):
+    response = client.get("/api/tasks/precompressed", headers={"Accept-Encoding": "br, gzip"})
+    # Not decompressed and not compressed a second time
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == b'{"already": "compressed"}' * 100
+
+def stream_decoder(encoding):
+    if encoding == "gzip":
+        import zlib
+        return zlib.decompressobj(31).decompress
+    if encoding == "br":
+        import brotli
+        return brotli.Decompressor().process
+    return zstandard.ZstdDecompressor().decompressobj().decompress
+
+@pytest.mark.parametrize("encoding", sorted(available_compressors()))
+@pytest.mark.parametrize("content_type,minimum_size", [("application/x-ndjson", 1024), ("application/json", 10)])
+def test_streamed_chunks_are_decodable_as_they_arrive(encoding, content_type, minimum_size):
+    sent = []
+    async def send(message):
+        sent.append(message)
+
+    responder = CompressionResponder(send, encoding, available_compressors()[encoding], minimum_size)
+    decode = stream_decoder(encoding)
+    chunks = [b'{"event": %d, "padding": "..."}\n' % i for i in range(5)]
+
+    async def scenario():
+        await responder({"type": "http.response.start", "status": 200,
+                         "headers": [(b"content-type", content_type.encode())]})
+        for chunk in chunks:
+            await responder({"type": "http.response.body", "body": chunk, "more_body": True})
+            # Everything sent so far must already decode to everything received so far
+            assert decode(sent[-1]["body"]) == chunk
+        await responder({"type": "http.response.body", "body": b"", "more_body": False})
+
+    asyncio.run(scenario())
+    assert dict(sent[0]["headers"])[b"content-encoding"] == encoding.encode()
+    assert len(sent) == len(chunks) + 2
+
+def test_negotiate_encoding():
+    preference = ["zstd", "br", "gzip"]
+    assert negotiate_encoding("gzip, br", preference) == "br"
+    assert negotiate_encoding("zstd;q=0, gzip", preference) == "gzip"
+    assert negotiate_encoding("*", preference) == "zstd"
+    assert negotiate_encoding("identity", preference) is None
+    assert negotiate_encoding(None, preference) is None
+
+def test_rate_limit_rules_first_match_wins():
+    rules = parse_rules("/api/auth/login=10/60:5,/api/tasks=20/1,/api=50/1:100")
+    limiter = RateLimiter(rules, InMemoryBuckets())
+    assert limiter.rule_for("/api/auth/login").burst == 5
+    assert limiter.rule_for("/api/tasks/1/comments").requests == 20
+    assert limiter.rule_for("/api/tasks/1/comments").burst == 20
+    assert limiter.rule_for("/api/tasksx").pattern == "/api"
+    assert limiter.rule_for("/health") is None
+
+def test_token_bucket_refills_over_time():
+    now = [0.0]
+    limiter = RateLimiter(parse_rules("/api=2/1:2"), InMemoryBuckets(clock=lambda: now[0]))
+    loop = asyncio.new_event_loop()
+    try:
+        check = lambda: loop.run_until_complete(limiter.check("user:1", "/api/tasks/1"))
+        assert check().allowed
+        assert check().remaining == 0
+        rejected = check()
+        assert not rejected.allowed
+        assert rejected.retry_after == pytest.approx(0.5)
+        now[0] += 0.5
+        assert check().allowed
+    finally:
+        loop.close()
+
+def test_rate_limit_rejects_with_headers_per_identity(client):
+    set_rate_limiter(RateLimiter(parse_rules("/api/tasks=2/60:2"), InMemoryBuckets()))
+    first = make_token()
+    other = make_token(sub="other@test.com", user_id=8)
+
+    responses = [client.get("/api/tasks/1", headers={"Authorization": f"Bearer {first}"}) for _ in range(3)]
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert responses[0].headers["ratelimit-limit"] == "2"
+    assert responses[0].headers["ratelimit-remaining"] == "1"
+    assert responses[0].headers["ratelimit-policy"] == "2;w=60;burst=2"
+    assert int(responses[2].headers["retry-after"]) == 30
+    # Rejected requests never reach the upstream
+    assert len(upstream_calls) == 2
+
+    # Another user has a budget of their own
+    assert client.get("/api/tasks/1", headers={"Authorization": f"Bearer {other}"}).status_code == 200
+    assert client.get("/health").status_code == 200
+
+def test_batch_sub_requests_are_rate_limited(client):
+    set_rate_limiter(RateLimiter(parse_rules("/api/batch=10/1,/api/tasks=2/60:2"), InMemoryBuckets()))
+    response = client.post("/api/batch", json={"requests": [{"path": f"/api/tasks/{i}"} for i in range(3)]})
+    assert response.status_code == 200
+    assert sorted(item["status"] for item in response.json()["responses"]) == [200, 200, 429]
+    assert len(upstream_calls) == 2
+
+def test_redis_rate_limit_falls_back_when_redis_is_down():
+    buckets = RedisBuckets("redis://127.0.0.1:1/0")
+    limiter = RateLimiter(parse_rules("/api=1/60:1"), buckets)
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(limiter.check("ip:1.2.3.4", "/api/tasks")).allowed
+        assert not loop.run_until_complete(limiter.check("ip:1.2.3.4", "/api/tasks")).allowed
+        loop.run_until_complete(limiter.close())
+    finally:
+        loop.close()
+    assert limiter.get_stats()["redis_errors_total"] == 2
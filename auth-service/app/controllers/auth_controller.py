@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Request
 from sqlalchemy.orm import Session
 from datetime import timedelta
 from app.db.database import get_db
-from app.schemas.user import UserCreate, UserLogin, UserResponse, TokenResponse, UserUpdate
+from app.schemas.user import (
+    UserCreate, UserLogin, UserResponse, TokenResponse, UserUpdate, TokenPayload,
+    UserLookupRequest, UserLookupResponse
+)
 from app.services.auth_service import AuthService, ACCESS_TOKEN_EXPIRE_MINUTES
 import logging
 
@@ -10,7 +13,12 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-def get_current_user(authorization: str = Header(None), db: Session = Depends(get_db)):
+def get_current_identity(request: Request, authorization: str = Header(None)) -> TokenPayload:
+    """Caller identity without a database lookup: gateway-verified headers first, then the bearer token"""
+    identity = AuthService.verify_identity_headers(request.headers)
+    if identity:
+        return identity
+
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing token")
     
@@ -18,16 +26,28 @@ def get_current_user(authorization: str = Header(None), db: Session = Depends(ge
     token_payload = AuthService.verify_token(token)
     if not token_payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    
-    user = AuthService.get_user_by_email(db, token_payload.sub)
+    return token_payload
+
+def get_current_user(identity: TokenPayload = Depends(get_current_identity), db: Session = Depends(get_db)):
+    if identity.user_id is not None:
+        user = AuthService.get_user_by_id(db, identity.user_id)
+    else:
+        user = AuthService.get_user_by_email(db, identity.sub)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return user
 
-def require_admin(current_user = Depends(get_current_user)):
-    if current_user.role != "admin":
+def require_admin_role(identity: TokenPayload = Depends(get_current_identity)):
+    """Admin check on the verified role claim alone; only for read-only admin endpoints"""
+    if identity.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
-    return current_user
+    return identity
+
+def require_admin(user = Depends(get_current_user)):
+    """Admin check against the database, so a demoted or deactivated admin loses access before the token expires"""
+    if user.role != "admin" or not user.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return user
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(user: UserCreate, db: Session = Depends(get_db)):
@@ -73,7 +93,7 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = AuthService.create_access_token(
-        data={"sub": user.email, "role": user.role},
+        data={"sub": user.email, "role": user.role, "user_id": user.id},
         expires_delta=access_token_expires
     )
     
@@ -98,8 +118,18 @@ async def get_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_d
     users = AuthService.get_all_users(db, skip, limit)
     return users
 
+@router.post("/users/lookup", response_model=UserLookupResponse)
+async def lookup_users(lookup: UserLookupRequest, db: Session = Depends(get_db)):
+    """Active status of many users in one round trip (used by other services to validate assignees)"""
+    users = AuthService.get_users_by_ids(db, lookup.ids)
+    found = {user.id for user in users}
+    return {
+        "users": users,
+        "missing": [user_id for user_id in dict.fromkeys(lookup.ids) if user_id not in found]
+    }
+
 @router.get("/users/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int, admin_user = Depends(require_admin), db: Session = Depends(get_db)):
+async def get_user(user_id: int, admin_user = Depends(require_admin_role), db: Session = Depends(get_db)):
     user = AuthService.get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -33,6 +33,21 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class UserLookupRequest(BaseModel):
+    ids: List[int] = Field(..., max_length=500)
+
+class UserStatusResponse(BaseModel):
+    id: int
+    full_name: str
+    is_active: bool
+
+    class Config:
+        from_attributes = True
+
+class UserLookupResponse(BaseModel):
+    users: List[UserStatusResponse]
+    missing: List[int]
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
@@ -45,4 +60,5 @@ class TokenResponse(BaseModel):
 class TokenPayload(BaseModel):
     sub: str
     exp: int
-    role: str
+    role: Optional[str] = None
+    user_id: Optional[int] = None
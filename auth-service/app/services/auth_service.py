@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Mapping
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
@@ -8,6 +8,9 @@ from app.schemas.user import UserCreate, UserLogin, TokenPayload
 import os
 import logging
 import sys
+import hmac
+import hashlib
+import time
 
 # Add parent directory to path for importing shared_events
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
@@ -16,6 +19,7 @@ from shared_events import Event, EventType, get_event_bus
 logger = logging.getLogger(__name__)
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
+IDENTITY_SIGNING_KEY = os.getenv("IDENTITY_SIGNING_KEY", "your-identity-signing-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
@@ -50,10 +54,39 @@ class AuthService:
             role: str = payload.get("role")
             if email is None:
                 return None
-            return TokenPayload(sub=email, exp=payload.get("exp"), role=role)
+            return TokenPayload(sub=email, exp=payload.get("exp"), role=role, user_id=payload.get("user_id"))
         except JWTError:
             return None
 
+    @staticmethod
+    def sign_identity(user_id: Optional[int], email: str, role: Optional[str], exp: int) -> str:
+        """HMAC of identity headers, must match sign_identity() in the API gateway"""
+        message = f"{user_id or ''}|{email}|{role or ''}|{exp}"
+        return hmac.new(IDENTITY_SIGNING_KEY.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def verify_identity_headers(headers: Mapping[str, str]) -> Optional[TokenPayload]:
+        """
+        Identity already verified by the API gateway (X-User-* headers).
+        Returns None if the headers are missing, forged or expired.
+        """
+        signature = headers.get("x-identity-signature")
+        email = headers.get("x-user-email")
+        exp = headers.get("x-user-exp")
+        if not signature or not email or not exp:
+            return None
+        user_id = headers.get("x-user-id") or None
+        role = headers.get("x-user-role") or None
+        try:
+            exp = int(exp)
+            user_id = int(user_id) if user_id else None
+        except ValueError:
+            return None
+        expected = AuthService.sign_identity(user_id, email, role, exp)
+        if not hmac.compare_digest(expected, signature) or exp < time.time():
+            return None
+        return TokenPayload(sub=email, exp=exp, role=role, user_id=user_id)
+
     @staticmethod
     def authenticate_user(db: Session, email: str, password: str) -> tuple[Optional[User], Optional[str]]:
         """Authenticate user. Returns (user, error_message) tuple."""
@@ -66,6 +99,32 @@ class AuthService:
             return None, "Account is inactive. Please contact administrator"
         return user, None
 
+    @staticmethod
+    def user_event_data(user: User) -> dict:
+        return {
+            "email": user.email,
+            "full_name": user.full_name,
+            "role": user.role,
+            "user_id": user.id,
+            "is_active": bool(user.is_active)
+        }
+
+    @staticmethod
+    def publish_user_event(event_type: EventType, data: dict):
+        """USER_* event with the user's state (user_event_data); failures are logged, never raised"""
+        try:
+            event_bus = get_event_bus()
+            event = Event(
+                event_type=event_type,
+                aggregate_id=str(data["user_id"]),
+                aggregate_type="user",
+                data=data
+            )
+            event_bus.publish(event)
+            logger.info(f"✓ {event_type.name} event published for user: {data['email']}")
+        except Exception as e:
+            logger.error(f"✗ Failed to publish {event_type.name} event: {e}")
+
     @staticmethod
     def register_user(db: Session, user_create: UserCreate) -> User:
         existing_user = db.query(User).filter(User.email == user_create.email).first()
@@ -84,24 +143,7 @@ class AuthService:
         db.commit()
         db.refresh(db_user)
         
-        # Publish USER_CREATED event
-        try:
-            event_bus = get_event_bus()
-            event = Event(
-                event_type=EventType.USER_CREATED,
-                aggregate_id=str(db_user.id),
-                aggregate_type="user",
-                data={
-                    "email": db_user.email,
-                    "full_name": db_user.full_name,
-                    "role": db_user.role,
-                    "user_id": db_user.id
-                }
-            )
-            event_bus.publish(event)
-            logger.info(f"✓ USER_CREATED event published for user: {db_user.email}")
-        except Exception as e:
-            logger.error(f"✗ Failed to publish USER_CREATED event: {e}")
+        AuthService.publish_user_event(EventType.USER_CREATED, AuthService.user_event_data(db_user))
         
         return db_user
 
@@ -113,9 +155,17 @@ class AuthService:
     def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
         return db.query(User).filter(User.id == user_id).first()
 
+    @staticmethod
+    def get_users_by_ids(db: Session, user_ids: list) -> list:
+        """All users with the given ids in one query; unknown ids are skipped"""
+        if not user_ids:
+            return []
+        return db.query(User).filter(User.id.in_(set(user_ids))).order_by(User.id).all()
+
     @staticmethod
     def get_all_users(db: Session, skip: int = 0, limit: int = 100):
-        return db.query(User).offset(skip).limit(limit).all()
+        # Stable order: offset pages are walked by other services (tasks-service user replica)
+        return db.query(User).order_by(User.id).offset(skip).limit(limit).all()
 
     @staticmethod
     def update_user(db: Session, user_id: int, email: Optional[str] = None, 
@@ -133,6 +183,7 @@ class AuthService:
         
         db.commit()
         db.refresh(user)
+        AuthService.publish_user_event(EventType.USER_UPDATED, AuthService.user_event_data(user))
         return user
 
     @staticmethod
@@ -140,8 +191,11 @@ class AuthService:
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
             return False
+        # Captured before the commit expires the deleted instance
+        event_data = AuthService.user_event_data(user)
         db.delete(user)
         db.commit()
+        AuthService.publish_user_event(EventType.USER_DELETED, event_data)
         return True
 
     @staticmethod
@@ -154,6 +208,7 @@ class AuthService:
         db.commit()
         db.refresh(user)
         logger.info(f"User {user.email} active status changed to {bool(user.is_active)}")
+        AuthService.publish_user_event(EventType.USER_UPDATED, AuthService.user_event_data(user))
         return user
 
     @staticmethod
@@ -166,4 +221,5 @@ class AuthService:
         db.commit()
         db.refresh(user)
         logger.info(f"User {user.email} active status set to {is_active}")
+        AuthService.publish_user_event(EventType.USER_UPDATED, AuthService.user_event_data(user))
         return user
@@ -2,11 +2,12 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 import logging.config
-from app.db.database import init_db
+from app.db.database import init_db, get_db_pool_stats
 from app.controllers.auth_controller import router as auth_router
 from app.services.auth_service import AuthService
 from app.db.database import SessionLocal
 from app.models.user import User, UserRole
+from shared_db import QueryProfilingMiddleware, get_query_metrics
 
 # Configure logging with GMT+3 timezone
 logging_config = {
@@ -54,6 +55,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Added last so it wraps the whole stack: Server-Timing header and per-route SQL stats
+app.add_middleware(QueryProfilingMiddleware)
+
 @app.on_event("startup")
 async def startup():
     # Skip init_db if in test environment
@@ -84,6 +88,16 @@ app.include_router(auth_router)
 async def health():
     return {"status": "ok", "service": "auth-service"}
 
+@app.get("/metrics/db")
+async def db_metrics():
+    """Connection pool usage: connections in use, overflow and checkout wait"""
+    return get_db_pool_stats()
+
+@app.get("/metrics/queries")
+async def query_metrics():
+    """SQL statements and DB time per route template"""
+    return get_query_metrics()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -9,7 +9,9 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app.db.database import Base, get_db
+from app.services.auth_service import AuthService
 from main import app
+import time
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
 engine = create_engine(
@@ -186,3 +188,99 @@ def test_verify_invalid_token(db):
         headers={"Authorization": "Bearer invalidtoken"}
     )
     assert response.status_code == 401
+
+def register_and_login(email, password="pass123", role="user"):
+    client.post(
+        "/auth/register",
+        json={
+            "email": email,
+            "password": password,
+            "full_name": "Identity User",
+            "role": role
+        }
+    )
+    return client.post("/auth/login", json={"email": email, "password": password}).json()
+
+def identity_headers(user_id, email, role, exp=None):
+    exp = exp or int(time.time()) + 600
+    return {
+        "X-User-Id": str(user_id),
+        "X-User-Email": email,
+        "X-User-Role": role,
+        "X-User-Exp": str(exp),
+        "X-Identity-Signature": AuthService.sign_identity(user_id, email, role, exp)
+    }
+
+def admin_identity_headers(email="boss@test.com"):
+    """Signed headers for an admin that exists in the database"""
+    user_id = register_and_login(email, role="admin")["user"]["id"]
+    return identity_headers(user_id, email, "admin")
+
+def test_token_contains_user_id(db):
+    login = register_and_login("claims@test.com")
+    payload = AuthService.verify_token(login["access_token"])
+    assert payload.user_id == login["user"]["id"]
+
+def test_gateway_identity_headers_accepted(db):
+    login = register_and_login("edge@test.com")
+    user_id = login["user"]["id"]
+    response = client.get("/auth/me", headers=identity_headers(user_id, "edge@test.com", "user"))
+    assert response.status_code == 200
+    assert response.json()["id"] == user_id
+
+def test_forged_identity_headers_rejected(db):
+    headers = identity_headers(1, "admin@admin.admin", "admin")
+    headers["X-User-Role"] = "user"
+    response = client.get("/auth/me", headers=headers)
+    assert response.status_code == 401
+
+def test_admin_check_uses_verified_role(db):
+    login = register_and_login("plain@test.com")
+    user_id = login["user"]["id"]
+    response = client.get(f"/auth/users/{user_id}", headers=identity_headers(user_id, "plain@test.com", "user"))
+    assert response.status_code == 403
+    response = client.get(f"/auth/users/{user_id}", headers=identity_headers(99, "boss@test.com", "admin"))
+    assert response.status_code == 200
+
+def test_admin_mutations_check_the_database(db):
+    user_id = register_and_login("target@test.com")["user"]["id"]
+    # A validly signed admin claim for a user that does not exist is not enough
+    ghost = identity_headers(99, "ghost@test.com", "admin")
+    assert client.delete(f"/auth/users/{user_id}", headers=ghost).status_code == 404
+
+    admin = admin_identity_headers()
+    admin_id = int(admin["X-User-Id"])
+    assert client.put(f"/auth/users/{admin_id}", json={"role": "user"}, headers=admin).status_code == 200
+    # The demoted admin's claim still says "admin" but the database does not
+    assert client.delete(f"/auth/users/{user_id}", headers=admin).status_code == 403
+    assert client.get(f"/auth/users/{user_id}", headers=admin_identity_headers("other@test.com")).status_code == 200
+
+def test_bulk_user_lookup(db):
+    active = register_and_login("active@test.com")["user"]["id"]
+    inactive = register_and_login("inactive@test.com")["user"]["id"]
+    client.put(f"/auth/users/{inactive}/set-active", params={"is_active": False}, headers=admin_identity_headers())
+
+    response = client.post("/auth/users/lookup", json={"ids": [inactive, active, 404, active]})
+    assert response.status_code == 200
+    data = response.json()
+    assert [(user["id"], user["is_active"]) for user in data["users"]] == [(active, True), (inactive, False)]
+    assert data["missing"] == [404]
+    assert "email" not in data["users"][0]
+
+    assert client.post("/auth/users/lookup", json={"ids": list(range(501))}).status_code == 422
+
+def test_user_changes_publish_events(db, monkeypatch):
+    from shared_events import EventType
+    admin = admin_identity_headers()
+    published = []
+    monkeypatch.setattr(AuthService, "publish_user_event", lambda event_type, data: published.append((event_type, data)))
+    user_id = register_and_login("events@test.com")["user"]["id"]
+
+    client.put(f"/auth/users/{user_id}/set-active", params={"is_active": False}, headers=admin)
+    client.delete(f"/auth/users/{user_id}", headers=admin)
+
+    assert [event_type for event_type, _ in published] == [
+        EventType.USER_CREATED, EventType.USER_UPDATED, EventType.USER_DELETED
+    ]
+    assert published[1][1]["is_active"] is False
+    assert published[2][1]["user_id"] == user_id
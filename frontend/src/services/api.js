@@ -77,4 +77,11 @@ api.interceptors.response.use(
   }
 )
 
+// Several gateway calls in one round trip.
+// requests: [{ id, method, path, body }], paths are relative to baseURL ('/tasks/1/comments')
+api.batch = async (requests) => {
+  const response = await api.post('/batch', { requests })
+  return response.data.responses
+}
+
 export default api
@@ -34,6 +34,26 @@ export const useCommentsStore = defineStore('comments', () => {
     }
   }
 
+  // Comments and history in a single gateway round trip
+  const fetchActivity = async (taskId) => {
+    loading.value = true
+    try {
+      const responses = await api.batch([
+        { id: 'comments', path: `/tasks/${taskId}/comments` },
+        { id: 'history', path: `/tasks/${taskId}/history` }
+      ])
+      const byId = Object.fromEntries(responses.map(item => [item.id, item]))
+      comments.value = byId.comments?.status === 200 ? byId.comments.body || [] : []
+      history.value = byId.history?.status === 200 ? byId.history.body || [] : []
+    } catch (error) {
+      console.error('Failed to fetch task activity:', error)
+      comments.value = []
+      history.value = []
+    } finally {
+      loading.value = false
+    }
+  }
+
   const addComment = async (taskId, text) => {
     try {
       const authStore = useAuthStore()
@@ -62,6 +82,7 @@ export const useCommentsStore = defineStore('comments', () => {
     loading,
     fetchComments,
     fetchHistory,
+    fetchActivity,
     addComment,
     clearComments
   }
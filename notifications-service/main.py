@@ -2,9 +2,10 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 import logging.config
-from app.db.database import init_db
+from app.db.database import init_db, get_db_pool_stats
 from app.controllers.notification_controller import router as notification_router
 from app.services.redis_client import RedisClient
+from shared_db import QueryProfilingMiddleware, get_query_metrics
 
 # Configure logging with GMT+3 timezone
 logging_config = {
@@ -52,6 +53,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Added last so it wraps the whole stack: Server-Timing header and per-route SQL stats
+app.add_middleware(QueryProfilingMiddleware)
+
 @app.on_event("startup")
 async def startup():
     init_db()
@@ -76,6 +80,16 @@ app.include_router(notification_router)
 async def health():
     return {"status": "ok", "service": "notifications-service"}
 
+@app.get("/metrics/db")
+async def db_metrics():
+    """Connection pool usage: connections in use, overflow and checkout wait"""
+    return get_db_pool_stats()
+
+@app.get("/metrics/queries")
+async def query_metrics():
+    """SQL statements and DB time per route template"""
+    return get_query_metrics()
+
 @app.get("/health/ready")
 async def readiness():
     """Readiness probe - checks dependencies"""
@@ -0,0 +1,8 @@
+"""Shared database helpers for microservices"""
+from .engine import create_pooled_async_engine, create_pooled_engine, get_pool_stats, pool_settings, to_async_url
+from .profiling import QueryProfilingMiddleware, get_query_metrics, instrument_engine, profile_queries
+
+__all__ = [
+    "create_pooled_async_engine", "create_pooled_engine", "get_pool_stats", "pool_settings", "to_async_url",
+    "QueryProfilingMiddleware", "get_query_metrics", "instrument_engine", "profile_queries",
+]
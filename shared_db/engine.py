@@ -0,0 +1,215 @@
+"""
+Pooled SQLAlchemy engine factory shared by the services.
+
+Connections are kept in a QueuePool instead of being opened per request.
+Settings come from env:
+
+    DB_POOL_SIZE          persistent connections per process (5)
+    DB_MAX_OVERFLOW       extra connections under burst load (10)
+    DB_POOL_TIMEOUT       seconds to wait for a free connection (30)
+    DB_POOL_RECYCLE       seconds before a connection is replaced (1800)
+    DB_POOL_PRE_PING      test connections on checkout (true)
+    DB_CONNECT_TIMEOUT    seconds to establish a new connection (5)
+    DB_QUERY_CACHE_SIZE   compiled statement cache entries (500)
+    DB_PGBOUNCER          PgBouncer transaction pooling compatibility (false):
+                          server-side prepared statements are disabled
+
+create_pooled_async_engine() builds the AsyncEngine equivalent (asyncpg /
+aiosqlite) with the same settings; to_async_url() maps a sync DATABASE_URL
+to its async driver.
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(key: str, default: str) -> str:
+    return os.getenv(f"DB_{key}", default)
+
+
+def _flag(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes")
+
+
+def pool_settings() -> Dict[str, Any]:
+    """Pool settings read from env"""
+    return {
+        "pool_size": int(_setting("POOL_SIZE", "5")),
+        "max_overflow": int(_setting("MAX_OVERFLOW", "10")),
+        "pool_timeout": float(_setting("POOL_TIMEOUT", "30")),
+        "pool_recycle": int(_setting("POOL_RECYCLE", "1800")),
+        "pool_pre_ping": _flag(_setting("POOL_PRE_PING", "true")),
+        "connect_timeout": int(_setting("CONNECT_TIMEOUT", "5")),
+        "query_cache_size": int(_setting("QUERY_CACHE_SIZE", "500")),
+        "pgbouncer": _flag(_setting("PGBOUNCER", "false")),
+    }
+
+
+@dataclass
+class PoolMetrics:
+    """Checkout counters for one pool"""
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_time_total: float = 0.0
+    wait_time_max: float = 0.0
+
+    def __post_init__(self):
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float, timed_out: bool = False):
+        with self.lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_time_total += seconds
+            self.wait_time_max = max(self.wait_time_max, seconds)
+
+
+class _CheckoutMetricsMixin:
+    """Records how long each checkout waited for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedQueuePool(_CheckoutMetricsMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_CheckoutMetricsMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def to_async_url(database_url: str) -> str:
+    """postgresql://... → postgresql+asyncpg://..., sqlite://... → sqlite+aiosqlite://..."""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS or url.get_driver_name() == ASYNC_DRIVERS[backend]:
+        return database_url
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def _connect_args(driver: str, settings: Dict[str, Any]) -> Dict[str, Any]:
+    if driver.startswith("sqlite"):
+        return {"check_same_thread": False}
+    args: Dict[str, Any] = {}
+    if driver in ("psycopg2", "psycopg"):
+        args["connect_timeout"] = settings["connect_timeout"]
+    elif driver == "asyncpg":
+        args["timeout"] = settings["connect_timeout"]
+    if settings["pgbouncer"]:
+        # Prepared statements live on one server connection, PgBouncer may hand us another.
+        # psycopg2 never prepares server-side, nothing to disable there.
+        if driver == "asyncpg":
+            args["statement_cache_size"] = 0
+            args["prepared_statement_cache_size"] = 0
+        elif driver == "psycopg":
+            args["prepare_threshold"] = None
+    return args
+
+
+def engine_options(database_url: str, use_async: bool = False) -> Dict[str, Any]:
+    """create_engine() / create_async_engine() keyword arguments for a pooled engine"""
+    settings = pool_settings()
+    url = make_url(database_url)
+    driver = url.get_driver_name() if url.get_backend_name() != "sqlite" else "sqlite"
+
+    options: Dict[str, Any] = {
+        "echo": False,
+        "query_cache_size": settings["query_cache_size"],
+        "connect_args": _connect_args(driver, settings),
+    }
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite lives in one connection, keep SQLAlchemy's default pool
+        return options
+
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if use_async else InstrumentedQueuePool,
+        pool_size=settings["pool_size"],
+        max_overflow=settings["max_overflow"],
+        pool_timeout=settings["pool_timeout"],
+        pool_recycle=settings["pool_recycle"],
+        pool_pre_ping=settings["pool_pre_ping"],
+    )
+    return options
+
+
+def _log_pool(engine: Engine, options: Dict[str, Any]):
+    if isinstance(engine.pool, QueuePool):
+        logger.info(
+            f"✓ DB pool: size={options['pool_size']} overflow={options['max_overflow']} "
+            f"timeout={options['pool_timeout']}s recycle={options['pool_recycle']}s "
+            f"pgbouncer={pool_settings()['pgbouncer']}"
+        )
+
+
+def create_pooled_engine(database_url: str, **overrides) -> Engine:
+    options = engine_options(database_url)
+    options.update(overrides)
+    engine = create_engine(database_url, **options)
+    _log_pool(engine, options)
+    return engine
+
+
+def create_pooled_async_engine(database_url: str, **overrides) -> AsyncEngine:
+    """AsyncEngine with the same pool settings; database_url may use a sync driver"""
+    database_url = to_async_url(database_url)
+    options = engine_options(database_url, use_async=True)
+    options.update(overrides)
+    engine = create_async_engine(database_url, **options)
+    _log_pool(engine.sync_engine, options)
+    return engine
+
+
+def get_pool_stats(engine) -> Dict[str, Any]:
+    """Pool usage for an Engine (or AsyncEngine)"""
+    pool = getattr(engine, "sync_engine", engine).pool
+    stats: Dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update({
+            "checkouts_total": metrics.checkouts,
+            "checkout_timeouts_total": metrics.timeouts,
+            "checkout_wait_avg_ms": round(metrics.wait_time_total / metrics.checkouts * 1000, 3) if metrics.checkouts else 0.0,
+            "checkout_wait_max_ms": round(metrics.wait_time_max * 1000, 3),
+        })
+    return stats
@@ -0,0 +1,262 @@
+"""
+Per-request SQL profiling shared by the services.
+
+instrument_engine() hooks before/after_cursor_execute on an Engine (or the
+sync_engine of an AsyncEngine). QueryProfilingMiddleware opens a QueryProfile
+for every HTTP request in a contextvar; each statement executed while the
+request is handled, on the event loop or in the threadpool (run_in_threadpool
+copies the context), is counted against it.
+
+Per request:
+    Server-Timing: db;dur=12.4;desc="7 queries", app;dur=20.1
+    a WARNING with the slowest statements when the request runs more than
+    SQL_PROFILE_MAX_QUERIES statements or spends more than
+    SQL_PROFILE_SLOW_REQUEST_MS in the database
+
+Per route template ("GET /tasks/{task_id}"): histograms of statement count
+and DB time, returned by get_query_metrics() (served at /metrics/queries).
+
+Settings come from env:
+
+    SQL_PROFILE_ENABLED          profile requests (true)
+    SQL_PROFILE_SLOW_QUERY_MS    a single statement slower than this is logged (100)
+    SQL_PROFILE_SLOW_REQUEST_MS  DB time per request before it is logged (500)
+    SQL_PROFILE_MAX_QUERIES      statements per request before it is logged (30)
+    SQL_PROFILE_TOP_N            slowest statements kept per request (3)
+
+profile_queries() profiles any block outside a request (scripts, tests).
+"""
+
+import heapq
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENABLED = os.getenv("SQL_PROFILE_ENABLED", "true").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SQL_PROFILE_SLOW_QUERY_MS", "100"))
+SLOW_REQUEST_MS = float(os.getenv("SQL_PROFILE_SLOW_REQUEST_MS", "500"))
+MAX_QUERIES = int(os.getenv("SQL_PROFILE_MAX_QUERIES", "30"))
+TOP_N = int(os.getenv("SQL_PROFILE_TOP_N", "3"))
+
+# Upper bounds of the histogram buckets, the last bucket is +Inf
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+DB_TIME_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+_STATEMENT_LOG_LENGTH = 300
+
+
+def _shorten(statement: str) -> str:
+    statement = " ".join(statement.split())
+    if len(statement) > _STATEMENT_LOG_LENGTH:
+        return statement[:_STATEMENT_LOG_LENGTH] + "..."
+    return statement
+
+
+class QueryProfile:
+    """Statements executed within one request (or profile_queries() block)"""
+
+    def __init__(self, top_n: int = TOP_N):
+        self.top_n = top_n
+        self.count = 0
+        self.duration = 0.0
+        self._slowest: List[Tuple[float, int, str]] = []  # min-heap of the top_n slowest
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        entry = (duration, self.count, statement)
+        if len(self._slowest) < self.top_n:
+            heapq.heappush(self._slowest, entry)
+        elif self._slowest and duration > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration * 1000
+
+    def slowest(self) -> List[Tuple[float, str]]:
+        """(milliseconds, statement), slowest first"""
+        return [(duration * 1000, statement) for duration, _, statement in sorted(self._slowest, reverse=True)]
+
+    def server_timing(self, elapsed: float) -> str:
+        return (f'db;dur={self.duration_ms:.1f};desc="{self.count} queries", '
+                f'app;dur={elapsed * 1000:.1f}')
+
+
+_current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("sql_query_profile", default=None)
+
+
+def get_current_profile() -> Optional[QueryProfile]:
+    return _current_profile.get()
+
+
+@contextmanager
+def profile_queries(top_n: int = TOP_N):
+    """Profile the statements run inside the block on instrumented engines"""
+    profile = QueryProfile(top_n)
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_profile_started", None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(statement, duration)
+    if duration * 1000 >= SLOW_QUERY_MS:
+        logger.warning(f"✗ Slow query ({duration * 1000:.1f} ms): {_shorten(statement)}")
+
+
+def instrument_engine(engine):
+    """Count and time every statement on an Engine or AsyncEngine; safe to call twice"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and max"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative, running = {}, 0
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            running += count
+            cumulative[bound] = running
+        return {"buckets": cumulative, "sum": round(self.total, 3), "max": round(self.max, 3)}
+
+
+class RouteQueryStats:
+    """Query count and DB time histograms per route template"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes: Dict[str, Dict[str, Any]] = {}
+
+    def observe(self, route: str, profile: QueryProfile):
+        with self.lock:
+            stats = self.routes.get(route)
+            if stats is None:
+                stats = self.routes[route] = {
+                    "requests": 0,
+                    "queries": Histogram(QUERY_COUNT_BUCKETS),
+                    "db_time_ms": Histogram(DB_TIME_BUCKETS_MS),
+                }
+            stats["requests"] += 1
+            stats["queries"].observe(profile.count)
+            stats["db_time_ms"].observe(profile.duration_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                route: {
+                    "requests": stats["requests"],
+                    "queries": stats["queries"].snapshot(),
+                    "db_time_ms": stats["db_time_ms"].snapshot(),
+                }
+                for route, stats in sorted(self.routes.items())
+            }
+
+    def reset(self):
+        with self.lock:
+            self.routes.clear()
+
+
+_route_stats = RouteQueryStats()
+
+
+def get_query_metrics() -> Dict[str, Any]:
+    return {
+        "slow_query_ms": SLOW_QUERY_MS,
+        "slow_request_ms": SLOW_REQUEST_MS,
+        "max_queries": MAX_QUERIES,
+        "routes": _route_stats.snapshot(),
+    }
+
+
+def reset_query_metrics():
+    _route_stats.reset()
+
+
+def _route_template(scope: Scope) -> str:
+    # The router stores the matched route in the (shared) scope; unmatched paths are grouped
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "unmatched"
+    return f"{scope.get('method', '')} {path}"
+
+
+class QueryProfilingMiddleware:
+    """
+    Pure ASGI middleware. Add it last so it wraps the whole stack. Statements
+    issued after the response headers went out (streamed bodies) are still
+    counted in the histograms, just not in Server-Timing.
+    """
+
+    def __init__(self, app: ASGIApp, enabled: bool = PROFILE_ENABLED, stats: Optional[RouteQueryStats] = None):
+        self.app = app
+        self.enabled = enabled
+        self.stats = stats or _route_stats
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", profile.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_profile.reset(token)
+            self._finish(scope, profile, time.perf_counter() - started)
+
+    def _finish(self, scope: Scope, profile: QueryProfile, elapsed: float):
+        route = _route_template(scope)
+        self.stats.observe(route, profile)
+        if profile.count > MAX_QUERIES or profile.duration_ms > SLOW_REQUEST_MS:
+            slowest = "; ".join(f"{ms:.1f} ms {_shorten(statement)}" for ms, statement in profile.slowest())
+            logger.warning(
+                f"✗ {route}: {profile.count} queries, {profile.duration_ms:.1f} ms in DB "
+                f"of {elapsed * 1000:.1f} ms; slowest: {slowest}"
+            )
@@ -12,6 +12,8 @@ from dataclasses import dataclass, asdict
 from enum import Enum
 import redis
 import os
+import threading
+import time
 from abc import ABC, abstractmethod
 
 logger = logging.getLogger(__name__)
@@ -90,7 +92,35 @@ class EventBus:
         """
         stream_key = f"events:{event.event_type.value}"
         
-        event_data = {
+        try:
+            event_id = self.redis_client.xadd(stream_key, self._encode_event(event))
+            logger.info(f"✓ Event published: {event.event_type.value} (ID: {event_id})")
+            return event_id
+        except Exception as e:
+            logger.error(f"✗ Failed to publish event: {e}")
+            raise
+    
+    def publish_many(self, events: List[Event]) -> List[str]:
+        """
+        Publish events in one pipelined round trip (no MULTI, order is kept per stream).
+        Returns event IDs in the order of events.
+        """
+        if not events:
+            return []
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for event in events:
+            pipeline.xadd(f"events:{event.event_type.value}", self._encode_event(event))
+        try:
+            event_ids = pipeline.execute()
+            logger.info(f"✓ {len(event_ids)} events published in one batch")
+            return event_ids
+        except Exception as e:
+            logger.error(f"✗ Failed to publish {len(events)} events: {e}")
+            raise
+
+    @staticmethod
+    def _encode_event(event: Event) -> Dict[str, str]:
+        return {
             "type": event.event_type.value,
             "aggregate_id": event.aggregate_id,
             "aggregate_type": event.aggregate_type,
@@ -98,14 +128,6 @@ class EventBus:
             "timestamp": event.timestamp,
             "retries": "0"
         }
-        
-        try:
-            event_id = self.redis_client.xadd(stream_key, event_data)
-            logger.info(f"✓ Event published: {event.event_type.value} (ID: {event_id})")
-            return event_id
-        except Exception as e:
-            logger.error(f"✗ Failed to publish event: {e}")
-            raise
     
     def subscribe(self, event_type: EventType, handler: Callable):
         """Subscribe to a specific event type"""
@@ -163,6 +185,91 @@ class EventBus:
             except Exception as e:
                 logger.error(f"✗ Error consuming events: {e}")
     
+    @staticmethod
+    def decode_message(msg_data: Dict[str, str]) -> Event:
+        """Event from a stream entry; raises KeyError/ValueError on a malformed payload"""
+        return Event(
+            event_type=EventType(msg_data["type"]),
+            aggregate_id=msg_data["aggregate_id"],
+            aggregate_type=msg_data["aggregate_type"],
+            data=json.loads(msg_data["data"]),
+            timestamp=msg_data["timestamp"]
+        )
+
+    def listen(self, event_types: List[EventType], handler: Callable, stop: threading.Event = None,
+               block_ms: int = 5000):
+        """
+        Broadcast consumption: every listener sees every new event, there is no
+        consumer group, ack or retry. Meant for per-process state such as cache
+        invalidation; events published while the listener was down are not replayed.
+        Blocks until stop is set.
+        """
+        positions = {f"events:{event_type.value}": "$" for event_type in event_types}
+        while stop is None or not stop.is_set():
+            try:
+                messages = self.redis_client.xread(positions, block=block_ms)
+                for stream, event_messages in messages or []:
+                    for msg_id, msg_data in event_messages:
+                        positions[stream] = msg_id
+                        try:
+                            handler(self.decode_message(msg_data))
+                        except Exception as e:
+                            logger.error(f"✗ Event listener failed on {msg_id}: {e}")
+            except Exception as e:
+                logger.error(f"✗ Error listening for events: {e}")
+                time.sleep(1)
+
+    def ensure_group(self, event_types: List[EventType], consumer_group: str, start_id: str = "$") -> bool:
+        """
+        Create the consumer group on each stream; start_id "$" skips history, "0" replays it.
+        Returns True when any group was created (the consumer is starting fresh).
+        """
+        created = False
+        for event_type in event_types:
+            try:
+                self.redis_client.xgroup_create(f"events:{event_type.value}", consumer_group, id=start_id, mkstream=True)
+                created = True
+            except redis.ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+        return created
+
+    def read_group(self, event_types: List[EventType], consumer_group: str, consumer_name: str,
+                   count: int = 100, block_ms: int = 5000, pending: bool = False) -> List[tuple]:
+        """
+        One XREADGROUP over several streams. pending=True re-reads entries delivered to
+        this consumer but never acknowledged (a crash between read and ack).
+        Returns [(stream_key, msg_id, msg_data)] undecoded, so one malformed payload does
+        not fail the whole batch; decode each with decode_message() and acknowledge
+        them with ack(). Pending entries trimmed from the stream are acknowledged here.
+        """
+        streams = {f"events:{event_type.value}": "0" if pending else ">" for event_type in event_types}
+        messages = self.redis_client.xreadgroup(
+            groupname=consumer_group,
+            consumername=consumer_name,
+            streams=streams,
+            count=count,
+            block=None if pending else block_ms
+        )
+        entries, trimmed = [], []
+        for stream, event_messages in messages or []:
+            for msg_id, msg_data in event_messages:
+                if not msg_data:
+                    # Pending entry trimmed from the stream: nothing left to process, but
+                    # without an ack it stays in the PEL and is re-read on every restart
+                    trimmed.append((stream, msg_id, msg_data))
+                    continue
+                entries.append((stream, msg_id, msg_data))
+        if trimmed:
+            logger.warning(f"⚠ Acknowledging {len(trimmed)} pending entries trimmed from the stream")
+            self.ack(consumer_group, trimmed)
+        return entries
+
+    def ack(self, consumer_group: str, entries: List[tuple]):
+        """Acknowledge entries returned by read_group"""
+        for stream, msg_id, _ in entries:
+            self.redis_client.xack(stream, consumer_group, msg_id)
+
     def _process_event(self, msg_data: Dict[str, str], stream_key: str, consumer_group: str, msg_id: str):
         """Process a single event"""
         event_type = EventType(msg_data["type"])
@@ -196,17 +303,22 @@ class EventBus:
             self.redis_client.xack(stream_key, consumer_group, msg_id)
         else:
             # Max retries exceeded - send to DLQ
-            dlq_data = {
-                **msg_data,
-                "original_id": msg_id,
-                "error": error,
-                "failed_at": datetime.utcnow().isoformat()
-            }
-            dlq_id = self.redis_client.xadd(self.dlq_stream, dlq_data)
-            logger.error(f"✗ Event moved to DLQ: {msg_id} → {dlq_id}. Error: {error}")
+            self.dead_letter(msg_data, msg_id, error)
             
             # Acknowledge original message
             self.redis_client.xack(stream_key, consumer_group, msg_id)
+
+    def dead_letter(self, msg_data: Dict[str, str], msg_id: str, error: str) -> str:
+        """Copy an entry to the DLQ; the caller still acknowledges the original"""
+        dlq_data = {
+            **msg_data,
+            "original_id": msg_id,
+            "error": error,
+            "failed_at": datetime.utcnow().isoformat()
+        }
+        dlq_id = self.redis_client.xadd(self.dlq_stream, dlq_data)
+        logger.error(f"✗ Event moved to DLQ: {msg_id} → {dlq_id}. Error: {error}")
+        return dlq_id
     
     def get_dlq_messages(self, count: int = 100) -> List[Dict[str, Any]]:
         """Retrieve messages from Dead Letter Queue"""
@@ -1,29 +1,123 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
 from app.db.database import get_db
+from app.models.task import Comment, History
 from app.schemas.task import (
     TaskCreate, TaskUpdate, TaskResponse, CommentCreate, CommentResponse,
-    HistoryResponse, TaskStatus, WorkerCompletionResponse
+    HistoryResponse, TaskStatus, TaskPriority, WorkerCompletionResponse, TaskPageResponse, TaskSummaryResponse,
+    TaskFilters, BulkTaskRequest, BulkTaskResponse, HistoryEventType, HistoryFilters, HistoryAggregateRow,
+    StatusDurationRow, TimeBucket, HistoryGroupKey, TaskStatsResponse
 )
-from app.services.task_service import TaskService
+from app.services.history_analytics import HistoryAnalyticsService
+from app.services.task_cache import get_task_cache
+from app.services.task_counters import TaskCounters
+from app.services.task_service import TaskService, VersionMismatch, SUMMARY_COLUMNS
+from app.services.user_replica import UserReplicaService
 from app.services.user_validator import UserValidator
+from app.utils.pagination import InvalidCursor, InvalidSort, SORT_KEYS
+from datetime import datetime
+from typing import List, Literal, Optional, Set, get_args
 import logging
-import os
-import sys
-
-# Add parent directory to path for importing shared_events
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
-from shared_events import Event, EventType, get_event_bus
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+SortOrder = Literal["asc", "desc"]
+TaskView = Literal["full", "summary"]
+
+SORT_DESCRIPTION = (
+    f"Comma-separated sort keys ({', '.join(SORT_KEYS)}); "
+    "a '-' prefix sorts that key descending, keys without a prefix follow order"
+)
+
+async def load_page(page_fn, *args, **kwargs):
+    """Run a keyset-paginated service call, mapping a bad cursor or sort to 400"""
+    try:
+        return await page_fn(*args, **kwargs)
+    except (InvalidCursor, InvalidSort) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+def task_etag(task) -> str:
+    """Strong ETag of a task: its version (Task.version)"""
+    return f'"{task.version}"'
+
+def expected_versions(
+    if_match: Optional[str] = Header(None, description='Task versions the write applies to, e.g. "3" (the ETag)')
+) -> Optional[Set[int]]:
+    """The versions named by If-Match; None when there is no precondition (no header or *)"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versions = set()
+    for tag in if_match.split(","):
+        # W/ is accepted too: the gateway's compression turns the ETag weak
+        tag = tag.strip().removeprefix("W/").strip('"')
+        if tag.isdigit():
+            versions.add(int(tag))
+    return versions
+
+async def versioned_write(write, task_id: int, expected: Optional[Set[int]], *args, **kwargs):
+    """
+    Run a task write under optimistic concurrency. 412 when If-Match does not name
+    the current version; when another write commits between our read and our
+    UPDATE ... WHERE version = ..., 409 (412 if the request had If-Match).
+    """
+    try:
+        task = await write(*args, expected_versions=expected, **kwargs)
+    except VersionMismatch as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=f"Task {task_id} has changed, current version is {e.task.version}",
+            headers={"ETag": task_etag(e.task)},
+        )
+    except StaleDataError:
+        logger.info(f"Concurrent update of task {task_id} rejected")
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT if expected is None else status.HTTP_412_PRECONDITION_FAILED,
+            detail=f"Task {task_id} was changed by another request, reload it and retry",
+        )
+    if not task:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    return task
+
+def task_filters(
+    status: Optional[List[TaskStatus]] = Query(None, description="Repeat for several statuses"),
+    priority: Optional[List[TaskPriority]] = Query(None, description="Repeat for several priorities"),
+    created_by: Optional[int] = None,
+    worker_id: Optional[int] = Query(None, description="Tasks assigned to this worker"),
+    created_from: Optional[datetime] = Query(None, description="created_at >= created_from"),
+    created_to: Optional[datetime] = Query(None, description="created_at < created_to"),
+    updated_from: Optional[datetime] = Query(None, description="updated_at >= updated_from"),
+    updated_to: Optional[datetime] = Query(None, description="updated_at < updated_to"),
+    q: Optional[str] = Query(None, max_length=200, description="Full-text search in title and description"),
+) -> TaskFilters:
+    return TaskFilters(
+        status=status or [], priority=priority or [], created_by=created_by, worker_id=worker_id,
+        created_from=created_from, created_to=created_to, updated_from=updated_from, updated_to=updated_to,
+        q=q
+    )
+
+def parse_fields(fields: Optional[str]) -> Optional[list]:
+    """Comma-separated summary fields; None means all of them"""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SUMMARY_COLUMNS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(SUMMARY_COLUMNS)}"
+        )
+    return names
+
 @router.post("", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
-async def create_task(task: TaskCreate, db: Session = Depends(get_db), user_id: int = 1):
+async def create_task(task: TaskCreate, response: Response, db: AsyncSession = Depends(get_db), user_id: int = 1):
     # Validate that all workers are active
     if task.worker_ids:
-        is_valid, error_message = UserValidator.validate_active_users(task.worker_ids)
+        is_valid, error_message = await UserValidator.validate_active_users(task.worker_ids, db)
         if not is_valid:
             logger.warning(f"Cannot create task: {error_message}")
             raise HTTPException(
@@ -31,7 +125,7 @@ async def create_task(task: TaskCreate, db: Session = Depends(get_db), user_id:
                 detail=error_message
             )
     
-    db_task = TaskService.create_task(
+    db_task = await TaskService.create_task(
         db,
         title=task.title,
         description=task.description,
@@ -39,49 +133,88 @@ async def create_task(task: TaskCreate, db: Session = Depends(get_db), user_id:
         created_by=user_id,
         worker_ids=task.worker_ids
     )
+    # TASK_CREATED is committed to the outbox with the task (see app/services/outbox.py)
     logger.info(f"Task created: {db_task.id}")
-    
-    # Publish TASK_CREATED event
-    try:
-        event_bus = get_event_bus()
-        event = Event(
-            event_type=EventType.TASK_CREATED,
-            aggregate_id=str(db_task.id),
-            aggregate_type="task",
-            data={
-                "task_id": db_task.id,
-                "title": db_task.title,
-                "description": db_task.description,
-                "priority": db_task.priority,
-                "status": db_task.status,
-                "created_by": db_task.created_by,
-                "worker_ids": db_task.worker_ids or []
-            }
-        )
-        event_bus.publish(event)
-        logger.info(f"✓ TASK_CREATED event published for task: {db_task.id}")
-    except Exception as e:
-        logger.error(f"✗ Failed to publish TASK_CREATED event: {e}")
-    
+    response.headers["ETag"] = task_etag(db_task)
     return db_task
 
+@router.post("/bulk", response_model=BulkTaskResponse)
+async def bulk_tasks(request: BulkTaskRequest, db: AsyncSession = Depends(get_db), user_id: int = 1):
+    """
+    Create / update / status / assign / delete many tasks in one transaction.
+    Unknown task ids are reported per item as not_found, tasks changed by another
+    request since they were read as conflict; neither rolls back the rest. An
+    inactive or unknown worker rejects the whole request before any write.
+    """
+    worker_ids = [
+        worker_id
+        for operation in request.operations
+        for worker_id in (operation.worker_ids or []) + [w for item in operation.tasks for w in item.worker_ids]
+    ]
+    if worker_ids:
+        is_valid, error_message = await UserValidator.validate_active_users(worker_ids, db)
+        if not is_valid:
+            logger.warning(f"Cannot apply bulk operations: {error_message}")
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_message)
+
+    # Events go to the outbox in the same transaction; the relay publishes them in pipelined batches
+    results = await TaskService.bulk(db, request.operations, user_id)
+    failed = sum(1 for result in results if result["result"] in ("not_found", "conflict"))
+    logger.info(f"Bulk operations applied: {len(results) - failed} items, {failed} not found or conflicting")
+    return {"results": results, "succeeded": len(results) - failed, "failed": failed}
+
 @router.get("", response_model=list[TaskResponse])
 async def get_tasks(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
-    status: TaskStatus = None,
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    sort: str = Query("created_at", description=SORT_DESCRIPTION),
+    order: SortOrder = "asc",
+    view: TaskView = "full",
+    fields: Optional[str] = Query(None, description="Comma-separated summary fields, implies view=summary"),
+    filters: TaskFilters = Depends(task_filters),
+    db: AsyncSession = Depends(get_db)
 ):
-    tasks = TaskService.get_all_tasks(db, skip, limit, status)
+    """
+    Keyset-paginated tasks; the next page cursor is returned in X-Next-Cursor.
+    Filters, sort and search run in the database (see task_filters).
+    view=summary (or fields=...) returns TaskSummaryResponse rows with counts
+    instead of embedded comments/history; full detail stays on GET /tasks/{id}.
+    """
+    if view == "summary" or fields:
+        names = parse_fields(fields)
+        rows, next_cursor = await load_page(
+            TaskService.get_task_summaries, db, names, limit, cursor, sort, order, skip=skip, filters=filters
+        )
+        keep = set(names or SUMMARY_COLUMNS) | {"id"}
+        items = [TaskSummaryResponse(**row._mapping).model_dump(include=keep) for row in rows]
+        return JSONResponse(
+            content=jsonable_encoder(items),
+            headers={"X-Next-Cursor": next_cursor} if next_cursor else None
+        )
+
+    # skip without a cursor is the deprecated offset paging, kept for old clients
+    tasks, next_cursor = await load_page(
+        TaskService.get_tasks_page, db, limit, cursor, sort, order, filters=filters, skip=skip
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return tasks
 
 @router.get("/list")
 async def get_all_tasks(
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    sort: str = Query("created_at", description=SORT_DESCRIPTION),
+    order: SortOrder = "asc",
+    filters: TaskFilters = Depends(task_filters),
+    db: AsyncSession = Depends(get_db)
 ):
-    tasks = TaskService.get_all_tasks(db, skip, limit, None)
+    tasks, next_cursor = await load_page(
+        TaskService.get_tasks_page, db, limit, cursor, sort, order, detailed=False, filters=filters, skip=skip
+    )
     # Явно сериализуем в список словарей
     task_list = []
     for task in tasks:
@@ -99,25 +232,99 @@ async def get_all_tasks(
             "created_at": task.created_at.isoformat() if task.created_at else None,
             "updated_at": task.updated_at.isoformat() if task.updated_at else None
         })
-    return {"tasks": task_list}
+    return {"tasks": task_list, "next_cursor": next_cursor}
+
+@router.get("/worker/{worker_id}", response_model=TaskPageResponse)
+async def get_worker_tasks(
+    worker_id: int,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    sort: str = Query("created_at", description=SORT_DESCRIPTION),
+    order: SortOrder = "asc",
+    db: AsyncSession = Depends(get_db)
+):
+    """Tasks assigned to a worker, keyset-paginated"""
+    tasks, next_cursor = await load_page(TaskService.get_worker_tasks, db, worker_id, limit, cursor, sort, order)
+    return {"items": tasks, "next_cursor": next_cursor}
+
+def history_filters(
+    event_type: Optional[List[HistoryEventType]] = Query(None, description="Repeat for several event types"),
+    user_id: Optional[int] = None,
+    task_id: Optional[int] = None,
+    from_status: Optional[TaskStatus] = Query(None, description="Status changes away from this status"),
+    to_status: Optional[TaskStatus] = Query(None, description="Status changes into this status"),
+    created_from: Optional[datetime] = Query(None, description="created_at >= created_from"),
+    created_to: Optional[datetime] = Query(None, description="created_at < created_to"),
+) -> HistoryFilters:
+    return HistoryFilters(
+        event_type=event_type or [], user_id=user_id, task_id=task_id, from_status=from_status,
+        to_status=to_status, created_from=created_from, created_to=created_to
+    )
+
+HISTORY_GROUP_KEYS = get_args(HistoryGroupKey)
+
+def parse_group_by(group_by: str) -> list:
+    names = list(dict.fromkeys(name.strip() for name in group_by.split(",") if name.strip()))
+    unknown = [name for name in names if name not in HISTORY_GROUP_KEYS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown group_by keys: {', '.join(unknown)}. Allowed: {', '.join(HISTORY_GROUP_KEYS)}"
+        )
+    return names
+
+@router.get("/analytics/history", response_model=list[HistoryAggregateRow])
+async def history_analytics(
+    group_by: str = Query("event_type", description=f"Comma-separated keys: {', '.join(HISTORY_GROUP_KEYS)}"),
+    bucket: TimeBucket = Query("day", description="Size of the time bucket when grouping by bucket"),
+    filters: HistoryFilters = Depends(history_filters),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    History row counts grouped in the database, e.g. group_by=from_status,to_status
+    for status transitions, or group_by=user_id,bucket&to_status=rework&created_from=...
+    for who sent tasks to rework, per day
+    """
+    return await HistoryAnalyticsService.aggregate(db, parse_group_by(group_by), bucket, filters)
+
+@router.get("/analytics/status-durations", response_model=list[StatusDurationRow])
+async def status_durations(filters: HistoryFilters = Depends(history_filters), db: AsyncSession = Depends(get_db)):
+    """Time spent in each task status (task_id and created_from/created_to apply)"""
+    return await HistoryAnalyticsService.status_durations(db, filters)
+
+@router.get("/stats", response_model=TaskStatsResponse)
+async def get_task_stats(db: AsyncSession = Depends(get_db)):
+    """Tasks per status, open tasks per worker and the completion ratio, from the materialized counters"""
+    return await TaskCounters.get_stats(db)
 
 @router.get("/{task_id}", response_model=TaskResponse)
-async def get_task(task_id: int, db: Session = Depends(get_db)):
-    task = TaskService.get_task(db, task_id)
-    if not task:
+async def get_task(task_id: int, db: AsyncSession = Depends(get_db)):
+    """Served from the task detail cache (app/services/task_cache.py), read through on a miss"""
+    async def load():
+        task = await TaskService.get_task(db, task_id)
+        if not task:
+            return None
+        # Cached as "<ETag>\n<body>" (the JSON has no raw newline)
+        return task_etag(task).encode() + b"\n" + TaskResponse.model_validate(task).model_dump_json().encode()
+
+    cached = await get_task_cache().get(task_id, load)
+    if cached is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    return task
+    etag, _, body = cached.partition(b"\n")
+    return Response(content=body, media_type="application/json", headers={"ETag": etag.decode()})
 
 @router.put("/{task_id}", response_model=TaskResponse)
 async def update_task(
     task_id: int,
     task_update: TaskUpdate,
-    db: Session = Depends(get_db),
-    user_id: int = 1
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    user_id: int = 1,
+    expected: Optional[Set[int]] = Depends(expected_versions)
 ):
     # Validate that all new workers are active
     if task_update.worker_ids:
-        is_valid, error_message = UserValidator.validate_active_users(task_update.worker_ids)
+        is_valid, error_message = await UserValidator.validate_active_users(task_update.worker_ids, db)
         if not is_valid:
             logger.warning(f"Cannot update task: {error_message}")
             raise HTTPException(
@@ -125,7 +332,10 @@ async def update_task(
                 detail=error_message
             )
     
-    task = TaskService.update_task(
+    task = await versioned_write(
+        TaskService.update_task,
+        task_id,
+        expected,
         db,
         task_id,
         title=task_update.title,
@@ -135,34 +345,13 @@ async def update_task(
         worker_ids=task_update.worker_ids,
         updated_by=user_id
     )
-    if not task:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    # TASK_UPDATED is committed to the outbox with the change
     logger.info(f"Task updated: {task_id}")
-    
-    # Publish TASK_UPDATED event
-    try:
-        event_bus = get_event_bus()
-        event = Event(
-            event_type=EventType.TASK_UPDATED,
-            aggregate_id=str(task.id),
-            aggregate_type="task",
-            data={
-                "task_id": task.id,
-                "title": task.title,
-                "status": task.status,
-                "priority": task.priority,
-                "updated_by": user_id
-            }
-        )
-        event_bus.publish(event)
-        logger.info(f"✓ TASK_UPDATED event published for task: {task_id}")
-    except Exception as e:
-        logger.error(f"✗ Failed to publish TASK_UPDATED event: {e}")
-    
+    response.headers["ETag"] = task_etag(task)
     return task
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_task(task_id: int, db: Session = Depends(get_db)):
-    if not TaskService.delete_task(db, task_id):
+async def delete_task(task_id: int, db: AsyncSession = Depends(get_db)):
+    if not await TaskService.delete_task(db, task_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
     logger.info(f"Task deleted: {task_id}")
 
@@ -170,163 +359,195 @@ async def delete_task(task_id: int, db: Session = Depends(get_db)):
 async def add_comment(
     task_id: int,
     comment: CommentCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user_id: int = 1
 ):
-    db_comment = TaskService.add_comment(db, task_id, user_id, comment.text, comment.full_name)
+    # The author's name comes from the user replica; the client value is only a fallback
+    full_name = await UserReplicaService.get_full_name(db, user_id) or comment.full_name
+    db_comment = await TaskService.add_comment(db, task_id, user_id, comment.text, full_name)
     logger.info(f"Comment added to task {task_id}")
     return db_comment
 
 @router.post("/{task_id}/mark-completed", response_model=WorkerCompletionResponse)
 async def mark_completed(
     task_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user_id: int = 1
 ):
-    completion = TaskService.mark_worker_completed(db, task_id, user_id)
+    # TASK_COMPLETED is committed to the outbox with the completion
+    completion = await TaskService.mark_worker_completed(db, task_id, user_id)
     logger.info(f"Worker {user_id} marked task {task_id} as completed")
-    
-    # Publish TASK_COMPLETED event
-    try:
-        event_bus = get_event_bus()
-        event = Event(
-            event_type=EventType.TASK_COMPLETED,
-            aggregate_id=str(task_id),
-            aggregate_type="task",
-            data={
-                "task_id": task_id,
-                "worker_id": user_id
-            }
-        )
-        event_bus.publish(event)
-        logger.info(f"✓ TASK_COMPLETED event published for task: {task_id}")
-    except Exception as e:
-        logger.error(f"✗ Failed to publish TASK_COMPLETED event: {e}")
-    
     return completion
 
 @router.post("/{task_id}/approve", response_model=TaskResponse)
 async def approve_task(
     task_id: int,
-    db: Session = Depends(get_db),
-    user_id: int = 1
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    user_id: int = 1,
+    expected: Optional[Set[int]] = Depends(expected_versions)
 ):
-    task = TaskService.approve_task(db, task_id, user_id)
-    if not task:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    task = await versioned_write(TaskService.approve_task, task_id, expected, db, task_id, user_id)
     logger.info(f"Task approved: {task_id}")
+    response.headers["ETag"] = task_etag(task)
     return task
 
 @router.post("/{task_id}/return-rework", response_model=TaskResponse)
 async def return_rework(
     task_id: int,
-    db: Session = Depends(get_db),
-    user_id: int = 1
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    user_id: int = 1,
+    expected: Optional[Set[int]] = Depends(expected_versions)
 ):
-    task = TaskService.return_to_rework(db, task_id, user_id)
-    if not task:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    task = await versioned_write(TaskService.return_to_rework, task_id, expected, db, task_id, user_id)
     logger.info(f"Task returned to rework: {task_id}")
+    response.headers["ETag"] = task_etag(task)
     return task
 
-@router.get("/{task_id}/history", response_model=list[HistoryResponse])
-async def get_task_history(task_id: int, db: Session = Depends(get_db)):
-    task = TaskService.get_task(db, task_id)
-    if not task:
+TIMELINE_LIMIT_MAX = 500
+
+async def timeline_page(response: Response, db: AsyncSession, model, task_id: int, limit: int,
+                        cursor: Optional[str], order: str):
+    page = await load_page(TaskService.get_timeline_page, db, model, task_id, limit, cursor, order)
+    if page is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    return task.history
+    rows, next_cursor = page
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [row._mapping for row in rows]
 
-@router.get("/{task_id}/comments", response_model=list[CommentResponse])
-async def get_task_comments(task_id: int, db: Session = Depends(get_db)):
-    task = TaskService.get_task(db, task_id)
-    if not task:
+async def timeline_export(db: AsyncSession, model, schema, task_id: int, order: str) -> StreamingResponse:
+    """NDJSON, one row per line, streamed while the rows are read"""
+    if not await TaskService.task_exists(db, task_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    return task.comments
+
+    async def lines():
+        # The request's session stays open until the response is sent (yield dependency)
+        async for row in TaskService.stream_timeline(db, model, task_id, order):
+            yield schema.model_validate(row._mapping).model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.get("/{task_id}/history", response_model=list[HistoryResponse])
+async def get_task_history(
+    task_id: int,
+    response: Response,
+    limit: int = Query(100, ge=1, le=TIMELINE_LIMIT_MAX),
+    cursor: Optional[str] = None,
+    order: SortOrder = "asc",
+    db: AsyncSession = Depends(get_db)
+):
+    """History ordered by created_at, keyset-paginated; the next page cursor is in X-Next-Cursor"""
+    return await timeline_page(response, db, History, task_id, limit, cursor, order)
+
+@router.get("/{task_id}/history/export")
+async def export_task_history(task_id: int, order: SortOrder = "asc", db: AsyncSession = Depends(get_db)):
+    """The whole history as NDJSON (HistoryResponse per line)"""
+    return await timeline_export(db, History, HistoryResponse, task_id, order)
+
+@router.get("/{task_id}/comments", response_model=list[CommentResponse])
+async def get_task_comments(
+    task_id: int,
+    response: Response,
+    limit: int = Query(100, ge=1, le=TIMELINE_LIMIT_MAX),
+    cursor: Optional[str] = None,
+    order: SortOrder = "asc",
+    db: AsyncSession = Depends(get_db)
+):
+    """Comments ordered by created_at, keyset-paginated; the next page cursor is in X-Next-Cursor"""
+    return await timeline_page(response, db, Comment, task_id, limit, cursor, order)
+
+@router.get("/{task_id}/comments/export")
+async def export_task_comments(task_id: int, order: SortOrder = "asc", db: AsyncSession = Depends(get_db)):
+    """All comments as NDJSON (CommentResponse per line)"""
+    return await timeline_export(db, Comment, CommentResponse, task_id, order)
 
 @router.post("/{task_id}/assign", response_model=TaskResponse)
-async def assign_user_to_task(task_id: int, worker_id: int, db: Session = Depends(get_db)):
-    task = TaskService.get_task(db, task_id)
-    if not task:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    
-    # Add worker to task
-    if worker_id not in task.worker_ids:
-        task.worker_ids.append(worker_id)
-        db.commit()
-        db.refresh(task)
-        logger.info(f"User {worker_id} assigned to task {task_id}")
-    
+async def assign_user_to_task(
+    task_id: int,
+    worker_id: int,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    expected: Optional[Set[int]] = Depends(expected_versions)
+):
+    task = await versioned_write(TaskService.assign_worker, task_id, expected, db, task_id, worker_id)
+    logger.info(f"User {worker_id} assigned to task {task_id}")
+    response.headers["ETag"] = task_etag(task)
     return task
 
 @router.post("/{task_id}/unassign", response_model=TaskResponse)
-async def unassign_user_from_task(task_id: int, worker_id: int, db: Session = Depends(get_db)):
-    task = TaskService.get_task(db, task_id)
-    if not task:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    
-    # Remove worker from task
-    if worker_id in task.worker_ids:
-        task.worker_ids.remove(worker_id)
-        db.commit()
-        db.refresh(task)
-        logger.info(f"User {worker_id} unassigned from task {task_id}")
-    
+async def unassign_user_from_task(
+    task_id: int,
+    worker_id: int,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    expected: Optional[Set[int]] = Depends(expected_versions)
+):
+    task = await versioned_write(TaskService.unassign_worker, task_id, expected, db, task_id, worker_id)
+    logger.info(f"User {worker_id} unassigned from task {task_id}")
+    response.headers["ETag"] = task_etag(task)
     return task
 
 @router.get("/{task_id}/workers", response_model=list[int])
-async def get_task_workers(task_id: int, db: Session = Depends(get_db)):
+async def get_task_workers(task_id: int, db: AsyncSession = Depends(get_db)):
     """Get all workers assigned to a task"""
-    task = TaskService.get_task(db, task_id)
-    if not task:
+    workers = await TaskService.get_task_workers(db, task_id)
+    if workers is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    workers = TaskService.get_task_workers(db, task_id)
     return workers
 
 @router.post("/{task_id}/add-worker/{worker_id}", response_model=TaskResponse)
 async def add_worker_to_task(
     task_id: int,
     worker_id: int,
-    db: Session = Depends(get_db),
-    user_id: int = 1
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    user_id: int = 1,
+    expected: Optional[Set[int]] = Depends(expected_versions)
 ):
     """Admin only: Add a worker to a task"""
-    result = TaskService.add_worker_to_task(db, task_id, worker_id, user_id)
-    if not result:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    result = await versioned_write(TaskService.add_worker_to_task, task_id, expected, db, task_id, worker_id, user_id)
     logger.info(f"Worker {worker_id} added to task {task_id}")
+    response.headers["ETag"] = task_etag(result["task"])
     return result.get("task")
 
 @router.post("/{task_id}/remove-worker/{worker_id}", response_model=TaskResponse)
 async def remove_worker_from_task(
     task_id: int,
     worker_id: int,
-    db: Session = Depends(get_db),
-    user_id: int = 1
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    user_id: int = 1,
+    expected: Optional[Set[int]] = Depends(expected_versions)
 ):
     """Admin only: Remove a worker from a task"""
-    result = TaskService.remove_worker_from_task(db, task_id, worker_id, user_id)
-    if not result:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    result = await versioned_write(
+        TaskService.remove_worker_from_task, task_id, expected, db, task_id, worker_id, user_id
+    )
     logger.info(f"Worker {worker_id} removed from task {task_id}")
+    response.headers["ETag"] = task_etag(result["task"])
     return result.get("task")
 
 @router.post("/{task_id}/complete")
 async def complete_task_by_worker(
     task_id: int,
     user_id: int = Query(1),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Worker: Mark task as completed"""
-    task = TaskService.get_task(db, task_id)
-    if not task:
+    state = await TaskService.get_worker_state(db, task_id, user_id)
+    if state is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
     
-    completion = TaskService.worker_complete_task(db, task_id, user_id)
-    if not completion:
+    is_assigned, completion = state
+    if not is_assigned:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You are not assigned to this task"
         )
+    if completion is None:
+        completion = await TaskService.worker_complete_task(db, task_id, user_id)
     
     logger.info(f"Worker {user_id} marked task {task_id} as completed")
     return {
@@ -336,39 +557,33 @@ async def complete_task_by_worker(
         "completed_at": completion.completed_at.isoformat() if completion.completed_at else None
     }
 
-@router.post("/{task_id}/approve")
+@router.post("/{task_id}/approve", response_model=TaskResponse)
 async def approve_task_by_admin(
     task_id: int,
-    db: Session = Depends(get_db),
-    user_id: int = Query(1)
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    user_id: int = Query(1),
+    expected: Optional[Set[int]] = Depends(expected_versions)
 ):
     """Admin: Approve task as completed"""
-    task = TaskService.get_task(db, task_id)
-    if not task:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    
-    updated_task = TaskService.approve_task(db, task_id, user_id)
-    if not updated_task:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Failed to approve task")
+    updated_task = await versioned_write(TaskService.approve_task, task_id, expected, db, task_id, user_id)
     
     logger.info(f"Admin {user_id} approved task {task_id}")
+    response.headers["ETag"] = task_etag(updated_task)
     return updated_task
 
-@router.post("/{task_id}/rework")
+@router.post("/{task_id}/rework", response_model=TaskResponse)
 async def send_task_to_rework(
     task_id: int,
-    db: Session = Depends(get_db),
-    user_id: int = Query(1)
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    user_id: int = Query(1),
+    expected: Optional[Set[int]] = Depends(expected_versions)
 ):
     """Admin: Send task back to rework"""
-    task = TaskService.get_task(db, task_id)
-    if not task:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    
-    updated_task = TaskService.send_to_rework(db, task_id, user_id)
-    if not updated_task:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Failed to send task to rework")
+    updated_task = await versioned_write(TaskService.send_to_rework, task_id, expected, db, task_id, user_id)
     
     logger.info(f"Admin {user_id} sent task {task_id} to rework")
+    response.headers["ETag"] = task_etag(updated_task)
     return updated_task
 
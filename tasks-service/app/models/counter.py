@@ -0,0 +1,17 @@
+from sqlalchemy import BigInteger, Column, String
+from app.db.database import Base
+
+
+class TaskCounter(Base):
+    """
+    Materialized task aggregates, changed in the same transaction as the tasks
+    (app/services/task_counters.py):
+
+        name="status",      key=<TaskStatus value>  tasks in that status
+        name="worker_open", key=<worker id>         assigned tasks not yet completed
+    """
+    __tablename__ = "task_counters"
+
+    name = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,20 @@
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String, Text
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class OutboxEvent(Base):
+    """
+    Event written in the same transaction as the task change it describes.
+    The outbox relay (outbox_relay.py) publishes rows in id order and deletes them.
+    """
+    __tablename__ = "outbox_events"
+
+    # BIGINT on Postgres; SQLite only autoincrements INTEGER PRIMARY KEY
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    event_type = Column(String, nullable=False)
+    aggregate_type = Column(String, nullable=False)
+    aggregate_id = Column(String, nullable=False)
+    data = Column(Text, nullable=False)  # JSON
+    timestamp = Column(String, nullable=False)  # Event.timestamp, fixed when the change is made
+    created_at = Column(DateTime, server_default=func.now())
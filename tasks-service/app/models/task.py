@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum, ForeignKey, Table, Text
+from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum, ForeignKey, Table, Text, Index, JSON, text
+from sqlalchemy.dialects import postgresql  # noqa: F401 - registers to_tsvector/plainto_tsquery
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.database import Base
@@ -30,12 +32,22 @@ task_workers = Table(
     'task_workers',
     Base.metadata,
     Column('task_id', Integer, ForeignKey('tasks.id'), primary_key=True),
-    Column('worker_id', Integer, primary_key=True)
+    Column('worker_id', Integer, primary_key=True),
+    # The primary key serves task → workers, this one serves worker → tasks
+    Index('ix_task_workers_worker_id_task_id', 'worker_id', 'task_id')
 )
 
 class Task(Base):
     __tablename__ = "tasks"
-
+    # Back keyset pagination on (created_at, id) / (updated_at, id) and the
+    # list filters / sort keys followed by the default created_at order
+    __table_args__ = (
+        Index('ix_tasks_created_at_id', 'created_at', 'id'),
+        Index('ix_tasks_updated_at_id', 'updated_at', 'id'),
+        Index('ix_tasks_status_created_at_id', 'status', 'created_at', 'id'),
+        Index('ix_tasks_priority_created_at_id', 'priority', 'created_at', 'id'),
+        Index('ix_tasks_created_by_created_at_id', 'created_by', 'created_at', 'id'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
     description = Column(Text)
@@ -44,21 +56,28 @@ class Task(Base):
     created_by = Column(Integer)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    # Optimistic concurrency: every UPDATE of the row sets version = version + 1
+    # WHERE version = <the version that was loaded>; ETag / If-Match carry it
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
+
+    # Server-generated created_at/updated_at come back with INSERT/UPDATE ... RETURNING,
+    # so a task can be returned right after the commit without reading it again.
+    # An UPDATE that matches no row (another write got there first) raises StaleDataError
+    __mapper_args__ = {"eager_defaults": True, "version_id_col": version}
     
     comments = relationship("Comment", back_populates="task", cascade="all, delete-orphan")
     history = relationship("History", back_populates="task", cascade="all, delete-orphan")
     worker_completions = relationship("WorkerCompletion", back_populates="task", cascade="all, delete-orphan")
     
+    # Loaded for a whole page of tasks with one extra SELECT ... WHERE task_id IN (...)
+    worker_assignments = relationship(
+        "TaskWorker", back_populates="task", cascade="all, delete-orphan", lazy="selectin"
+    )
+    
     @property
     def worker_ids(self):
-        """Get list of assigned worker IDs from task_workers table"""
-        from app.db.database import SessionLocal
-        db = SessionLocal()
-        try:
-            result = db.query(task_workers).filter(task_workers.c.task_id == self.id).all()
-            return [row[1] for row in result]
-        finally:
-            db.close()
+        """List of assigned worker IDs (from the eagerly loaded task_workers rows)"""
+        return [assignment.worker_id for assignment in self.worker_assignments]
     
     @property
     def worker_ids_list(self):
@@ -67,14 +86,37 @@ class Task(Base):
     
     @worker_ids_list.setter
     def worker_ids_list(self, values):
-        """Placeholder setter - actual update handled by service"""
-        pass
+        """Replace the assigned workers, keeping rows for workers that stay"""
+        current = {assignment.worker_id: assignment for assignment in self.worker_assignments}
+        self.worker_assignments = [
+            current.get(worker_id) or TaskWorker(worker_id=worker_id)
+            for worker_id in dict.fromkeys(values or [])
+        ]
+
+# Full-text search document. The constants are inlined SQL rather than bound
+# parameters so that the query expression matches the index expression below.
+SEARCH_CONFIG = text("'simple'::regconfig")
+task_search_vector = func.to_tsvector(
+    SEARCH_CONFIG,
+    func.coalesce(Task.title, text("''")).op("||")(text("' '")).op("||")(func.coalesce(Task.description, text("''")))
+)
+# Postgres only; SQLite falls back to LIKE without an index
+Index('ix_tasks_search', task_search_vector, postgresql_using='gin').ddl_if(dialect='postgresql')
+
+class TaskWorker(Base):
+    __table__ = task_workers
+    
+    task = relationship("Task", back_populates="worker_assignments")
 
 class Comment(Base):
     __tablename__ = "comments"
+    # Time-ordered, keyset-paginated timeline of one task (GET /tasks/{id}/comments)
+    __table_args__ = (
+        Index('ix_comments_task_id_created_at_id', 'task_id', 'created_at', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(Integer, ForeignKey('tasks.id'))
+    task_id = Column(Integer, ForeignKey('tasks.id'), index=True)
     user_id = Column(Integer)
     full_name = Column(String, default="Unknown User")
     text = Column(Text)
@@ -84,21 +126,34 @@ class Comment(Base):
 
 class History(Base):
     __tablename__ = "history"
+    # Time-ordered, keyset-paginated timeline of one task (GET /tasks/{id}/history);
+    # the analytics queries filter on event type and a created_at range
+    __table_args__ = (
+        Index('ix_history_task_id_created_at_id', 'task_id', 'created_at', 'id'),
+        Index('ix_history_event_type_created_at', 'event_type', 'created_at'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey('tasks.id'))
     event_type = Column(SQLEnum(HistoryEventType))
     user_id = Column(Integer)
-    details = Column(Text)
+    # Event payload as a dict, e.g. {"from": "new", "to": "in_progress"}: JSONB on Postgres
+    details = Column(JSON().with_variant(JSONB(), "postgresql"))
     created_at = Column(DateTime, server_default=func.now())
     
     task = relationship("Task", back_populates="history")
 
+# Containment queries on details (details @> '{"to": "rework"}'); Postgres only
+Index('ix_history_details', History.details, postgresql_using='gin').ddl_if(dialect='postgresql')
+
 class WorkerCompletion(Base):
     __tablename__ = "worker_completions"
+    __table_args__ = (
+        Index('ix_worker_completions_worker_id_task_id', 'worker_id', 'task_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(Integer, ForeignKey('tasks.id'))
+    task_id = Column(Integer, ForeignKey('tasks.id'), index=True)
     worker_id = Column(Integer)
     completed_at = Column(DateTime, server_default=func.now())
     
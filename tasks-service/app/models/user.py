@@ -0,0 +1,21 @@
+from sqlalchemy import Boolean, Column, DateTime, Integer, String
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class UserReplica(Base):
+    """
+    Local copy of auth-service users, written only by the user replica projector
+    (app/services/user_replica.py) from the snapshot and USER_* events.
+    """
+    __tablename__ = "user_replicas"
+
+    id = Column(Integer, primary_key=True)  # auth-service user id
+    full_name = Column(String)
+    role = Column(String)
+    is_active = Column(Boolean, nullable=False, default=True)
+    # Tombstone: a late USER_UPDATED must not bring a deleted user back
+    is_deleted = Column(Boolean, nullable=False, default=False)
+    # Timestamp of the last applied event (UTC); None for rows from the snapshot
+    event_at = Column(DateTime)
+    synced_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
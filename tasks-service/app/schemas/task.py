@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, Dict, Literal, Optional, List
 from datetime import datetime
 from enum import Enum
 
@@ -44,7 +44,7 @@ class HistoryResponse(BaseModel):
     task_id: int
     event_type: HistoryEventType
     user_id: int
-    details: Optional[str]
+    details: Optional[Dict[str, Any]] = None
     created_at: datetime
 
     class Config:
@@ -81,6 +81,7 @@ class TaskResponse(BaseModel):
     created_by: int
     created_at: datetime
     updated_at: datetime
+    version: int
     comments: List[CommentResponse] = []
     history: List[HistoryResponse] = []
     worker_completions: List[WorkerCompletionResponse] = []
@@ -91,6 +92,135 @@ class TaskResponse(BaseModel):
 class TaskDetailResponse(TaskResponse):
     pass
 
+class TaskSummaryResponse(BaseModel):
+    """GET /tasks?view=summary row; with fields=... only the requested keys (and id) are present"""
+    id: int
+    title: Optional[str] = None
+    status: Optional[TaskStatus] = None
+    priority: Optional[TaskPriority] = None
+    created_by: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    comments_count: Optional[int] = None
+    completions_count: Optional[int] = None
+    workers_count: Optional[int] = None
+
 class TaskListResponse(BaseModel):
     total: int
     items: List[TaskResponse]
+
+class TaskPageResponse(BaseModel):
+    items: List[TaskResponse]
+    next_cursor: Optional[str] = None
+
+class TaskFilters(BaseModel):
+    """List filters shared by GET /tasks, /tasks/list and the summary view; all are ANDed"""
+    status: List[TaskStatus] = []
+    priority: List[TaskPriority] = []
+    created_by: Optional[int] = None
+    worker_id: Optional[int] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    updated_from: Optional[datetime] = None
+    updated_to: Optional[datetime] = None
+    q: Optional[str] = None
+
+BULK_MAX_ITEMS = 1000
+
+class BulkAction(str, Enum):
+    CREATE = "create"
+    UPDATE = "update"
+    STATUS = "status"
+    ASSIGN = "assign"
+    DELETE = "delete"
+
+class BulkOperation(BaseModel):
+    """
+    One change applied to every task in task_ids (or, for create, every item of tasks).
+    update takes any of title/description/priority/status/worker_ids, status needs status,
+    assign replaces the workers with worker_ids.
+    """
+    action: BulkAction
+    task_ids: List[int] = []
+    tasks: List[TaskCreate] = []
+    title: Optional[str] = Field(None, min_length=1)
+    description: Optional[str] = None
+    priority: Optional[TaskPriority] = None
+    status: Optional[TaskStatus] = None
+    worker_ids: Optional[List[int]] = None
+
+    @model_validator(mode="after")
+    def check_fields(self):
+        if self.action == BulkAction.CREATE:
+            if not self.tasks:
+                raise ValueError("create needs tasks")
+            return self
+        if not self.task_ids:
+            raise ValueError(f"{self.action.value} needs task_ids")
+        if self.action == BulkAction.STATUS and self.status is None:
+            raise ValueError("status needs status")
+        if self.action == BulkAction.ASSIGN and self.worker_ids is None:
+            raise ValueError("assign needs worker_ids")
+        if self.action == BulkAction.UPDATE and all(
+            value is None for value in (self.title, self.description, self.priority, self.status, self.worker_ids)
+        ):
+            raise ValueError("update needs at least one field")
+        return self
+
+class BulkTaskRequest(BaseModel):
+    operations: List[BulkOperation] = Field(..., min_length=1)
+
+    @model_validator(mode="after")
+    def check_size(self):
+        items = sum(len(operation.tasks) + len(operation.task_ids) for operation in self.operations)
+        if items > BULK_MAX_ITEMS:
+            raise ValueError(f"At most {BULK_MAX_ITEMS} items per request, got {items}")
+        return self
+
+class BulkItemResult(BaseModel):
+    operation: int  # position in operations
+    action: BulkAction
+    index: Optional[int] = None  # position in tasks, create only
+    task_id: Optional[int] = None
+    result: Literal["created", "updated", "deleted", "not_found", "conflict"]
+
+class BulkTaskResponse(BaseModel):
+    results: List[BulkItemResult]
+    succeeded: int
+    failed: int
+
+HistoryGroupKey = Literal["event_type", "user_id", "bucket", "from_status", "to_status"]
+TimeBucket = Literal["hour", "day", "week", "month"]
+
+class HistoryFilters(BaseModel):
+    """History rows an analytics query covers; every field is optional"""
+    event_type: List[HistoryEventType] = []
+    user_id: Optional[int] = None
+    task_id: Optional[int] = None
+    from_status: Optional[TaskStatus] = None
+    to_status: Optional[TaskStatus] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+class HistoryAggregateRow(BaseModel):
+    """One group of GET /tasks/analytics/history; keys not grouped by stay null"""
+    event_type: Optional[HistoryEventType] = None
+    user_id: Optional[int] = None
+    bucket: Optional[datetime] = None
+    from_status: Optional[str] = None
+    to_status: Optional[str] = None
+    count: int
+
+class StatusDurationRow(BaseModel):
+    """Time tasks spent in one status; a task's current status counts up to now"""
+    status: str
+    periods: int
+    tasks: int
+    total_seconds: float
+    avg_seconds: float
+
+class TaskStatsResponse(BaseModel):
+    total: int
+    by_status: Dict[TaskStatus, int]
+    completion_ratio: float
+    open_by_worker: Dict[int, int]  # worker id → assigned tasks not yet completed
@@ -0,0 +1,140 @@
+"""
+Aggregations over task history, computed in the database.
+
+history.details is JSONB on Postgres: status filters are containment tests
+(details @> '{"to": "rework"}') answered by the GIN index ix_history_details.
+SQLite (tests, local runs) reads the keys with its JSON functions instead.
+
+Status changes are the history rows whose details carry "to" (status_changed,
+approved, returned); a task starts in "new" with its created row.
+"""
+from typing import List
+
+from sqlalchemy import and_, case, distinct, func, literal, or_, select, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.task import History, HistoryEventType, TaskStatus
+from app.schemas.task import HistoryFilters
+
+# SQLite stand-ins for date_trunc(); the result parses as a datetime
+SQLITE_BUCKETS = {
+    "hour": ("%Y-%m-%dT%H:00:00",),
+    "day": ("%Y-%m-%dT00:00:00",),
+    "week": ("%Y-%m-%dT00:00:00", "weekday 0", "-6 days"),  # Monday, like date_trunc('week')
+    "month": ("%Y-%m-01T00:00:00",),
+}
+
+
+# The column is JSON at the expression level (JSONB is a dialect variant); JSONB operators need the coercion
+JSONB_DETAILS = type_coerce(History.details, JSONB)
+
+
+def _is_postgres(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+class HistoryAnalyticsService:
+    @staticmethod
+    def details_match(db: AsyncSession, values: dict):
+        """details contains every key/value of values"""
+        if _is_postgres(db):
+            return JSONB_DETAILS.contains(values)
+        return and_(*(History.details[key].as_string() == value for key, value in values.items()))
+
+    @staticmethod
+    def time_bucket(db: AsyncSession, size: str):
+        if _is_postgres(db):
+            return func.date_trunc(size, History.created_at)
+        fmt, *modifiers = SQLITE_BUCKETS[size]
+        return func.strftime(fmt, History.created_at, *modifiers)
+
+    @staticmethod
+    def apply_filters(db: AsyncSession, query, filters: HistoryFilters = None):
+        if filters is None:
+            return query
+        if filters.event_type:
+            query = query.where(History.event_type.in_(filters.event_type))
+        if filters.user_id is not None:
+            query = query.where(History.user_id == filters.user_id)
+        if filters.task_id is not None:
+            query = query.where(History.task_id == filters.task_id)
+        statuses = {key: value.value for key, value in (("from", filters.from_status), ("to", filters.to_status))
+                    if value is not None}
+        if statuses:
+            query = query.where(HistoryAnalyticsService.details_match(db, statuses))
+        if filters.created_from:
+            query = query.where(History.created_at >= filters.created_from)
+        if filters.created_to:
+            query = query.where(History.created_at < filters.created_to)
+        return query
+
+    @staticmethod
+    async def aggregate(db: AsyncSession, group_by: List[str], bucket: str = "day",
+                        filters: HistoryFilters = None) -> list:
+        """History row counts per combination of the group_by keys (HistoryGroupKey)"""
+        keys = {
+            "event_type": History.event_type,
+            "user_id": History.user_id,
+            "bucket": HistoryAnalyticsService.time_bucket(db, bucket),
+            "from_status": History.details["from"].as_string(),
+            "to_status": History.details["to"].as_string(),
+        }
+        columns = [keys[name].label(name) for name in group_by]
+        query = select(*columns, func.count().label("count")).select_from(History)
+        query = HistoryAnalyticsService.apply_filters(db, query, filters)
+        if columns:
+            query = query.group_by(*columns).order_by(*columns)
+        result = await db.execute(query)
+        return [dict(row._mapping) for row in result]
+
+    @staticmethod
+    async def status_durations(db: AsyncSession, filters: HistoryFilters = None) -> list:
+        """
+        Time spent in each status: every status change opens a period that the
+        task's next change closes (LEAD over the task's history); the current
+        status runs until now. filters.task_id limits the tasks, created_from /
+        created_to the periods by their start.
+        """
+        postgres = _is_postgres(db)
+        has_status = JSONB_DETAILS.has_key("to") if postgres else History.details["to"].as_string().is_not(None)
+        status = case(
+            (History.event_type == HistoryEventType.CREATED, literal(TaskStatus.NEW.value)),
+            else_=History.details["to"].as_string(),
+        )
+        changes = select(
+            History.task_id,
+            status.label("status"),
+            History.created_at.label("started_at"),
+            func.lead(History.created_at).over(
+                partition_by=History.task_id, order_by=(History.created_at, History.id)
+            ).label("ended_at"),
+        ).where(or_(History.event_type == HistoryEventType.CREATED, has_status))
+        if filters is not None and filters.task_id is not None:
+            changes = changes.where(History.task_id == filters.task_id)
+        periods = changes.subquery()
+
+        # created_at is a naive local timestamp (Postgres) / UTC text (SQLite), now() must match it
+        now = func.localtimestamp() if postgres else func.current_timestamp()
+        ended_at = func.coalesce(periods.c.ended_at, now)
+        if postgres:
+            seconds = func.extract("epoch", ended_at - periods.c.started_at)
+        else:
+            seconds = (func.julianday(ended_at) - func.julianday(periods.c.started_at)) * 86400
+
+        query = select(
+            periods.c.status,
+            func.count().label("periods"),
+            func.count(distinct(periods.c.task_id)).label("tasks"),
+            func.sum(seconds).label("total_seconds"),
+            func.avg(seconds).label("avg_seconds"),
+        ).group_by(periods.c.status).order_by(periods.c.status)
+        if filters is not None and filters.created_from:
+            query = query.where(periods.c.started_at >= filters.created_from)
+        if filters is not None and filters.created_to:
+            query = query.where(periods.c.started_at < filters.created_to)
+        result = await db.execute(query)
+        return [
+            {**row._mapping, "total_seconds": float(row.total_seconds or 0), "avg_seconds": float(row.avg_seconds or 0)}
+            for row in result
+        ]
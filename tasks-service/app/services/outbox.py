@@ -0,0 +1,128 @@
+"""
+Transactional outbox for task events.
+
+Request handlers never talk to Redis: Outbox.add() stages an outbox_events row
+in the session of the task change, so the event is committed (or rolled back)
+together with it. The relay (outbox_relay.py, a separate process) reads rows in
+id order, publishes a batch with one pipelined EventBus.publish_many() and
+deletes the rows. A crash between publishing and deleting publishes the batch
+again on the next pass: delivery is at-least-once, consumers must tolerate
+duplicates.
+
+On Postgres rows are claimed with FOR UPDATE SKIP LOCKED, so several relays can
+run side by side; events of one task are then only ordered within a relay.
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+from typing import List, Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import AsyncSessionLocal
+from app.models.outbox import OutboxEvent
+
+# Add parent directory to path for importing shared_events
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+from shared_events import Event, EventType, get_event_bus
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "200"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "0.5"))
+
+
+def _outbox_row(event_type: EventType, aggregate_id, data: dict, aggregate_type: str = "task") -> dict:
+    event = Event(event_type=event_type, aggregate_id=str(aggregate_id), aggregate_type=aggregate_type, data=data)
+    return {
+        "event_type": event.event_type.value,
+        "aggregate_type": event.aggregate_type,
+        "aggregate_id": event.aggregate_id,
+        "data": json.dumps(event.data),
+        "timestamp": event.timestamp,
+    }
+
+
+class Outbox:
+    @staticmethod
+    def add(db: AsyncSession, event_type: EventType, aggregate_id, data: dict, aggregate_type: str = "task"):
+        """Stage an event in the current transaction; it is published after the commit"""
+        db.add(OutboxEvent(**_outbox_row(event_type, aggregate_id, data, aggregate_type)))
+
+    @staticmethod
+    async def add_many(db: AsyncSession, events: List[tuple]):
+        """[(event_type, aggregate_id, data)] with one executemany INSERT"""
+        if events:
+            await db.execute(insert(OutboxEvent), [_outbox_row(*event) for event in events])
+
+    @staticmethod
+    def to_event(row: OutboxEvent) -> Event:
+        return Event(
+            event_type=EventType(row.event_type),
+            aggregate_id=row.aggregate_id,
+            aggregate_type=row.aggregate_type,
+            data=json.loads(row.data),
+            timestamp=row.timestamp
+        )
+
+    @staticmethod
+    async def relay_batch(db: AsyncSession, event_bus, batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+        """Publish and delete up to batch_size events; returns how many were published"""
+        result = await db.execute(
+            select(OutboxEvent).order_by(OutboxEvent.id).limit(batch_size).with_for_update(skip_locked=True)
+        )
+        rows = result.scalars().all()
+        if not rows:
+            await db.rollback()
+            return 0
+        # Redis is called off the event loop; the row locks are held until the delete commits
+        await asyncio.to_thread(event_bus.publish_many, [Outbox.to_event(row) for row in rows])
+        await db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_([row.id for row in rows])))
+        await db.commit()
+        return len(rows)
+
+
+class OutboxRelay:
+    """Drains the outbox until stopped; a full batch is followed by the next one right away"""
+
+    def __init__(self, event_bus=None, session_factory=AsyncSessionLocal, batch_size: int = OUTBOX_BATCH_SIZE,
+                 poll_interval: float = OUTBOX_POLL_INTERVAL):
+        self.event_bus = event_bus
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.published = 0
+        self.stopped = asyncio.Event()
+
+    async def run_once(self) -> int:
+        if self.event_bus is None:
+            self.event_bus = get_event_bus()
+        async with self.session_factory() as db:
+            count = await Outbox.relay_batch(db, self.event_bus, self.batch_size)
+        self.published += count
+        return count
+
+    async def run(self):
+        logger.info(f"✓ Outbox relay started (batch {self.batch_size}, poll every {self.poll_interval}s)")
+        delay: Optional[float] = None
+        while not self.stopped.is_set():
+            try:
+                count = await self.run_once()
+                delay = 0 if count == self.batch_size else self.poll_interval
+                if count:
+                    logger.info(f"✓ Outbox relay published {count} events")
+            except Exception as e:
+                # Rows stay in the outbox and are retried, with a growing pause while Redis is down
+                delay = min((delay or self.poll_interval) * 2, 30)
+                logger.error(f"✗ Outbox relay failed, retrying in {delay:.1f}s: {e}")
+            if delay:
+                try:
+                    await asyncio.wait_for(self.stopped.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    def stop(self):
+        self.stopped.set()
@@ -0,0 +1,350 @@
+"""
+Read-through cache of GET /tasks/{id}: the serialized TaskResponse.
+
+    L1  per-process LRU, TASK_CACHE_L1_SIZE entries for TASK_CACHE_L1_TTL seconds
+    L2  Redis, shared by the instances, TASK_CACHE_TTL seconds
+
+Entries are versioned by a per-task generation kept in Redis
+(tasks:detail:{id}:gen). TaskService.commit() bumps it and drops the entry after
+every committed change of the task; an L2 entry is served only while it carries
+the current generation, and a reader stores what it loaded only if the
+generation did not move meanwhile, so a slow reader cannot put back a body that
+a writer has just invalidated. (updated_at cannot be the version: comments,
+completions and history rows do not touch it.)
+
+Other instances drop their L1 copy when TASK_* events arrive on the event bus;
+changes that publish no event reach them within TASK_CACHE_L1_TTL.
+
+Stampede protection: concurrent misses for one task in a process share a single
+load; across processes the first miss takes a short Redis lock and the others
+wait up to TASK_CACHE_LOCK_WAIT_MS for its fill before reading the database.
+
+When Redis is unreachable the cache runs on L1 alone and tries Redis again after
+TASK_CACHE_REDIS_RETRY seconds.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+# Add parent directory to path for importing shared_events
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+from shared_events import EventType, get_event_bus
+
+logger = logging.getLogger(__name__)
+
+TASK_CACHE_ENABLED = os.getenv("TASK_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+TASK_CACHE_REDIS_URL = os.getenv("TASK_CACHE_REDIS_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+TASK_CACHE_TTL = int(os.getenv("TASK_CACHE_TTL", "300"))
+TASK_CACHE_L1_TTL = float(os.getenv("TASK_CACHE_L1_TTL", "2"))
+TASK_CACHE_L1_SIZE = int(os.getenv("TASK_CACHE_L1_SIZE", "1000"))
+TASK_CACHE_LOCK_MS = int(os.getenv("TASK_CACHE_LOCK_MS", "2000"))
+TASK_CACHE_LOCK_WAIT_MS = int(os.getenv("TASK_CACHE_LOCK_WAIT_MS", "200"))
+TASK_CACHE_REDIS_RETRY = float(os.getenv("TASK_CACHE_REDIS_RETRY", "5"))
+
+KEY_PREFIX = "tasks:detail:"
+LOCK_POLL_SECONDS = 0.02
+
+INVALIDATING_EVENTS = [
+    EventType.TASK_CREATED,
+    EventType.TASK_UPDATED,
+    EventType.TASK_DELETED,
+    EventType.TASK_ASSIGNED,
+    EventType.TASK_COMPLETED,
+]
+
+# Store the entry only if the task's generation is still the one read before loading it
+FILL_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+Loader = Callable[[], Awaitable[Optional[bytes]]]
+
+
+def entry_key(task_id: int) -> str:
+    return f"{KEY_PREFIX}{task_id}"
+
+
+def generation_key(task_id: int) -> str:
+    return f"{KEY_PREFIX}{task_id}:gen"
+
+
+def lock_key(task_id: int) -> str:
+    return f"{KEY_PREFIX}{task_id}:lock"
+
+
+class LocalTaskCache:
+    """task id → serialized body with a TTL, bounded LRU"""
+
+    def __init__(self, ttl: float = TASK_CACHE_L1_TTL, max_size: int = TASK_CACHE_L1_SIZE, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self.entries: "OrderedDict[int, Tuple[float, bytes]]" = OrderedDict()
+        self.lock = threading.Lock()  # event invalidations arrive on the listener thread
+        # Bumped by every invalidation: a load that started before one is not stored
+        self.epoch = 0
+
+    def get(self, task_id: int) -> Optional[bytes]:
+        with self.lock:
+            entry = self.entries.get(task_id)
+            if entry is None:
+                return None
+            if entry[0] <= self.clock():
+                del self.entries[task_id]
+                return None
+            self.entries.move_to_end(task_id)
+            return entry[1]
+
+    def put(self, task_id: int, body: bytes, epoch: int) -> bool:
+        with self.lock:
+            if epoch != self.epoch:
+                return False
+            self.entries[task_id] = (self.clock() + self.ttl, body)
+            self.entries.move_to_end(task_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+            return True
+
+    def invalidate(self, task_ids: Iterable[int]) -> int:
+        with self.lock:
+            self.epoch += 1
+            return sum(self.entries.pop(task_id, None) is not None for task_id in task_ids)
+
+    def clear(self):
+        with self.lock:
+            self.epoch += 1
+            self.entries.clear()
+
+
+class TaskDetailCache:
+    def __init__(self, redis_url: Optional[str] = TASK_CACHE_REDIS_URL, enabled: bool = TASK_CACHE_ENABLED,
+                 ttl: int = TASK_CACHE_TTL, local: Optional[LocalTaskCache] = None, client=None,
+                 lock_ms: int = TASK_CACHE_LOCK_MS, lock_wait_ms: int = TASK_CACHE_LOCK_WAIT_MS):
+        self.enabled = enabled
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self.local = local or LocalTaskCache()
+        self.lock_ms = lock_ms
+        self.lock_wait_ms = lock_wait_ms
+        self._client = client
+        self._retry_at = 0.0
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self.stats = {
+            "l1_hits": 0,
+            "l2_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "lock_waits": 0,
+            "fills": 0,
+            "stale_fills": 0,
+            "invalidations": 0,
+            "redis_errors": 0,
+        }
+
+    def _redis(self):
+        """The Redis client, or None while Redis is unavailable"""
+        if time.monotonic() < self._retry_at:
+            return None
+        if self._client is None and self.redis_url:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                logger.warning("✗ redis is not installed, task cache runs in-process only")
+                self.redis_url = None
+                return None
+            self._client = redis.from_url(self.redis_url, socket_connect_timeout=1, socket_timeout=1)
+        return self._client
+
+    def _redis_failed(self, error: Exception):
+        self.stats["redis_errors"] += 1
+        self._retry_at = time.monotonic() + TASK_CACHE_REDIS_RETRY
+        if self.stats["redis_errors"] == 1 or self.stats["redis_errors"] % 1000 == 0:
+            logger.error(f"✗ Task cache Redis unavailable ({self.stats['redis_errors']} errors), "
+                         f"serving from the local cache: {error}")
+
+    async def get(self, task_id: int, load: Loader) -> Optional[bytes]:
+        """The cached body of the task, else load() and cache it; None (task not found) is not cached"""
+        if not self.enabled:
+            return await load()
+
+        body = self.local.get(task_id)
+        if body is not None:
+            self.stats["l1_hits"] += 1
+            return body
+
+        inflight = self._inflight.get(task_id)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[task_id] = future
+        try:
+            body = await self._read_through(task_id, load)
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception nobody else awaited is not logged
+            future.exception()
+            raise
+        else:
+            future.set_result(body)
+            return body
+        finally:
+            self._inflight.pop(task_id, None)
+
+    async def _read_through(self, task_id: int, load: Loader) -> Optional[bytes]:
+        epoch = self.local.epoch
+        client = self._redis()
+        generation, locked = None, False
+        if client is not None:
+            try:
+                cached, generation = await client.mget(entry_key(task_id), generation_key(task_id))
+                generation = generation or b"0"
+                body = self._current(cached, generation)
+                if body is None:
+                    locked = await client.set(lock_key(task_id), b"1", nx=True, px=self.lock_ms)
+                    if not locked:
+                        body = await self._wait_for_fill(client, task_id, generation)
+                if body is not None:
+                    self.stats["l2_hits"] += 1
+                    self.local.put(task_id, body, epoch)
+                    return body
+            except Exception as e:
+                self._redis_failed(e)
+                client = None
+
+        self.stats["misses"] += 1
+        try:
+            body = await load()
+            if body is not None:
+                self.local.put(task_id, body, epoch)
+                if client is not None:
+                    await self._fill(client, task_id, generation, body)
+        finally:
+            if locked and client is not None:
+                try:
+                    await client.delete(lock_key(task_id))
+                except Exception as e:
+                    self._redis_failed(e)
+        return body
+
+    @staticmethod
+    def _current(cached: Optional[bytes], generation: bytes) -> Optional[bytes]:
+        """An entry is "<generation>:<body>"; it counts only for the task's current generation"""
+        if cached is None:
+            return None
+        entry_generation, _, body = cached.partition(b":")
+        return body if entry_generation == generation else None
+
+    async def _wait_for_fill(self, client, task_id: int, generation: bytes) -> Optional[bytes]:
+        """Another process holds the lock and is loading the task: give it lock_wait_ms to store it"""
+        self.stats["lock_waits"] += 1
+        deadline = time.monotonic() + self.lock_wait_ms / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+            body = self._current(await client.get(entry_key(task_id)), generation)
+            if body is not None:
+                return body
+        return None
+
+    async def _fill(self, client, task_id: int, generation: bytes, body: bytes):
+        try:
+            stored = await client.eval(FILL_SCRIPT, 2, entry_key(task_id), generation_key(task_id),
+                                       generation, generation + b":" + body, self.ttl)
+        except Exception as e:
+            self._redis_failed(e)
+            return
+        self.stats["fills" if stored else "stale_fills"] += 1
+
+    async def invalidate(self, task_ids: Iterable[int]):
+        """The tasks changed: drop the local copies and move their Redis generation on"""
+        task_ids = list(dict.fromkeys(task_ids))
+        if not self.enabled or not task_ids:
+            return
+        self.stats["invalidations"] += len(task_ids)
+        self.local.invalidate(task_ids)
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                for task_id in task_ids:
+                    pipe.incr(generation_key(task_id))
+                    pipe.delete(entry_key(task_id))
+                await pipe.execute()
+        except Exception as e:
+            # The entries stay in Redis until TASK_CACHE_TTL
+            self._redis_failed(e)
+
+    def handle_task_event(self, event):
+        """TASK_* from the event bus (listener thread): drop this process's copy"""
+        task_id = (event.data or {}).get("task_id") or event.aggregate_id
+        self.local.invalidate([int(task_id)])
+
+    def clear(self):
+        self.local.clear()
+
+    def get_stats(self) -> dict:
+        lookups = self.stats["l1_hits"] + self.stats["l2_hits"] + self.stats["misses"] + self.stats["coalesced"]
+        hits = lookups - self.stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "redis": self._client is not None and time.monotonic() >= self._retry_at,
+            "l1_size": len(self.local.entries),
+            "ttl_seconds": self.ttl,
+            "l1_ttl_seconds": self.local.ttl,
+            **self.stats,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def start_task_cache_invalidation() -> Optional[threading.Event]:
+    """
+    Listen for task events on a background thread; returns the event that stops it,
+    or None when the event bus is unreachable (local copies then expire by TTL only)
+    """
+    try:
+        event_bus = get_event_bus()
+    except Exception as e:
+        logger.warning(f"✗ Task cache invalidation disabled, event bus unavailable: {e}")
+        return None
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=event_bus.listen,
+        args=(INVALIDATING_EVENTS, get_task_cache().handle_task_event, stop),
+        name="task-cache-invalidation",
+        daemon=True,
+    )
+    thread.start()
+    logger.info("✓ Task cache invalidation listening for TASK_* events")
+    return stop
+
+
+# Singleton instance for easy access
+_task_cache: Optional[TaskDetailCache] = None
+
+def get_task_cache() -> TaskDetailCache:
+    """Get or create the task detail cache"""
+    global _task_cache
+    if _task_cache is None:
+        _task_cache = TaskDetailCache()
+    return _task_cache
+
+def set_task_cache(cache: Optional[TaskDetailCache]):
+    """Replace the task detail cache (used by tests)"""
+    global _task_cache
+    _task_cache = cache
@@ -0,0 +1,174 @@
+"""
+Materialized task counters (task_counters table) behind GET /tasks/stats.
+
+Every write that changes a task's status or workers adds the difference of the
+task's contribution before and after the change to the counters, in the same
+transaction: one INSERT ... ON CONFLICT DO UPDATE SET value = value + delta for
+all keys it touches. Reading the stats is then a scan of a few rows, whatever
+the number of tasks.
+
+A task contributes 1 to ("status", its status) and, unless it is completed,
+1 to ("worker_open", worker id) for each assigned worker.
+
+The "before" side of a delta is only exact if no other request changed the
+task between the read and the write, so the counters are only ever applied
+together with a version-checked write: single-task writes raise StaleDataError
+on the task's UPDATE and roll the deltas back with it, bulk updates only count
+the tasks their version-matched UPDATE returned, deletes count the rows
+DELETE ... RETURNING removed.
+
+reconcile() recomputes the counters from the tasks and reports (and with
+fix=True repairs) drift, e.g. after writes that bypassed TaskService or a
+manual data fix; the write path itself does not leave any. It runs as reconcile_counters.py (a CronJob) and on startup
+when the table is still empty.
+"""
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import AsyncSessionLocal
+from app.models.counter import TaskCounter
+from app.models.task import Task, TaskStatus, task_workers
+
+logger = logging.getLogger(__name__)
+
+STATUS = "status"
+WORKER_OPEN = "worker_open"
+
+TaskState = Tuple[str, Tuple[int, ...]]
+
+
+def _status_value(status) -> str:
+    return TaskStatus(status).value
+
+
+class TaskCounters:
+    @staticmethod
+    def state(status, worker_ids: Iterable[int]) -> TaskState:
+        """What a task contributes to the counters: its status and assigned workers"""
+        return _status_value(status), tuple(dict.fromkeys(worker_ids or []))
+
+    @staticmethod
+    def task_state(task: Task) -> TaskState:
+        return TaskCounters.state(task.status or TaskStatus.NEW, task.worker_ids)
+
+    @staticmethod
+    def contribution(state: Optional[TaskState]) -> Counter:
+        counts = Counter()
+        if state is None:
+            return counts
+        status, worker_ids = state
+        counts[(STATUS, status)] += 1
+        if status != TaskStatus.COMPLETED.value:
+            for worker_id in worker_ids:
+                counts[(WORKER_OPEN, str(worker_id))] += 1
+        return counts
+
+    @staticmethod
+    def change(before: Optional[TaskState], after: Optional[TaskState], deltas: Counter = None) -> Counter:
+        """Add after - before to deltas; None stands for a task that does not exist (created / deleted)"""
+        deltas = Counter() if deltas is None else deltas
+        deltas.update(TaskCounters.contribution(after))
+        deltas.subtract(TaskCounters.contribution(before))
+        return deltas
+
+    @staticmethod
+    def _upsert(db: AsyncSession, rows: List[dict], replace: bool = False):
+        dialect = db.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = insert(TaskCounter).values(rows)
+        value = statement.excluded.value if replace else TaskCounter.value + statement.excluded.value
+        return statement.on_conflict_do_update(index_elements=[TaskCounter.name, TaskCounter.key],
+                                               set_={"value": value})
+
+    @staticmethod
+    async def apply(db: AsyncSession, deltas: Counter):
+        """One statement for all changed counters; rows are locked in key order so writers cannot deadlock"""
+        rows = [{"name": name, "key": key, "value": delta}
+                for (name, key), delta in sorted(deltas.items()) if delta]
+        if rows:
+            await db.execute(TaskCounters._upsert(db, rows))
+
+    @staticmethod
+    async def track(db: AsyncSession, task: Task, before: TaskState):
+        """Apply the change of a loaded task since `before` (TaskCounters.task_state taken earlier)"""
+        await TaskCounters.apply(db, TaskCounters.change(before, TaskCounters.task_state(task)))
+
+    @staticmethod
+    async def get_counters(db: AsyncSession) -> Dict[str, Dict[str, int]]:
+        counters: Dict[str, Dict[str, int]] = {STATUS: {}, WORKER_OPEN: {}}
+        for name, key, value in await db.execute(select(TaskCounter.name, TaskCounter.key, TaskCounter.value)):
+            if value:
+                counters.setdefault(name, {})[key] = value
+        return counters
+
+    @staticmethod
+    async def get_stats(db: AsyncSession) -> dict:
+        counters = await TaskCounters.get_counters(db)
+        by_status = {status.value: counters[STATUS].get(status.value, 0) for status in TaskStatus}
+        total = sum(by_status.values())
+        return {
+            "total": total,
+            "by_status": by_status,
+            "completion_ratio": round(by_status[TaskStatus.COMPLETED.value] / total, 4) if total else 0.0,
+            "open_by_worker": {int(key): value for key, value in sorted(counters[WORKER_OPEN].items(),
+                                                                        key=lambda item: int(item[0]))},
+        }
+
+    @staticmethod
+    async def compute(db: AsyncSession) -> Counter:
+        """The counters recomputed from tasks and task_workers"""
+        actual = Counter()
+        for status, count in await db.execute(select(Task.status, func.count()).group_by(Task.status)):
+            actual[(STATUS, _status_value(status or TaskStatus.NEW))] += count
+        open_tasks = await db.execute(
+            select(task_workers.c.worker_id, func.count())
+            .join(Task, Task.id == task_workers.c.task_id)
+            .where(Task.status.is_distinct_from(TaskStatus.COMPLETED))
+            .group_by(task_workers.c.worker_id)
+        )
+        for worker_id, count in open_tasks:
+            actual[(WORKER_OPEN, str(worker_id))] = count
+        return actual
+
+    @staticmethod
+    async def reconcile(db: AsyncSession, fix: bool = False) -> List[dict]:
+        """
+        Compare the counters with the tasks; returns the drifted counters and,
+        with fix=True, overwrites them. Commits (releasing the lock) either way.
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            # Writers update the counters before they commit: once this lock is held every
+            # committed change is counted and new ones wait until the repair is committed
+            await db.execute(text("LOCK TABLE task_counters IN EXCLUSIVE MODE"))
+        stored = Counter({(name, key): value for name, key, value in
+                          await db.execute(select(TaskCounter.name, TaskCounter.key, TaskCounter.value))})
+        actual = await TaskCounters.compute(db)
+        drift = [
+            {"name": name, "key": key, "stored": stored.get((name, key), 0), "actual": actual.get((name, key), 0)}
+            for name, key in sorted(set(stored) | set(actual))
+            if stored.get((name, key), 0) != actual.get((name, key), 0)
+        ]
+        if drift and fix:
+            await db.execute(TaskCounters._upsert(
+                db, [{"name": item["name"], "key": item["key"], "value": item["actual"]} for item in drift],
+                replace=True
+            ))
+            await db.execute(delete(TaskCounter).where(TaskCounter.value == 0))
+        await db.commit()
+        return drift
+
+
+async def initialize_task_counters(session_factory=AsyncSessionLocal) -> int:
+    """Fill task_counters for tasks that existed before it; returns the number of counters written"""
+    async with session_factory() as db:
+        if await db.scalar(select(func.count()).select_from(TaskCounter)):
+            return 0
+        written = len(await TaskCounters.reconcile(db, fix=True))
+    if written:
+        logger.info(f"✓ Task counters initialized ({written} counters)")
+    return written
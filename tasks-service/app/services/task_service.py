@@ -1,114 +1,372 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import insert, delete as sql_delete
-from app.models.task import Task, Comment, History, WorkerCompletion, TaskStatus, TaskPriority, HistoryEventType, task_workers
-from app.db.database import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import insert, update, delete as sql_delete, tuple_, select, func, and_, or_, case
+from app.models.task import (
+    Task, TaskWorker, Comment, History, WorkerCompletion, TaskStatus, TaskPriority, HistoryEventType,
+    task_workers, task_search_vector, SEARCH_CONFIG
+)
+from app.schemas.task import BulkAction, BulkOperation, TaskFilters
+from app.services.outbox import Outbox
+from app.services.task_cache import get_task_cache
+from app.services.task_counters import TaskCounters
+from app.utils.pagination import decode_cursor, encode_cursor, parse_sort, split_page
+from collections import Counter
+from typing import AsyncIterator, Collection, List, Optional
 import logging
-import json
+import os
+import sys
+
+# Add parent directory to path for importing shared_events
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+from shared_events import EventType
 
 logger = logging.getLogger(__name__)
 
+# Rows fetched per round trip by the NDJSON timeline export
+TIMELINE_EXPORT_BATCH_SIZE = int(os.getenv("TIMELINE_EXPORT_BATCH_SIZE", "500"))
+
+# Columns of the summary projection; the counts are correlated subqueries,
+# evaluated only for the rows of the page
+SUMMARY_COLUMNS = {
+    "id": Task.id,
+    "title": Task.title,
+    "status": Task.status,
+    "priority": Task.priority,
+    "created_by": Task.created_by,
+    "created_at": Task.created_at,
+    "updated_at": Task.updated_at,
+    "comments_count": select(func.count(Comment.id)).where(Comment.task_id == Task.id).scalar_subquery(),
+    "completions_count": select(func.count(WorkerCompletion.id)).where(WorkerCompletion.task_id == Task.id).scalar_subquery(),
+    "workers_count": select(func.count()).select_from(task_workers).where(task_workers.c.task_id == Task.id).scalar_subquery(),
+}
+
+# Keys accepted by the sort parameter (app.utils.pagination.SORT_KEYS)
+SORT_COLUMNS = {
+    "created_at": Task.created_at,
+    "updated_at": Task.updated_at,
+    "priority": Task.priority,
+    "status": Task.status,
+    "title": Task.title,
+}
+
+# Everything TaskResponse serializes. AsyncSession cannot lazy-load on
+# attribute access, so relationships are loaded with the task.
+TASK_DETAIL_OPTIONS = (
+    selectinload(Task.comments),
+    selectinload(Task.history),
+    selectinload(Task.worker_completions),
+)
+
+class VersionMismatch(Exception):
+    """If-Match named versions of the task other than its current one"""
+
+    def __init__(self, task: Task):
+        super().__init__(f"Task {task.id} is at version {task.version}")
+        self.task = task
+
+
 class TaskService:
     @staticmethod
-    def create_task(db: Session, title: str, description: str, priority: TaskPriority, 
-                   created_by: int, worker_ids: list = None) -> Task:
+    def check_version(task: Task, expected: Optional[Collection[int]]):
+        """expected: the versions If-Match accepts, None when the request has no precondition"""
+        if expected is not None and task.version not in expected:
+            raise VersionMismatch(task)
+
+    @staticmethod
+    def touch(task: Task):
+        """
+        UPDATE the task row even when only its workers or children change, so that
+        updated_at and the version move and the version check runs
+        """
+        task.updated_at = func.now()
+
+    @staticmethod
+    async def commit(db: AsyncSession, *task_ids: int):
+        """Commit a change of the tasks, then drop their cached GET /tasks/{id} bodies"""
+        await db.commit()
+        await get_task_cache().invalidate(task_ids)
+
+    @staticmethod
+    async def create_task(db: AsyncSession, title: str, description: str, priority: TaskPriority,
+                          created_by: int, worker_ids: list = None) -> Task:
+        # Collections are set up front, so the task can be returned as is after the commit:
+        # INSERT ... RETURNING fills id and the server defaults, nothing is read back
         task = Task(
             title=title,
             description=description,
             priority=priority,
             created_by=created_by,
-            status=TaskStatus.NEW
+            status=TaskStatus.NEW,
+            comments=[],
+            worker_completions=[],
+            worker_assignments=[],
+            history=[History(
+                event_type=HistoryEventType.CREATED,
+                user_id=created_by,
+                details={"title": title, "priority": priority}
+            )]
         )
-        db.add(task)
-        db.flush()
-        
-        # Store worker IDs
+        # Store worker IDs (before the flush, while the collection is known to be empty)
         if worker_ids:
             task.worker_ids_list = worker_ids
-        
-        # Add history event
-        history = History(
-            task_id=task.id,
-            event_type=HistoryEventType.CREATED,
-            user_id=created_by,
-            details=json.dumps({"title": title, "priority": priority})
-        )
-        db.add(history)
-        
-        db.commit()
-        db.refresh(task)
+        db.add(task)
+        await db.flush()
+
+        # Published by the outbox relay once this transaction commits
+        Outbox.add(db, EventType.TASK_CREATED, task.id, {
+            "task_id": task.id,
+            "title": title,
+            "description": description,
+            "priority": priority,
+            "status": TaskStatus.NEW,
+            "created_by": created_by,
+            "worker_ids": task.worker_ids
+        })
+        await TaskCounters.apply(db, TaskCounters.change(None, TaskCounters.task_state(task)))
+
+        await db.commit()
         return task
 
     @staticmethod
-    def get_task(db: Session, task_id: int) -> Task:
-        return db.query(Task).filter(Task.id == task_id).first()
+    async def get_task(db: AsyncSession, task_id: int) -> Task:
+        result = await db.execute(select(Task).options(*TASK_DETAIL_OPTIONS).where(Task.id == task_id))
+        return result.scalars().first()
+
+    @staticmethod
+    async def load_task(db: AsyncSession, task_id: int) -> Task:
+        """
+        Task with everything TaskResponse serializes, for a write that returns it.
+        Served from the identity map when the request already loaded it, so a task
+        is read once per request; writes then mutate it instead of reading it back.
+        """
+        return await db.get(Task, task_id, options=TASK_DETAIL_OPTIONS)
+
+    @staticmethod
+    def keyset_after(keys: list, position):
+        """Rows strictly after the cursor position in the (keys..., id) order"""
+        columns = [SORT_COLUMNS[key] for key, _ in keys] + [Task.id]
+        directions = [direction for _, direction in keys] + [keys[-1][1]]
+        values = position.values + [position.id]
+        if len(set(directions)) == 1:
+            # Row-value comparison, a single range condition on a composite index
+            if directions[0] == "desc":
+                return tuple_(*columns) < tuple_(*values)
+            return tuple_(*columns) > tuple_(*values)
+        # Mixed directions: a > :a OR (a = :a AND b < :b) OR ...
+        clauses = []
+        for i, (column, direction, value) in enumerate(zip(columns, directions, values)):
+            after = column < value if direction == "desc" else column > value
+            clauses.append(and_(*(c == v for c, v in zip(columns[:i], values[:i])), after))
+        return or_(*clauses)
 
     @staticmethod
-    def get_all_tasks(db: Session, skip: int = 0, limit: int = 100, status: TaskStatus = None):
-        query = db.query(Task)
+    async def paginate(db: AsyncSession, query, limit: int = 100, cursor: str = None, sort: str = "created_at",
+                       order: str = "asc", scalars: bool = True):
+        """
+        Keyset pagination on (sort keys..., id); sort is "key" or "key,-key,..." (see parse_sort).
+        query is a select(); scalars=False returns rows for multi-column selects.
+        Returns (items, next_cursor). Raises InvalidSort for an unknown sort key, InvalidCursor
+        for a malformed cursor or one issued for another sort.
+        """
+        keys = parse_sort(sort, order)
+        if cursor:
+            query = query.where(TaskService.keyset_after(keys, decode_cursor(cursor, keys)))
+        order_by = [
+            SORT_COLUMNS[key].desc() if direction == "desc" else SORT_COLUMNS[key].asc()
+            for key, direction in keys
+        ]
+        order_by.append(Task.id.desc() if keys[-1][1] == "desc" else Task.id.asc())
+        # One extra row tells whether there is a next page
+        result = await db.execute(query.order_by(*order_by).limit(limit + 1))
+        rows = result.scalars().all() if scalars else result.all()
+        return split_page(rows, limit, keys)
+
+    @staticmethod
+    def search_condition(db, q: str):
+        """
+        Full-text match on title + description: tsvector/GIN on Postgres,
+        every word as a case-insensitive substring elsewhere (SQLite in tests)
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            return task_search_vector.bool_op("@@")(func.plainto_tsquery(SEARCH_CONFIG, q))
+        conditions = []
+        for word in q.split():
+            pattern = "%" + word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            conditions.append(or_(
+                Task.title.ilike(pattern, escape="\\"),
+                Task.description.ilike(pattern, escape="\\")
+            ))
+        return and_(*conditions)
+
+    @staticmethod
+    def apply_filters(db, query, filters: TaskFilters = None, status: TaskStatus = None):
+        """Add TaskFilters conditions to a select() over tasks; every field is optional"""
         if status:
-            query = query.filter(Task.status == status)
-        return query.offset(skip).limit(limit).all()
-
-    @staticmethod
-    def get_task_by_worker(db: Session, worker_id: int, skip: int = 0, limit: int = 100):
-        # This is simplified - in production use proper many-to-many relationship
-        from sqlalchemy import and_
-        query = db.query(Task).filter(
-            Task.id.in_(
-                db.query(Task.id).filter(
-                    Task.id.in_(
-                        db.query(WorkerCompletion.task_id).filter(
-                            WorkerCompletion.worker_id == worker_id
-                        )
-                    )
-                )
-            )
-        ).offset(skip).limit(limit)
-        return query.all()
+            query = query.where(Task.status == status)
+        if filters is None:
+            return query
+        if filters.status:
+            query = query.where(Task.status.in_(filters.status))
+        if filters.priority:
+            query = query.where(Task.priority.in_(filters.priority))
+        if filters.created_by is not None:
+            query = query.where(Task.created_by == filters.created_by)
+        if filters.worker_id is not None:
+            # IN (subquery) starts from ix_task_workers_worker_id_task_id; EXISTS would scan tasks
+            query = query.where(Task.id.in_(
+                select(task_workers.c.task_id).where(task_workers.c.worker_id == filters.worker_id)
+            ))
+        if filters.created_from:
+            query = query.where(Task.created_at >= filters.created_from)
+        if filters.created_to:
+            query = query.where(Task.created_at < filters.created_to)
+        if filters.updated_from:
+            query = query.where(Task.updated_at >= filters.updated_from)
+        if filters.updated_to:
+            query = query.where(Task.updated_at < filters.updated_to)
+        if filters.q and filters.q.strip():
+            query = query.where(TaskService.search_condition(db, filters.q.strip()))
+        return query
+
+    @staticmethod
+    async def get_tasks_page(db: AsyncSession, limit: int = 100, cursor: str = None, sort: str = "created_at",
+                             order: str = "asc", status: TaskStatus = None, detailed: bool = True,
+                             filters: TaskFilters = None, skip: int = 0):
+        query = select(Task).options(selectinload(Task.worker_completions))
+        if detailed:
+            query = query.options(selectinload(Task.comments), selectinload(Task.history))
+        query = TaskService.apply_filters(db, query, filters, status)
+        if skip and not cursor:
+            query = query.offset(skip)
+        return await TaskService.paginate(db, query, limit, cursor, sort, order)
+
+    @staticmethod
+    async def get_task_summaries(db: AsyncSession, fields: list = None, limit: int = 100, cursor: str = None,
+                                 sort: str = "created_at", order: str = "asc", status: TaskStatus = None,
+                                 skip: int = 0, filters: TaskFilters = None):
+        """
+        Summary rows without relationships: only the requested columns and counts are selected.
+        Returns (rows, next_cursor); rows always carry id and the sort columns for the cursor.
+        """
+        sort_keys = [key for key, _ in parse_sort(sort, order)]
+        names = list(dict.fromkeys(["id"] + sort_keys + list(fields or SUMMARY_COLUMNS)))
+        query = select(*(SUMMARY_COLUMNS[name].label(name) for name in names)).select_from(Task)
+        query = TaskService.apply_filters(db, query, filters, status)
+        if skip and not cursor:
+            query = query.offset(skip)
+        return await TaskService.paginate(db, query, limit, cursor, sort, order, scalars=False)
+
+    @staticmethod
+    def timeline_query(model, task_id: int, cursor: str = None, order: str = "asc"):
+        """
+        Comments or history of one task in (created_at, id) order, served by the
+        (task_id, created_at, id) index. Plain rows, no ORM identity map.
+        """
+        keys = [("created_at", order)]
+        query = select(*model.__table__.c).where(model.task_id == task_id)
+        if cursor:
+            position = decode_cursor(cursor, keys)
+            after = tuple_(model.created_at, model.id)
+            values = tuple_(*position.values, position.id)
+            query = query.where(after < values if order == "desc" else after > values)
+        if order == "desc":
+            return query.order_by(model.created_at.desc(), model.id.desc())
+        return query.order_by(model.created_at.asc(), model.id.asc())
+
+    @staticmethod
+    async def get_timeline_page(db: AsyncSession, model, task_id: int, limit: int = 100, cursor: str = None,
+                                order: str = "asc"):
+        """
+        One page of comments or history. Returns (rows, next_cursor), or None when
+        the task does not exist. Raises InvalidCursor like paginate().
+        """
+        query = TaskService.timeline_query(model, task_id, cursor, order)
+        rows = (await db.execute(query.limit(limit + 1))).all()
+        if not rows and not await TaskService.task_exists(db, task_id):
+            return None
+        if len(rows) <= limit:
+            return rows, None
+        last = rows[limit - 1]
+        return rows[:limit], encode_cursor([("created_at", order)], [last.created_at], last.id)
+
+    @staticmethod
+    async def stream_timeline(db: AsyncSession, model, task_id: int, order: str = "asc") -> AsyncIterator:
+        """
+        Every comment or history row of a task, fetched TIMELINE_EXPORT_BATCH_SIZE
+        at a time through a server-side cursor, so memory does not grow with the task
+        """
+        query = TaskService.timeline_query(model, task_id, order=order)
+        result = await db.stream(query.execution_options(yield_per=TIMELINE_EXPORT_BATCH_SIZE))
+        async for row in result:
+            yield row
+
+    @staticmethod
+    async def task_exists(db: AsyncSession, task_id: int) -> bool:
+        return await db.scalar(select(Task.id).where(Task.id == task_id)) is not None
 
     @staticmethod
-    def update_task(db: Session, task_id: int, title: str = None, description: str = None,
-                   status: TaskStatus = None, priority: TaskPriority = None,
-                   worker_ids: list = None, updated_by: int = None) -> Task:
-        task = db.query(Task).filter(Task.id == task_id).first()
+    async def get_task_by_worker(db: AsyncSession, worker_id: int, limit: int = 100, cursor: str = None,
+                                 sort: str = "created_at", order: str = "asc"):
+        """Tasks the worker has marked as completed. Returns (tasks, next_cursor)"""
+        query = select(Task).join(WorkerCompletion, WorkerCompletion.task_id == Task.id).where(
+            WorkerCompletion.worker_id == worker_id
+        )
+        return await TaskService.paginate(db, query, limit, cursor, sort, order)
+
+    @staticmethod
+    async def update_task(db: AsyncSession, task_id: int, title: str = None, description: str = None,
+                          status: TaskStatus = None, priority: TaskPriority = None,
+                          worker_ids: list = None, updated_by: int = None,
+                          expected_versions: Collection[int] = None) -> Task:
+        task = await TaskService.load_task(db, task_id)
         if not task:
             return None
-        
+        TaskService.check_version(task, expected_versions)
+        counted = TaskCounters.task_state(task)
+        TaskService.touch(task)
+
         if title:
             task.title = title
         if description:
             task.description = description
         if priority:
             task.priority = priority
-        
+
         if status and status != task.status:
             old_status = task.status
             task.status = status
-            history = History(
-                task_id=task_id,
+            task.history.append(History(
                 event_type=HistoryEventType.STATUS_CHANGED,
                 user_id=updated_by,
-                details=json.dumps({"from": old_status, "to": status})
-            )
-            db.add(history)
-        
+                details={"from": old_status, "to": status}
+            ))
+
         if worker_ids is not None:
             task.worker_ids_list = worker_ids
             if updated_by:
-                history = History(
-                    task_id=task_id,
+                task.history.append(History(
                     event_type=HistoryEventType.ASSIGNED,
                     user_id=updated_by,
-                    details=json.dumps({"worker_ids": worker_ids})
-                )
-                db.add(history)
-        
-        db.commit()
-        db.refresh(task)
+                    details={"worker_ids": worker_ids}
+                ))
+
+        Outbox.add(db, EventType.TASK_UPDATED, task_id, {
+            "task_id": task_id,
+            "title": task.title,
+            "status": task.status,
+            "priority": task.priority,
+            "updated_by": updated_by
+        })
+
+        # UPDATE ... WHERE version = <loaded> RETURNING updated_at (eager_defaults), the task stays current
+        await TaskCounters.track(db, task, counted)
+        await TaskService.commit(db, task_id)
         return task
 
     @staticmethod
-    def add_comment(db: Session, task_id: int, user_id: int, text: str, full_name: str = "Unknown User") -> Comment:
+    async def add_comment(db: AsyncSession, task_id: int, user_id: int, text: str,
+                          full_name: str = "Unknown User") -> Comment:
         comment = Comment(
             task_id=task_id,
             user_id=user_id,
@@ -116,108 +374,292 @@ class TaskService:
             text=text
         )
         db.add(comment)
-        
+
         history = History(
             task_id=task_id,
             event_type=HistoryEventType.COMMENT_ADDED,
             user_id=user_id,
-            details=json.dumps({"comment": text, "author": full_name})
+            details={"comment": text, "author": full_name}
         )
         db.add(history)
-        
-        db.commit()
-        db.refresh(comment)
+
+        # created_at comes back with INSERT ... RETURNING
+        await TaskService.commit(db, task_id)
         return comment
 
     @staticmethod
-    def mark_worker_completed(db: Session, task_id: int, worker_id: int) -> WorkerCompletion:
-        existing = db.query(WorkerCompletion).filter(
+    async def mark_worker_completed(db: AsyncSession, task_id: int, worker_id: int) -> WorkerCompletion:
+        result = await db.execute(select(WorkerCompletion).where(
             WorkerCompletion.task_id == task_id,
             WorkerCompletion.worker_id == worker_id
-        ).first()
-        
+        ))
+        existing = result.scalars().first()
+
         if existing:
             return existing
-        
+
         completion = WorkerCompletion(
             task_id=task_id,
             worker_id=worker_id
         )
         db.add(completion)
-        
+
         history = History(
             task_id=task_id,
             event_type=HistoryEventType.WORKER_COMPLETED,
             user_id=worker_id,
-            details=json.dumps({"worker_id": worker_id})
+            details={"worker_id": worker_id}
         )
         db.add(history)
-        
-        db.commit()
-        db.refresh(completion)
+        Outbox.add(db, EventType.TASK_COMPLETED, task_id, {"task_id": task_id, "worker_id": worker_id})
+
+        await TaskService.commit(db, task_id)
         return completion
 
     @staticmethod
-    def approve_task(db: Session, task_id: int, approved_by: int) -> Task:
-        task = db.query(Task).filter(Task.id == task_id).first()
+    async def return_to_rework(db: AsyncSession, task_id: int, returned_by: int,
+                               expected_versions: Collection[int] = None) -> Task:
+        task = await TaskService.load_task(db, task_id)
         if not task:
             return None
-        
-        task.status = TaskStatus.COMPLETED
-        
-        history = History(
-            task_id=task_id,
-            event_type=HistoryEventType.APPROVED,
-            user_id=approved_by,
-            details=json.dumps({"action": "approved"})
-        )
-        db.add(history)
-        
-        db.commit()
-        db.refresh(task)
-        return task
+        TaskService.check_version(task, expected_versions)
+        counted = TaskCounters.task_state(task)
+        TaskService.touch(task)
 
-    @staticmethod
-    def return_to_rework(db: Session, task_id: int, returned_by: int) -> Task:
-        task = db.query(Task).filter(Task.id == task_id).first()
-        if not task:
-            return None
-        
+        old_status = task.status
         task.status = TaskStatus.REWORK
-        
-        history = History(
-            task_id=task_id,
+        task.history.append(History(
             event_type=HistoryEventType.RETURNED,
             user_id=returned_by,
-            details=json.dumps({"action": "returned_to_rework"})
-        )
-        db.add(history)
-        
+            details={"action": "returned_to_rework", "from": old_status, "to": TaskStatus.REWORK}
+        ))
+
         # Clear worker completions for rework
-        db.query(WorkerCompletion).filter(WorkerCompletion.task_id == task_id).delete()
-        
-        db.commit()
-        db.refresh(task)
+        await TaskService._clear_completions(db, task)
+
+        await TaskCounters.track(db, task, counted)
+        await TaskService.commit(db, task_id)
         return task
 
     @staticmethod
-    def delete_task(db: Session, task_id: int) -> bool:
-        task = db.query(Task).filter(Task.id == task_id).first()
-        if not task:
-            return False
-        db.delete(task)
-        db.commit()
-        return True
+    async def _clear_completions(db: AsyncSession, task: Task):
+        """One DELETE for all completions; the loaded collection is emptied without a per-row delete"""
+        await db.execute(sql_delete(WorkerCompletion).where(WorkerCompletion.task_id == task.id))
+        set_committed_value(task, "worker_completions", [])
 
     @staticmethod
-    def get_task_with_workers(db: Session, task_id: int) -> dict:
-        task = db.query(Task).filter(Task.id == task_id).first()
+    async def delete_task(db: AsyncSession, task_id: int) -> bool:
+        # Set-based like the bulk delete, nothing is loaded first
+        deleted = await TaskService._bulk_delete(db, [task_id])
+        await TaskCounters.apply(db, TaskCounters.change(deleted.get(task_id), None))
+        await TaskService.commit(db, task_id)
+        return bool(deleted)
+
+    @staticmethod
+    async def bulk(db: AsyncSession, operations: List[BulkOperation], user_id: int):
+        """
+        Apply bulk operations in order, in one transaction. Each operation is one
+        set-based statement over its task ids (UPDATE/DELETE ... WHERE id IN),
+        history rows are collected and inserted with one executemany.
+        TASK_CREATED / TASK_UPDATED events go to the outbox in the same transaction.
+        Updates only apply to tasks still at the version read here, a task another
+        request changed in the meantime is reported as conflict and left alone.
+        Returns a result dict per item.
+        """
+        # Current state of every addressed task in one SELECT: unknown ids,
+        # the "from" of status history, the counter deltas and the event payloads
+        task_ids = {task_id for operation in operations for task_id in operation.task_ids}
+        state = {}
+        if task_ids:
+            rows = await db.execute(
+                select(Task.id, Task.title, Task.status, Task.priority, Task.version).where(Task.id.in_(task_ids))
+            )
+            state = {row.id: {**row._asdict(), "worker_ids": []} for row in rows}
+            assignments = await db.execute(select(task_workers).where(task_workers.c.task_id.in_(task_ids)))
+            for task_id, worker_id in assignments:
+                state[task_id]["worker_ids"].append(worker_id)
+
+        results, history = [], []
+        changes = {"created": [], "updated": {}}
+        counters = Counter()
+        counted = lambda task_id: TaskCounters.state(state[task_id]["status"], state[task_id]["worker_ids"])
+        for position, operation in enumerate(operations):
+            if operation.action == BulkAction.CREATE:
+                created_ids = await TaskService._bulk_create(db, operation, user_id, history, changes)
+                for item in operation.tasks:
+                    TaskCounters.change(None, TaskCounters.state(TaskStatus.NEW, item.worker_ids), counters)
+                results.extend(
+                    {"operation": position, "action": operation.action, "index": index,
+                     "task_id": task_id, "result": "created"}
+                    for index, task_id in enumerate(created_ids)
+                )
+                continue
+
+            requested = list(dict.fromkeys(operation.task_ids))
+            found = [task_id for task_id in requested if task_id in state]
+            applied = found
+            if found and operation.action == BulkAction.DELETE:
+                deleted = await TaskService._bulk_delete(db, found)
+                for before in deleted.values():
+                    TaskCounters.change(before, None, counters)
+                for task_id in found:
+                    del state[task_id]
+                    changes["updated"].pop(task_id, None)
+                history[:] = [row for row in history if row["task_id"] not in found]
+            elif found:
+                before = {task_id: counted(task_id) for task_id in found}
+                applied = await TaskService._bulk_update(db, operation, found, state, user_id, history)
+                for task_id in applied:
+                    changes["updated"][task_id] = state[task_id]
+                    TaskCounters.change(before[task_id], counted(task_id), counters)
+            done = "deleted" if operation.action == BulkAction.DELETE else "updated"
+            results.extend(
+                {"operation": position, "action": operation.action, "task_id": task_id,
+                 "result": done if task_id in applied else "conflict" if task_id in found else "not_found"}
+                for task_id in requested
+            )
+
+        if history:
+            await db.execute(insert(History), history)
+        await Outbox.add_many(db, [
+            (EventType.TASK_CREATED, data["task_id"], data) for data in changes["created"]
+        ] + [
+            (EventType.TASK_UPDATED, task_id, {"task_id": task_id, "title": task["title"], "status": task["status"],
+                                               "priority": task["priority"], "updated_by": user_id})
+            for task_id, task in changes["updated"].items()
+        ])
+        await TaskCounters.apply(db, counters)
+        await TaskService.commit(db, *task_ids)
+        return results
+
+    @staticmethod
+    async def _bulk_create(db: AsyncSession, operation: BulkOperation, user_id: int,
+                           history: list, changes: dict) -> list:
+        # Multi-row INSERT ... RETURNING id, ids come back in the order of the items
+        result = await db.execute(
+            insert(Task).returning(Task.id, sort_by_parameter_order=True),
+            [
+                {"title": item.title, "description": item.description, "priority": item.priority,
+                 "created_by": user_id, "status": TaskStatus.NEW}
+                for item in operation.tasks
+            ]
+        )
+        task_ids = result.scalars().all()
+        assignments = [
+            {"task_id": task_id, "worker_id": worker_id}
+            for task_id, item in zip(task_ids, operation.tasks)
+            for worker_id in dict.fromkeys(item.worker_ids)
+        ]
+        if assignments:
+            await db.execute(insert(task_workers), assignments)
+        for task_id, item in zip(task_ids, operation.tasks):
+            history.append({
+                "task_id": task_id,
+                "event_type": HistoryEventType.CREATED,
+                "user_id": user_id,
+                "details": {"title": item.title, "priority": item.priority}
+            })
+            changes["created"].append({
+                "task_id": task_id,
+                "title": item.title,
+                "description": item.description,
+                "priority": item.priority,
+                "status": TaskStatus.NEW,
+                "created_by": user_id,
+                "worker_ids": list(dict.fromkeys(item.worker_ids))
+            })
+        return task_ids
+
+    @staticmethod
+    async def _bulk_update(db: AsyncSession, operation: BulkOperation, task_ids: list, state: dict,
+                           user_id: int, history: list) -> list:
+        """
+        update / status / assign: one UPDATE for the columns, workers replaced with DELETE + INSERT.
+        The UPDATE only matches tasks still at the version in state, so the status and
+        workers in state are the ones replaced. Returns the ids it applied to.
+        """
+        values = {
+            name: getattr(operation, name)
+            for name in ("title", "description", "priority", "status")
+            if getattr(operation, name) is not None
+        }
+        # An assign-only operation still bumps updated_at; the version moves like an ORM update's
+        versions = {task_id: state[task_id]["version"] for task_id in task_ids}
+        result = await db.execute(
+            update(Task).where(Task.id.in_(task_ids), Task.version == case(versions, value=Task.id))
+            .values(**(values or {"updated_at": func.now()}), version=Task.version + 1)
+            .returning(Task.id)
+            .execution_options(synchronize_session=False)
+        )
+        updated = set(result.scalars())
+        stale = [task_id for task_id in task_ids if task_id not in updated]
+        if stale:
+            logger.warning(f"Bulk {operation.action.value} skipped tasks changed concurrently: {stale}")
+        task_ids = [task_id for task_id in task_ids if task_id in updated]
+        if not task_ids:
+            return task_ids
+
+        for task_id in task_ids:
+            if values.get("status") is not None and state[task_id]["status"] != values["status"]:
+                history.append({
+                    "task_id": task_id,
+                    "event_type": HistoryEventType.STATUS_CHANGED,
+                    "user_id": user_id,
+                    "details": {"from": state[task_id]["status"], "to": values["status"]}
+                })
+            state[task_id].update(values)
+            state[task_id]["version"] += 1
+
+        if operation.worker_ids is not None:
+            worker_ids = list(dict.fromkeys(operation.worker_ids))
+            await db.execute(sql_delete(task_workers).where(task_workers.c.task_id.in_(task_ids)))
+            if worker_ids:
+                await db.execute(insert(task_workers), [
+                    {"task_id": task_id, "worker_id": worker_id} for task_id in task_ids for worker_id in worker_ids
+                ])
+            for task_id in task_ids:
+                state[task_id]["worker_ids"] = worker_ids
+                history.append({
+                    "task_id": task_id,
+                    "event_type": HistoryEventType.ASSIGNED,
+                    "user_id": user_id,
+                    "details": {"worker_ids": worker_ids}
+                })
+        return task_ids
+
+    @staticmethod
+    async def _bulk_delete(db: AsyncSession, task_ids: list) -> dict:
+        """
+        Children first, one DELETE per table instead of the per-object ORM cascade.
+        Returns {task_id: TaskCounters state} of the deleted tasks, read back with DELETE ... RETURNING
+        """
+        for table in (Comment.__table__, History.__table__, WorkerCompletion.__table__):
+            await db.execute(sql_delete(table).where(table.c.task_id.in_(task_ids)))
+        assignments = await db.execute(
+            sql_delete(task_workers).where(task_workers.c.task_id.in_(task_ids))
+            .returning(task_workers.c.task_id, task_workers.c.worker_id)
+        )
+        workers = {}
+        for task_id, worker_id in assignments:
+            workers.setdefault(task_id, []).append(worker_id)
+        deleted = await db.execute(
+            sql_delete(Task).where(Task.id.in_(task_ids)).returning(Task.id, Task.status)
+            .execution_options(synchronize_session=False)
+        )
+        return {
+            task_id: TaskCounters.state(status or TaskStatus.NEW, workers.get(task_id, []))
+            for task_id, status in deleted
+        }
+
+    @staticmethod
+    async def get_task_with_workers(db: AsyncSession, task_id: int) -> dict:
+        task = await TaskService.get_task(db, task_id)
         if not task:
             return None
-        
+
         # Get worker IDs from some mechanism (stored in task or separate table)
         worker_ids = getattr(task, 'worker_ids_list', [])
-        
+
         return {
             "task": task,
             "worker_ids": worker_ids,
@@ -227,163 +669,192 @@ class TaskService:
         }
 
     @staticmethod
-    def add_worker_to_task(db: Session, task_id: int, worker_id: int, added_by: int) -> dict:
+    async def add_worker_to_task(db: AsyncSession, task_id: int, worker_id: int, added_by: int,
+                                 expected_versions: Collection[int] = None) -> dict:
         """Add a worker to a task (admin only)"""
-        task = db.query(Task).filter(Task.id == task_id).first()
+        task = await TaskService.load_task(db, task_id)
         if not task:
             return None
-        
-        # Check if worker is already assigned
-        existing = db.query(task_workers).filter(
-            task_workers.c.task_id == task_id,
-            task_workers.c.worker_id == worker_id
-        ).first()
-        
-        if not existing:
-            # Add worker to task
-            stmt = insert(task_workers).values(task_id=task_id, worker_id=worker_id)
-            db.execute(stmt)
-            
-            # Add history event
-            history = History(
-                task_id=task_id,
+        TaskService.check_version(task, expected_versions)
+
+        # Assignments are loaded with the task
+        if worker_id not in task.worker_ids:
+            counted = TaskCounters.task_state(task)
+            TaskService.touch(task)
+            task.worker_assignments.append(TaskWorker(worker_id=worker_id))
+            task.history.append(History(
                 event_type=HistoryEventType.ASSIGNED,
                 user_id=added_by,
-                details=json.dumps({"worker_id": worker_id, "action": "added"})
-            )
-            db.add(history)
-            db.commit()
-        
-        db.refresh(task)
+                details={"worker_id": worker_id, "action": "added"}
+            ))
+            await TaskCounters.track(db, task, counted)
+            await TaskService.commit(db, task_id)
+
         return {"task": task, "worker_id": worker_id, "message": "Worker added to task"}
 
     @staticmethod
-    def remove_worker_from_task(db: Session, task_id: int, worker_id: int, removed_by: int) -> dict:
+    async def remove_worker_from_task(db: AsyncSession, task_id: int, worker_id: int, removed_by: int,
+                                      expected_versions: Collection[int] = None) -> dict:
         """Remove a worker from a task (admin only)"""
-        task = db.query(Task).filter(Task.id == task_id).first()
+        task = await TaskService.load_task(db, task_id)
         if not task:
             return None
-        
-        # Remove worker from task
-        stmt = sql_delete(task_workers).where(
-            (task_workers.c.task_id == task_id) & 
-            (task_workers.c.worker_id == worker_id)
-        )
-        db.execute(stmt)
-        
-        # Add history event
-        history = History(
-            task_id=task_id,
+        TaskService.check_version(task, expected_versions)
+        counted = TaskCounters.task_state(task)
+        TaskService.touch(task)
+
+        # Remove worker from task (delete-orphan issues the DELETE)
+        task.worker_ids_list = [assigned for assigned in task.worker_ids if assigned != worker_id]
+
+        task.history.append(History(
             event_type=HistoryEventType.ASSIGNED,
             user_id=removed_by,
-            details=json.dumps({"worker_id": worker_id, "action": "removed"})
-        )
-        db.add(history)
-        db.commit()
-        
-        db.refresh(task)
+            details={"worker_id": worker_id, "action": "removed"}
+        ))
+        await TaskCounters.track(db, task, counted)
+        await TaskService.commit(db, task_id)
+
         return {"task": task, "worker_id": worker_id, "message": "Worker removed from task"}
 
     @staticmethod
-    def get_task_workers(db: Session, task_id: int) -> list:
-        """Get all workers assigned to a task"""
-        result = db.query(task_workers).filter(task_workers.c.task_id == task_id).all()
-        return [row[1] for row in result]
+    async def assign_worker(db: AsyncSession, task_id: int, worker_id: int,
+                            expected_versions: Collection[int] = None) -> Task:
+        """Assign a worker without a history entry; an already assigned worker is a no-op"""
+        task = await TaskService.load_task(db, task_id)
+        if not task:
+            return None
+        TaskService.check_version(task, expected_versions)
+        if worker_id not in task.worker_ids:
+            counted = TaskCounters.task_state(task)
+            TaskService.touch(task)
+            task.worker_ids_list = task.worker_ids + [worker_id]
+            await TaskCounters.track(db, task, counted)
+            await TaskService.commit(db, task_id)
+        return task
+
+    @staticmethod
+    async def unassign_worker(db: AsyncSession, task_id: int, worker_id: int,
+                              expected_versions: Collection[int] = None) -> Task:
+        """Unassign a worker without a history entry; a worker not assigned is a no-op"""
+        task = await TaskService.load_task(db, task_id)
+        if not task:
+            return None
+        TaskService.check_version(task, expected_versions)
+        if worker_id in task.worker_ids:
+            counted = TaskCounters.task_state(task)
+            TaskService.touch(task)
+            task.worker_ids_list = [assigned for assigned in task.worker_ids if assigned != worker_id]
+            await TaskCounters.track(db, task, counted)
+            await TaskService.commit(db, task_id)
+        return task
 
     @staticmethod
-    def get_worker_tasks(db: Session, worker_id: int, skip: int = 0, limit: int = 100) -> list:
-        """Get all tasks assigned to a worker"""
-        task_ids = db.query(task_workers.c.task_id).filter(
+    async def get_task_workers(db: AsyncSession, task_id: int) -> list:
+        """Get all workers assigned to a task; None if the task does not exist"""
+        result = await db.execute(
+            select(Task.id, task_workers.c.worker_id)
+            .outerjoin(task_workers, task_workers.c.task_id == Task.id)
+            .where(Task.id == task_id)
+        )
+        rows = result.all()
+        if not rows:
+            return None
+        return [worker_id for _, worker_id in rows if worker_id is not None]
+
+    @staticmethod
+    async def get_worker_tasks(db: AsyncSession, worker_id: int, limit: int = 100, cursor: str = None,
+                               sort: str = "created_at", order: str = "asc"):
+        """Get tasks assigned to a worker. Returns (tasks, next_cursor)"""
+        query = select(Task).join(task_workers, task_workers.c.task_id == Task.id).where(
             task_workers.c.worker_id == worker_id
-        ).all()
-        task_ids = [row[0] for row in task_ids]
-        
-        
-        if not task_ids:
-            return []
-        
-        return db.query(Task).filter(Task.id.in_(task_ids)).offset(skip).limit(limit).all()
-
-    @staticmethod
-    def worker_complete_task(db: Session, task_id: int, worker_id: int) -> WorkerCompletion:
-        """Mark a task as completed by a worker"""
-        # Check if worker is assigned to this task
-        is_assigned = db.query(task_workers).filter(
-            (task_workers.c.task_id == task_id) &
-            (task_workers.c.worker_id == worker_id)
-        ).first()
-        
-        if not is_assigned:
+        ).options(*TASK_DETAIL_OPTIONS)
+        return await TaskService.paginate(db, query, limit, cursor, sort, order)
+
+    @staticmethod
+    async def get_worker_state(db: AsyncSession, task_id: int, worker_id: int):
+        """
+        (is_assigned, completion or None) of a worker on a task in one SELECT;
+        None if the task does not exist
+        """
+        result = await db.execute(
+            select(Task.id, task_workers.c.worker_id, WorkerCompletion)
+            .outerjoin(task_workers, and_(task_workers.c.task_id == Task.id, task_workers.c.worker_id == worker_id))
+            .outerjoin(WorkerCompletion, and_(
+                WorkerCompletion.task_id == Task.id, WorkerCompletion.worker_id == worker_id
+            ))
+            .where(Task.id == task_id)
+            .limit(1)
+        )
+        row = result.first()
+        if row is None:
             return None
-        
-        # Check if already marked as completed
-        existing = db.query(WorkerCompletion).filter(
-            WorkerCompletion.task_id == task_id,
-            WorkerCompletion.worker_id == worker_id
-        ).first()
-        
-        if existing:
-            return existing
-        
-        # Mark as completed
+        return row[1] is not None, row[2]
+
+    @staticmethod
+    async def worker_complete_task(db: AsyncSession, task_id: int, worker_id: int) -> WorkerCompletion:
+        """Mark a task as completed by a worker; the caller has checked get_worker_state"""
         completion = WorkerCompletion(
             task_id=task_id,
             worker_id=worker_id
         )
         db.add(completion)
-        
+
         history = History(
             task_id=task_id,
             event_type=HistoryEventType.WORKER_COMPLETED,
             user_id=worker_id,
-            details=json.dumps({"worker_id": worker_id})
+            details={"worker_id": worker_id}
         )
         db.add(history)
-        
-        db.commit()
-        db.refresh(completion)
+
+        # id and completed_at come back with INSERT ... RETURNING
+        await TaskService.commit(db, task_id)
         return completion
 
     @staticmethod
-    def approve_task(db: Session, task_id: int, admin_id: int) -> Task:
+    async def approve_task(db: AsyncSession, task_id: int, admin_id: int,
+                           expected_versions: Collection[int] = None) -> Task:
         """Admin: Approve task as completed"""
-        task = db.query(Task).filter(Task.id == task_id).first()
+        task = await TaskService.load_task(db, task_id)
         if not task:
             return None
-        
+        TaskService.check_version(task, expected_versions)
+        counted = TaskCounters.task_state(task)
+        TaskService.touch(task)
+
+        old_status = task.status
         task.status = TaskStatus.COMPLETED
-        
-        history = History(
-            task_id=task_id,
+        task.history.append(History(
             event_type=HistoryEventType.APPROVED,
             user_id=admin_id,
-            details=json.dumps({"action": "task_approved"})
-        )
-        db.add(history)
-        db.commit()
-        db.refresh(task)
+            details={"action": "task_approved", "from": old_status, "to": TaskStatus.COMPLETED}
+        ))
+        await TaskCounters.track(db, task, counted)
+        await TaskService.commit(db, task_id)
         return task
 
     @staticmethod
-    def send_to_rework(db: Session, task_id: int, admin_id: int) -> Task:
+    async def send_to_rework(db: AsyncSession, task_id: int, admin_id: int,
+                             expected_versions: Collection[int] = None) -> Task:
         """Admin: Send task back to rework"""
-        task = db.query(Task).filter(Task.id == task_id).first()
+        task = await TaskService.load_task(db, task_id)
         if not task:
             return None
-        
+        TaskService.check_version(task, expected_versions)
+        counted = TaskCounters.task_state(task)
+        TaskService.touch(task)
+
+        old_status = task.status
         task.status = TaskStatus.REWORK
-        
+
         # Clear worker completions to reset progress
-        db.query(WorkerCompletion).filter(WorkerCompletion.task_id == task_id).delete()
-        
-        history = History(
-            task_id=task_id,
+        await TaskService._clear_completions(db, task)
+
+        task.history.append(History(
             event_type=HistoryEventType.RETURNED,
             user_id=admin_id,
-            details=json.dumps({"action": "task_returned_to_rework"})
-        )
-        db.add(history)
-        db.commit()
-        db.refresh(task)
+            details={"action": "task_returned_to_rework", "from": old_status, "to": TaskStatus.REWORK}
+        ))
+        await TaskCounters.track(db, task, counted)
+        await TaskService.commit(db, task_id)
         return task
-
@@ -0,0 +1,264 @@
+"""
+Local read model of auth-service users (user_replicas table).
+
+Bootstrap: the consumer group on the USER_* streams is created first, then
+GET /auth/users is walked page by page. Changes made while the snapshot is
+taken are replayed from the group afterwards; events carry the full user
+state, so replaying them over the snapshot converges.
+
+Catch-up: the consumer group (USER_REPLICA_GROUP) keeps its position in Redis,
+so events published while tasks-service was down are read on the next start.
+Entries read but not acknowledged before a crash are re-read first. Every
+instance of the service joins the same group and writes the same table, so
+each event is applied once.
+
+Streams are read in parallel, so a USER_UPDATED can arrive before an older
+USER_CREATED; event_at (the event timestamp) drops anything older than what
+was applied, and deleted users stay as tombstones.
+"""
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import AsyncSessionLocal
+from app.models.user import UserReplica
+
+# Add parent directory to path for importing shared_events
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+from shared_events import EventType, get_event_bus
+
+logger = logging.getLogger(__name__)
+
+USER_REPLICA_GROUP = os.getenv("USER_REPLICA_GROUP", "tasks_user_replica")
+# Stable across restarts of the same container, so its unacknowledged entries are picked up again
+USER_REPLICA_CONSUMER = os.getenv("USER_REPLICA_CONSUMER") or os.getenv("HOSTNAME", "tasks-service")
+USER_REPLICA_PAGE_SIZE = int(os.getenv("USER_REPLICA_PAGE_SIZE", "500"))
+# Take the snapshot again on start even if the group exists (e.g. the table was emptied)
+USER_REPLICA_RESYNC = os.getenv("USER_REPLICA_RESYNC", "false").lower() == "true"
+
+USER_EVENTS = [EventType.USER_CREATED, EventType.USER_UPDATED, EventType.USER_DELETED]
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+class UserReplicaService:
+    @staticmethod
+    async def apply_event(db: AsyncSession, event) -> bool:
+        """Apply one USER_* event; returns False when it is older than the stored state"""
+        user_id = int(event.aggregate_id)
+        event_at = _parse_timestamp(event.timestamp)
+        user = await db.get(UserReplica, user_id)
+        if user is not None and user.event_at and event_at and event_at < user.event_at:
+            return False
+        if user is None:
+            user = UserReplica(id=user_id, is_active=True, is_deleted=False)
+            db.add(user)
+
+        if event.event_type == EventType.USER_DELETED:
+            user.is_deleted = True
+        elif user.is_deleted:
+            return False  # user ids are not reused, an update after the delete is out of order
+        else:
+            data = event.data
+            user.full_name = data.get("full_name", user.full_name)
+            user.role = data.get("role", user.role)
+            if "is_active" in data:
+                user.is_active = bool(data["is_active"])
+        user.event_at = event_at
+        return True
+
+    @staticmethod
+    async def apply_snapshot(db: AsyncSession, users: List[dict]) -> int:
+        """
+        Merge a full GET /auth/users listing. Users missing from it were deleted
+        before the consumer group existed and become tombstones.
+        """
+        existing = {user.id: user for user in (await db.scalars(select(UserReplica))).all()}
+        for data in users:
+            user = existing.pop(data["id"], None)
+            if user is None:
+                db.add(UserReplica(
+                    id=data["id"],
+                    full_name=data["full_name"],
+                    role=data["role"],
+                    is_active=bool(data["is_active"]),
+                    is_deleted=False,
+                ))
+            elif not user.is_deleted:
+                user.full_name = data["full_name"]
+                user.role = data["role"]
+                user.is_active = bool(data["is_active"])
+        for user in existing.values():
+            user.is_deleted = True
+        return len(users)
+
+    @staticmethod
+    async def get_users(db: AsyncSession, user_ids: Iterable[int]) -> Dict[int, UserReplica]:
+        """Replica rows by id, tombstones included"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        rows = await db.scalars(select(UserReplica).where(UserReplica.id.in_(user_ids)))
+        return {user.id: user for user in rows}
+
+    @staticmethod
+    async def get_full_name(db: AsyncSession, user_id: int) -> Optional[str]:
+        return await db.scalar(
+            select(UserReplica.full_name).where(UserReplica.id == user_id, UserReplica.is_deleted.is_(False))
+        )
+
+    @staticmethod
+    async def count(db: AsyncSession) -> int:
+        return await db.scalar(select(func.count()).select_from(UserReplica))
+
+
+async def fetch_snapshot(client: httpx.AsyncClient, page_size: int = USER_REPLICA_PAGE_SIZE) -> List[dict]:
+    """All users from auth-service, GET /auth/users page by page"""
+    users, skip = [], 0
+    while True:
+        response = await client.get("/auth/users", params={"skip": skip, "limit": page_size})
+        response.raise_for_status()
+        page = response.json()
+        users.extend(page)
+        if len(page) < page_size:
+            return users
+        skip += page_size
+
+
+class UserReplicaSync:
+    """Keeps user_replicas up to date; run() is started as a task on the service event loop"""
+
+    def __init__(self, event_bus, auth_client: httpx.AsyncClient, session_factory=AsyncSessionLocal,
+                 group: str = USER_REPLICA_GROUP, consumer: str = USER_REPLICA_CONSUMER, block_ms: int = 5000):
+        self.event_bus = event_bus
+        self.auth_client = auth_client
+        self.session_factory = session_factory
+        self.group = group
+        self.consumer = consumer
+        self.block_ms = block_ms
+        self.started = False
+        self.needs_snapshot = False
+        self.applied = 0
+        self.skipped = 0
+        self.task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Join the consumer group, take the snapshot if needed, re-read unacknowledged entries"""
+        created = await asyncio.to_thread(self.event_bus.ensure_group, USER_EVENTS, self.group, "$")
+        async with self.session_factory() as db:
+            empty = await UserReplicaService.count(db) == 0
+        # Sticky: a failed bootstrap is retried even though the group now exists
+        self.needs_snapshot = self.needs_snapshot or created or empty or USER_REPLICA_RESYNC
+        if self.needs_snapshot:
+            await self.bootstrap()
+        while await self.poll(pending=True):
+            pass
+        self.started = True
+
+    async def bootstrap(self):
+        users = await fetch_snapshot(self.auth_client)
+        async with self.session_factory() as db:
+            await UserReplicaService.apply_snapshot(db, users)
+            await db.commit()
+        self.needs_snapshot = False
+        logger.info(f"✓ User replica bootstrapped with {len(users)} users")
+
+    async def poll(self, pending: bool = False) -> int:
+        """Read one batch from the group, apply it in one transaction, then acknowledge it"""
+        entries = await asyncio.to_thread(
+            self.event_bus.read_group, USER_EVENTS, self.group, self.consumer,
+            100, self.block_ms, pending
+        )
+        if not entries:
+            return 0
+        async with self.session_factory() as db:
+            for _, msg_id, msg_data in sorted(entries, key=lambda entry: entry[2].get("timestamp") or ""):
+                try:
+                    event = self.event_bus.decode_message(msg_data)
+                    applied = await UserReplicaService.apply_event(db, event)
+                except (KeyError, ValueError, TypeError) as e:
+                    # Malformed event: dead-letter and acknowledge it, re-reading it would block the group
+                    logger.error(f"✗ User replica skipped malformed event {msg_id}: {e}")
+                    await asyncio.to_thread(self.event_bus.dead_letter, msg_data, msg_id, str(e))
+                    applied = False
+                if applied:
+                    self.applied += 1
+                else:
+                    self.skipped += 1
+            await db.commit()
+        await asyncio.to_thread(self.event_bus.ack, self.group, entries)
+        return len(entries)
+
+    async def run(self):
+        while True:
+            try:
+                if not self.started:
+                    await self.start()
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"✗ User replica sync failed: {e}")
+                # Unacknowledged entries are only re-read by start()
+                self.started = False
+                await asyncio.sleep(1)
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def get_stats(self) -> dict:
+        return {
+            "group": self.group,
+            "consumer": self.consumer,
+            "started": self.started,
+            "applied": self.applied,
+            "skipped": self.skipped,
+            "needs_snapshot": self.needs_snapshot,
+        }
+
+
+async def start_user_replica(auth_client: httpx.AsyncClient) -> Optional[UserReplicaSync]:
+    """
+    Start syncing the replica in the background; returns None when the event
+    bus is unreachable (validation then falls back to auth-service)
+    """
+    try:
+        event_bus = get_event_bus()
+    except Exception as e:
+        logger.warning(f"✗ User replica disabled, event bus unavailable: {e}")
+        return None
+    sync = UserReplicaSync(event_bus, auth_client)
+    # start() runs inside run(), so an unreachable auth-service is retried
+    sync.task = asyncio.create_task(sync.run())
+    set_user_replica_sync(sync)
+    logger.info(f"✓ User replica consuming USER_* events as {sync.group}/{sync.consumer}")
+    return sync
+
+
+# Singleton instance for easy access
+_replica_sync: Optional[UserReplicaSync] = None
+
+def get_user_replica_sync() -> Optional[UserReplicaSync]:
+    return _replica_sync
+
+def set_user_replica_sync(sync: Optional[UserReplicaSync]):
+    global _replica_sync
+    _replica_sync = sync
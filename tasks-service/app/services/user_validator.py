@@ -1,66 +1,209 @@
 """
-User validation service - communicates with auth-service
+User validation service
+
+Worker ids are resolved from the local user replica (app/services/user_replica.py)
+without a network hop. Ids the replica does not know yet (not bootstrapped, or a
+user created moments ago) are checked with a single POST /auth/users/lookup over
+a pooled httpx.AsyncClient. Those statuses are cached per user for
+USER_STATUS_CACHE_TTL seconds; USER_UPDATED / USER_DELETED events from the
+event bus drop the entry right away, the TTL only bounds staleness when the
+bus is unavailable.
 """
 import logging
 import os
-from typing import Optional, List
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.user_replica import UserReplicaService
+
+# Add parent directory to path for importing shared_events
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+from shared_events import EventType, get_event_bus
 
 logger = logging.getLogger(__name__)
 
 # Auth service endpoint
 AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "http://auth-service:8001")
+USER_LOOKUP_TIMEOUT = float(os.getenv("USER_LOOKUP_TIMEOUT", "2"))
+USER_STATUS_CACHE_TTL = float(os.getenv("USER_STATUS_CACHE_TTL", "60"))
+USER_STATUS_CACHE_SIZE = int(os.getenv("USER_STATUS_CACHE_SIZE", "10000"))
+
+INVALIDATING_EVENTS = [EventType.USER_UPDATED, EventType.USER_DELETED]
+
+
+class UserStatusCache:
+    """user id → {"id", "full_name", "is_active"} with a TTL, bounded LRU"""
+
+    def __init__(self, ttl: float = USER_STATUS_CACHE_TTL, max_size: int = USER_STATUS_CACHE_SIZE,
+                 clock=time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self.entries: "OrderedDict[int, Tuple[float, dict]]" = OrderedDict()
+        self.lock = threading.Lock()  # invalidations arrive on the listener thread
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_many(self, user_ids: Iterable[int]) -> Tuple[Dict[int, dict], List[int]]:
+        """Returns (cached statuses, ids that must be fetched)"""
+        now = self.clock()
+        found, unknown = {}, []
+        with self.lock:
+            for user_id in user_ids:
+                entry = self.entries.get(user_id)
+                if entry and entry[0] > now:
+                    self.entries.move_to_end(user_id)
+                    found[user_id] = entry[1]
+                else:
+                    unknown.append(user_id)
+            self.hits += len(found)
+            self.misses += len(unknown)
+        return found, unknown
+
+    def put_many(self, users: Iterable[dict]):
+        expires_at = self.clock() + self.ttl
+        with self.lock:
+            for user in users:
+                self.entries[user["id"]] = (expires_at, user)
+                self.entries.move_to_end(user["id"])
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self.lock:
+            if self.entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get_stats(self) -> dict:
+        return {
+            "size": len(self.entries),
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
 
 class UserValidator:
     @staticmethod
-    def validate_active_users(worker_ids: List[int]) -> tuple[bool, Optional[str]]:
+    async def validate_active_users(worker_ids: List[int],
+                                    db: Optional[AsyncSession] = None) -> tuple[bool, Optional[str]]:
         """
         Validate that all worker IDs correspond to active users
         Returns: (is_valid, error_message)
         """
         if not worker_ids:
             return True, None
-        
-        try:
-            import requests
-            
-            # Check each worker ID
-            for worker_id in worker_ids:
-                try:
-                    response = requests.get(
-                        f"{AUTH_SERVICE_URL}/auth/users/{worker_id}",
-                        timeout=5
-                    )
-                    
-                    if response.status_code == 404:
-                        return False, f"Worker with ID {worker_id} not found"
-                    
-                    if response.status_code == 200:
-                        user_data = response.json()
-                        if not user_data.get("is_active"):
-                            return False, f"Worker {user_data.get('full_name', f'ID {worker_id}')} is inactive and cannot be assigned to tasks"
-                    else:
-                        logger.warning(f"Unexpected response from auth service for user {worker_id}: {response.status_code}")
-                        # Don't fail on auth service errors, just log
-                        
-                except requests.RequestException as e:
-                    logger.error(f"Error checking user {worker_id} status: {e}")
-                    # Don't fail if auth service is unavailable
-                    pass
-            
-            return True, None
-            
-        except ImportError:
-            logger.warning("requests library not available for user validation")
-            return True, None  # Allow if we can't validate
-        except Exception as e:
-            logger.error(f"Error validating users: {e}")
-            return True, None  # Allow if validation fails
+
+        user_ids = list(dict.fromkeys(worker_ids))
+        statuses, missing = {}, set()
+        if db is not None:
+            for user in (await UserReplicaService.get_users(db, user_ids)).values():
+                if user.is_deleted:
+                    missing.add(user.id)
+                else:
+                    statuses[user.id] = {"id": user.id, "full_name": user.full_name, "is_active": user.is_active}
+
+        cache = get_user_status_cache()
+        cached, unknown = cache.get_many([user_id for user_id in user_ids
+                                          if user_id not in statuses and user_id not in missing])
+        statuses.update(cached)
+
+        if unknown:
+            try:
+                response = await get_auth_client().post("/auth/users/lookup", json={"ids": unknown})
+            except httpx.HTTPError as e:
+                logger.error(f"Error checking status of users {unknown}: {e}")
+                # Don't fail if auth service is unavailable
+                return True, None
+
+            if response.status_code != 200:
+                logger.warning(f"Unexpected response from auth service for users {unknown}: {response.status_code}")
+                # Don't fail on auth service errors, just log
+                return True, None
+
+            data = response.json()
+            cache.put_many(data["users"])
+            statuses.update({user["id"]: user for user in data["users"]})
+            missing.update(data["missing"])
+
+        for worker_id in user_ids:
+            if worker_id in missing:
+                return False, f"Worker with ID {worker_id} not found"
+            user = statuses.get(worker_id)
+            if user and not user["is_active"]:
+                return False, f"Worker {user.get('full_name') or f'ID {worker_id}'} is inactive and cannot be assigned to tasks"
+
+        return True, None
 
     @staticmethod
-    async def validate_active_users_async(worker_ids: List[int]) -> tuple[bool, Optional[str]]:
-        """
-        Async version of validate_active_users
-        """
-        # For now, use sync version
-        # In production, could use httpx for async HTTP
-        return UserValidator.validate_active_users(worker_ids)
+    def handle_user_event(event):
+        """USER_UPDATED / USER_DELETED: the cached status is stale"""
+        get_user_status_cache().invalidate(int(event.aggregate_id))
+
+
+def start_cache_invalidation() -> Optional[threading.Event]:
+    """
+    Listen for user events on a background thread; returns the event that stops it,
+    or None when the event bus is unreachable (entries then expire by TTL only)
+    """
+    try:
+        event_bus = get_event_bus()
+    except Exception as e:
+        logger.warning(f"✗ User status cache invalidation disabled, event bus unavailable: {e}")
+        return None
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=event_bus.listen,
+        args=(INVALIDATING_EVENTS, UserValidator.handle_user_event, stop),
+        name="user-status-invalidation",
+        daemon=True,
+    )
+    thread.start()
+    logger.info("✓ User status cache invalidation listening for USER_UPDATED/USER_DELETED")
+    return stop
+
+
+# Singleton instances for easy access
+_auth_client: Optional[httpx.AsyncClient] = None
+_status_cache: Optional[UserStatusCache] = None
+
+def get_auth_client() -> httpx.AsyncClient:
+    """Get or create the pooled auth-service client"""
+    global _auth_client
+    if _auth_client is None:
+        _auth_client = httpx.AsyncClient(
+            base_url=AUTH_SERVICE_URL,
+            timeout=USER_LOOKUP_TIMEOUT,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=10),
+        )
+    return _auth_client
+
+def set_auth_client(client: Optional[httpx.AsyncClient]):
+    """Replace the auth-service client (used by tests)"""
+    global _auth_client
+    _auth_client = client
+
+async def close_auth_client():
+    global _auth_client
+    if _auth_client is not None:
+        await _auth_client.aclose()
+        _auth_client = None
+
+def get_user_status_cache() -> UserStatusCache:
+    """Get or create the user status cache"""
+    global _status_cache
+    if _status_cache is None:
+        _status_cache = UserStatusCache()
+    return _status_cache
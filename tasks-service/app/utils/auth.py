@@ -1,15 +1,45 @@
 import jwt
 from fastapi import Header, HTTPException
 from typing import Optional
+import hashlib
+import hmac
 import logging
+import os
+import time
 
 logger = logging.getLogger(__name__)
 
-SECRET_KEY = "your-secret-key-change-in-production"  # Should match auth-service
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")  # Should match auth-service
+IDENTITY_SIGNING_KEY = os.getenv("IDENTITY_SIGNING_KEY", "your-identity-signing-key-change-in-production")  # Should match api-gateway
 ALGORITHM = "HS256"
 
-def get_user_id_from_token(authorization: Optional[str] = Header(None)) -> int:
-    """Extract user ID from Bearer token"""
+def get_verified_user_id(x_user_id: Optional[str], x_user_email: Optional[str], x_user_role: Optional[str],
+                         x_user_exp: Optional[str], x_identity_signature: Optional[str]) -> Optional[int]:
+    """User ID from X-User-* headers signed by the API gateway, or None if absent/invalid"""
+    if not x_identity_signature or not x_user_id or not x_user_email or not x_user_exp:
+        return None
+    message = f"{x_user_id}|{x_user_email}|{x_user_role or ''}|{x_user_exp}"
+    expected = hmac.new(IDENTITY_SIGNING_KEY.encode(), message.encode(), hashlib.sha256).hexdigest()
+    try:
+        if not hmac.compare_digest(expected, x_identity_signature) or int(x_user_exp) < time.time():
+            return None
+        return int(x_user_id)
+    except ValueError:
+        return None
+
+def get_user_id_from_token(
+    authorization: Optional[str] = Header(None),
+    x_user_id: Optional[str] = Header(None),
+    x_user_email: Optional[str] = Header(None),
+    x_user_role: Optional[str] = Header(None),
+    x_user_exp: Optional[str] = Header(None),
+    x_identity_signature: Optional[str] = Header(None)
+) -> int:
+    """Extract user ID from gateway identity headers or the Bearer token"""
+    user_id = get_verified_user_id(x_user_id, x_user_email, x_user_role, x_user_exp, x_identity_signature)
+    if user_id is not None:
+        return user_id
+
     if not authorization:
         raise HTTPException(status_code=401, detail="Missing authorization header")
     
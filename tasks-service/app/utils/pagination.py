@@ -0,0 +1,109 @@
+"""
+Opaque cursors for keyset pagination.
+
+A sort is a list of keys, each ascending or descending, with id as the final
+tie-breaker. A cursor carries that sort and the key values and id of the last
+row of the previous page. The next page continues strictly after that row, so
+page N costs the same as page 1 and concurrent inserts do not shift pages.
+"""
+
+import base64
+import enum
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+SORT_KEYS = ("created_at", "updated_at", "priority", "status", "title")
+SORT_ORDERS = ("asc", "desc")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class InvalidSort(ValueError):
+    pass
+
+
+@dataclass
+class Cursor:
+    sort: str
+    values: List[Any]
+    id: int
+
+
+def parse_sort(sort: str, order: str = "asc") -> List[Tuple[str, str]]:
+    """
+    "priority,-created_at" → [("priority", order), ("created_at", "desc")].
+    A "-" prefix sorts the key descending, "+" ascending, no prefix uses order.
+    """
+    if order not in SORT_ORDERS:
+        raise InvalidSort(f"Unknown order: {order}")
+    keys = []
+    for item in (sort or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        direction = order
+        if item[0] in "+-":
+            direction = "desc" if item[0] == "-" else "asc"
+            item = item[1:]
+        if item not in SORT_KEYS:
+            raise InvalidSort(f"Unknown sort key: {item}. Allowed: {', '.join(SORT_KEYS)}")
+        if item in (key for key, _ in keys):
+            raise InvalidSort(f"Duplicate sort key: {item}")
+        keys.append((item, direction))
+    if not keys:
+        raise InvalidSort("Empty sort")
+    return keys
+
+
+def sort_signature(keys: List[Tuple[str, str]]) -> str:
+    return ",".join(f"{key}:{direction}" for key, direction in keys)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(keys: List[Tuple[str, str]], values: List[Any], last_id: int) -> str:
+    payload = {"s": sort_signature(keys), "v": [_encode_value(value) for value in values], "id": last_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: List[Tuple[str, str]]) -> Cursor:
+    """Decode a cursor issued for the same sort"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        decoded = Cursor(
+            sort=payload["s"],
+            values=[_decode_value(value) for value in payload["v"]],
+            id=int(payload["id"]),
+        )
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+    if decoded.sort != sort_signature(keys) or len(decoded.values) != len(keys):
+        raise InvalidCursor("Cursor was issued for a different sort order")
+    return decoded
+
+
+def split_page(rows: List[Any], limit: int, keys: List[Tuple[str, str]]) -> Tuple[List[Any], Optional[str]]:
+    """rows were fetched with limit + 1; returns (page, next_cursor)"""
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_cursor(keys, [getattr(last, key) for key, _ in keys], last.id)
@@ -2,8 +2,13 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 import logging.config
-from app.db.database import init_db
+from app.db.database import engine, init_db, get_db_pool_stats
 from app.controllers.task_controller import router as task_router
+from app.services.task_cache import get_task_cache, start_task_cache_invalidation
+from app.services.task_counters import initialize_task_counters
+from app.services.user_replica import get_user_replica_sync, start_user_replica
+from app.services.user_validator import close_auth_client, get_auth_client, start_cache_invalidation
+from shared_db import QueryProfilingMiddleware, get_query_metrics
 
 # Configure logging with GMT+3 timezone
 logging_config = {
@@ -51,12 +56,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Added last so it wraps the whole stack: Server-Timing header and per-route SQL stats
+app.add_middleware(QueryProfilingMiddleware)
+
 @app.on_event("startup")
 async def startup():
     # Skip init_db if in test environment
     if not os.getenv("PYTEST_CURRENT_TEST"):
-        init_db()
+        await init_db()
         logger.info("Database initialized")
+        # Counters for tasks created before task_counters existed; the CronJob reconciles later drift
+        await initialize_task_counters()
+        app.state.user_cache_listener = start_cache_invalidation()
+        app.state.task_cache_listener = start_task_cache_invalidation()
+        app.state.user_replica = await start_user_replica(get_auth_client())
+
+@app.on_event("shutdown")
+async def shutdown():
+    for name in ("user_cache_listener", "task_cache_listener"):
+        listener = getattr(app.state, name, None)
+        if listener is not None:
+            listener.set()
+    replica = getattr(app.state, "user_replica", None)
+    if replica is not None:
+        await replica.stop()
+    await close_auth_client()
+    await get_task_cache().close()
+    await engine.dispose()
 
 app.include_router(task_router)
 
@@ -64,6 +90,27 @@ app.include_router(task_router)
 async def health():
     return {"status": "ok", "service": "tasks-service"}
 
+@app.get("/metrics/db")
+async def db_metrics():
+    """Connection pool usage: connections in use, overflow and checkout wait"""
+    return get_db_pool_stats()
+
+@app.get("/metrics/queries")
+async def query_metrics():
+    """SQL statements and DB time per route template"""
+    return get_query_metrics()
+
+@app.get("/metrics/task-cache")
+async def task_cache_metrics():
+    """GET /tasks/{id} cache: L1/L2 hits, misses, coalesced loads and the hit ratio"""
+    return get_task_cache().get_stats()
+
+@app.get("/metrics/user-replica")
+async def user_replica_metrics():
+    """Events applied / skipped by the local user replica"""
+    sync = get_user_replica_sync()
+    return sync.get_stats() if sync else {"enabled": False}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8002)
@@ -0,0 +1,51 @@
+"""
+Outbox relay for tasks-service.
+Runs as a separate process: publishes task events committed to the outbox_events
+table to the event bus (see app/services/outbox.py).
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import sys
+
+# Setup logging
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Add shared_events to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.db.database import engine, wait_for_schema
+from app.services.outbox import OutboxRelay
+
+
+async def start_outbox_relay():
+    """Start the relay; runs until SIGTERM/SIGINT"""
+    logger.info("=" * 60)
+    logger.info("Starting Tasks Outbox Relay")
+    logger.info("=" * 60)
+
+    # The schema belongs to tasks-service, running its DDL here would race the app's pods
+    await wait_for_schema("outbox_events")
+    relay = OutboxRelay()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, relay.stop)
+    try:
+        await relay.run()
+    finally:
+        await engine.dispose()
+        logger.info(f"Outbox relay stopped, {relay.published} events published")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(start_outbox_relay())
+    except Exception as e:
+        logger.error(f"✗ Outbox relay error: {e}", exc_info=True)
+        sys.exit(1)
@@ -0,0 +1,56 @@
+"""
+Task counter reconciliation for tasks-service.
+Recomputes task_counters from the tasks (see app/services/task_counters.py),
+logs every drifted counter and, with --fix, repairs it. Runs once and exits,
+scheduled as a CronJob; the exit code is 2 when drift was found without --fix.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+# Setup logging
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Add shared_events to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.db.database import AsyncSessionLocal, engine, wait_for_schema
+from app.services.task_counters import TaskCounters
+
+
+async def reconcile(fix: bool) -> int:
+    try:
+        await wait_for_schema("tasks", "task_workers", "task_counters")
+        async with AsyncSessionLocal() as db:
+            drift = await TaskCounters.reconcile(db, fix=fix)
+    finally:
+        await engine.dispose()
+
+    for item in drift:
+        logger.warning(f"✗ Counter drift {item['name']}/{item['key']}: "
+                       f"stored {item['stored']}, actual {item['actual']}")
+    if not drift:
+        logger.info("✓ Task counters match the tasks")
+        return 0
+    if fix:
+        logger.info(f"✓ {len(drift)} task counters repaired")
+        return 0
+    return 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check task_counters against the tasks")
+    parser.add_argument("--fix", action="store_true", help="overwrite drifted counters with the recomputed values")
+    args = parser.parse_args()
+    try:
+        sys.exit(asyncio.run(reconcile(args.fix)))
+    except Exception as e:
+        logger.error(f"✗ Counter reconciliation error: {e}", exc_info=True)
+        sys.exit(1)
@@ -0,0 +1,126 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+import sys
+import os
+
+# shared_db lives at the repository root
+repo_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+if repo_path not in sys.path:
+    sys.path.insert(0, repo_path)
+
+from shared_db import create_pooled_engine, get_pool_stats
+from shared_db.engine import InstrumentedQueuePool, engine_options
+
+
+def test_pool_settings_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "2")
+    monkeypatch.setenv("DB_POOL_RECYCLE", "600")
+    engine = create_pooled_engine(f"sqlite:///{tmp_path}/pool.db")
+    try:
+        assert isinstance(engine.pool, InstrumentedQueuePool)
+        assert engine.pool.size() == 3
+        assert engine.pool._max_overflow == 2
+        assert engine.pool._recycle == 600
+    finally:
+        engine.dispose()
+
+
+def test_connections_are_reused_and_measured(tmp_path):
+    engine = create_pooled_engine(f"sqlite:///{tmp_path}/pool.db")
+    try:
+        for _ in range(5):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        stats = get_pool_stats(engine)
+        assert stats["checkouts_total"] == 5
+        assert stats["checked_out"] == 0
+        # One physical connection served every checkout
+        assert stats["checked_in"] == 1
+
+        with engine.connect():
+            assert get_pool_stats(engine)["checked_out"] == 1
+    finally:
+        engine.dispose()
+
+
+def test_checkout_timeout_is_counted(monkeypatch, tmp_path):
+    monkeypatch.setenv("DB_POOL_SIZE", "1")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "0.05")
+    engine = create_pooled_engine(f"sqlite:///{tmp_path}/pool.db")
+    try:
+        with engine.connect():
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+        assert get_pool_stats(engine)["checkout_timeouts_total"] == 1
+    finally:
+        engine.dispose()
+
+
+def test_pgbouncer_mode_disables_prepared_statements(monkeypatch):
+    monkeypatch.setenv("DB_PGBOUNCER", "true")
+    args = engine_options("postgresql+asyncpg://u:p@pgbouncer:6432/tasks_db")["connect_args"]
+    assert args["statement_cache_size"] == 0
+    assert args["prepared_statement_cache_size"] == 0
+
+    monkeypatch.setenv("DB_PGBOUNCER", "false")
+    args = engine_options("postgresql+asyncpg://u:p@pgbouncer:6432/tasks_db")["connect_args"]
+    assert "statement_cache_size" not in args
+    assert engine_options("postgresql://u:p@postgres:5432/tasks_db")["connect_args"]["connect_timeout"] == 5
+
+
+def test_statements_are_profiled_per_block(tmp_path, caplog, monkeypatch):
+    from shared_db import instrument_engine, profile_queries
+    from shared_db import profiling
+
+    engine = instrument_engine(create_pooled_engine(f"sqlite:///{tmp_path}/profile.db"))
+    instrument_engine(engine)  # listeners are attached once
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            with profile_queries(top_n=2) as profile:
+                for i in range(3):
+                    conn.execute(text(f"SELECT {i}"))
+            conn.execute(text("SELECT 4"))
+        assert profile.count == 3
+        assert len(profile.slowest()) == 2
+        assert profile.server_timing(0.01).endswith('desc="3 queries", app;dur=10.0')
+
+        caplog.set_level("WARNING", logger="shared_db.profiling")
+        monkeypatch.setattr(profiling, "SLOW_QUERY_MS", 0)
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 42"))
+        assert "Slow query" in caplog.text and "SELECT 42" in caplog.text
+    finally:
+        engine.dispose()
+
+
+def test_auxiliary_processes_wait_for_the_schema_instead_of_creating_it(tmp_path):
+    import asyncio
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.db.database import wait_for_schema
+
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/schema.db")
+        try:
+            with pytest.raises(RuntimeError, match="outbox_events"):
+                await wait_for_schema("outbox_events", timeout=0.05, interval=0.01, db_engine=engine)
+
+            async def migrate():
+                await asyncio.sleep(0.05)
+                async with engine.begin() as connection:
+                    await connection.execute(text("CREATE TABLE outbox_events (id INTEGER PRIMARY KEY)"))
+
+            migration = asyncio.create_task(migrate())
+            await wait_for_schema("outbox_events", timeout=5, interval=0.01, db_engine=engine)
+            assert migration.done()
+            async with engine.connect() as connection:
+                # Only the table the "app" created, nothing else was run
+                tables = await connection.run_sync(lambda sync: sync.dialect.get_table_names(sync))
+            assert tables == ["outbox_events"]
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
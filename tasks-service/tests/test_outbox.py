@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.db.database import Base
+from app.models.outbox import OutboxEvent
+from app.services.outbox import Outbox, OutboxRelay
+from shared_events import EventType
+
+
+class FakeEventBus:
+    def __init__(self):
+        self.batches = []
+        self.down = False
+
+    def publish_many(self, events):
+        if self.down:
+            raise ConnectionError("redis unreachable")
+        self.batches.append(events)
+        return [str(i) for i in range(len(events))]
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/outbox.db", poolclass=NullPool)
+
+    async def create():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create())
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+def stage(sessions, count):
+    async def write():
+        async with sessions() as db:
+            for task_id in range(1, count + 1):
+                Outbox.add(db, EventType.TASK_UPDATED, task_id, {"task_id": task_id})
+            await db.commit()
+    asyncio.run(write())
+
+
+def remaining(sessions):
+    async def load():
+        async with sessions() as db:
+            return (await db.scalars(select(OutboxEvent.aggregate_id).order_by(OutboxEvent.id))).all()
+    return asyncio.run(load())
+
+
+def test_relay_publishes_in_order_in_batches_and_deletes(sessions):
+    stage(sessions, 5)
+    bus = FakeEventBus()
+    relay = OutboxRelay(bus, session_factory=sessions, batch_size=2)
+
+    async def drain():
+        return [await relay.run_once() for _ in range(4)]
+
+    assert asyncio.run(drain()) == [2, 2, 1, 0]
+    assert [[event.aggregate_id for event in batch] for batch in bus.batches] == [["1", "2"], ["3", "4"], ["5"]]
+    assert bus.batches[0][0].event_type == EventType.TASK_UPDATED
+    assert bus.batches[0][0].data == {"task_id": 1}
+    assert remaining(sessions) == []
+
+
+def test_events_stay_in_the_outbox_while_redis_is_down(sessions):
+    stage(sessions, 3)
+    bus = FakeEventBus()
+    bus.down = True
+    relay = OutboxRelay(bus, session_factory=sessions)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(relay.run_once())
+    assert remaining(sessions) == ["1", "2", "3"]
+
+    bus.down = False
+    assert asyncio.run(relay.run_once()) == 3
+    assert remaining(sessions) == []
@@ -0,0 +1,159 @@
+import asyncio
+
+from app.services.task_cache import LocalTaskCache, TaskDetailCache, entry_key, generation_key, lock_key
+from shared_events import Event, EventType
+
+
+class FakeRedis:
+    """The few commands the cache uses, over a dict; eval runs FILL_SCRIPT"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def mget(self, *keys):
+        return [self.data.get(key) for key in keys]
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, nx=False, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def eval(self, script, numkeys, entry, generation_key, generation, value, ttl):
+        if self.data.get(generation_key, b"0") != generation:
+            return 0
+        self.data[entry] = value
+        return 1
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def aclose(self):
+        pass
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def incr(self, key):
+        self.commands.append(("incr", key))
+
+    def delete(self, key):
+        self.commands.append(("delete", key))
+
+    async def execute(self):
+        for command, key in self.commands:
+            if command == "incr":
+                self.redis.data[key] = str(int(self.redis.data.get(key, b"0")) + 1).encode()
+            else:
+                self.redis.data.pop(key, None)
+
+
+class BrokenRedis(FakeRedis):
+    async def mget(self, *keys):
+        raise ConnectionError("Connection refused")
+
+
+def loader(bodies, loads, delay=0.0):
+    async def load():
+        loads.append(1)
+        await asyncio.sleep(delay)
+        return bodies[-1]
+    return load
+
+
+def test_redis_entry_is_shared_until_the_task_changes():
+    redis, loads = FakeRedis(), []
+    first, second = TaskDetailCache(client=redis), TaskDetailCache(client=redis)
+    bodies = [b'{"title": "A"}']
+
+    async def scenario():
+        served = [await first.get(1, loader(bodies, loads)), await second.get(1, loader(bodies, loads))]
+        bodies.append(b'{"title": "B"}')
+        await first.invalidate([1])
+        served.append(await first.get(1, loader(bodies, loads)))
+        # second still serves its local copy until the TASK_UPDATED event reaches it
+        served.append(await second.get(1, loader(bodies, loads)))
+        second.handle_task_event(Event(EventType.TASK_UPDATED, "1", "task", {"task_id": 1}))
+        served.append(await second.get(1, loader(bodies, loads)))
+        return served
+
+    assert asyncio.run(scenario()) == [b'{"title": "A"}', b'{"title": "A"}', b'{"title": "B"}',
+                                       b'{"title": "A"}', b'{"title": "B"}']
+    assert len(loads) == 2
+    assert redis.data[generation_key(1)] == b"1"
+    assert second.get_stats()["l2_hits"] == 2 and second.get_stats()["l1_hits"] == 1
+
+
+def test_a_load_that_raced_a_write_is_not_stored():
+    redis = FakeRedis()
+    cache = TaskDetailCache(client=redis)
+
+    async def scenario():
+        async def load():
+            # The task changes while the old state is being read
+            await cache.invalidate([1])
+            return b"old"
+
+        assert await cache.get(1, load) == b"old"
+        assert await cache.get(1, loader([b"new"], [])) == b"new"
+
+    asyncio.run(scenario())
+    assert cache.stats["stale_fills"] == 1 and cache.stats["fills"] == 1
+    assert redis.data[entry_key(1)] == b"1:new"
+
+
+def test_concurrent_misses_share_one_load():
+    cache, loads = TaskDetailCache(client=FakeRedis()), []
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get(1, loader([b"body"], loads, delay=0.05)) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == [b"body"] * 5
+    assert len(loads) == 1
+    stats = cache.get_stats()
+    assert stats["misses"] == 1 and stats["coalesced"] == 4 and stats["hit_ratio"] == 0.8
+
+
+def test_a_miss_waits_for_the_process_holding_the_lock():
+    redis, loads = FakeRedis(), []
+    cache = TaskDetailCache(client=redis, lock_wait_ms=500)
+    redis.data[lock_key(1)] = b"1"
+
+    async def scenario():
+        async def other_process_fills():
+            await asyncio.sleep(0.05)
+            redis.data[entry_key(1)] = b"0:body"
+
+        filler = asyncio.create_task(other_process_fills())
+        body = await cache.get(1, loader([b"body"], loads))
+        await filler
+        return body
+
+    assert asyncio.run(scenario()) == b"body"
+    assert loads == [] and cache.stats["lock_waits"] == 1
+
+
+def test_redis_outage_falls_back_to_the_local_cache():
+    cache, loads = TaskDetailCache(client=BrokenRedis(), local=LocalTaskCache(ttl=60)), []
+
+    async def scenario():
+        return [await cache.get(1, loader([b"body"], loads)) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [b"body"] * 3
+    assert len(loads) == 1
+    assert cache.stats["redis_errors"] == 1 and cache.get_stats()["redis"] is False
@@ -1,7 +1,10 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 import sys
 import os
 
@@ -11,7 +14,9 @@ if tasks_service_path not in sys.path:
     sys.path.insert(0, tasks_service_path)
 
 from app.db.database import Base, get_db
+from app.services.task_cache import TaskDetailCache, get_task_cache, set_task_cache
 from main import app as tasks_app
+from shared_db import instrument_engine
 app = tasks_app
 
 
@@ -19,20 +24,25 @@ SQLALCHEMY_DATABASE_URL = "sqlite:///./test_tasks.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The app reaches the same file through aiosqlite; the sync engine seeds and inspects it.
+# NullPool: TestClient runs every request on a new event loop, connections must not outlive it.
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_tasks.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+instrument_engine(async_engine)
+
 Base.metadata.create_all(bind=engine)
 
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
+async def override_get_db():
+    async with TestingAsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 app.dependency_overrides[get_db] = override_get_db
 client = TestClient(app)
 
 @pytest.fixture(scope="function", autouse=True)
 def db():
+    # Task ids repeat across tests: a fresh detail cache, in-process only (no Redis here)
+    set_task_cache(TaskDetailCache(redis_url=None))
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
     yield TestingSessionLocal()
@@ -189,3 +199,808 @@ def test_filter_tasks_by_status():
     assert response.status_code == 200
     data = response.json()
     assert all(task["status"] == "completed" for task in data)
+
+def count_queries(func):
+    """Run func and return the number of SQL statements it executed"""
+    from sqlalchemy import event
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(async_engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        func()
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", listener)
+    return len(statements)
+
+def seed_tasks(db, count):
+    from app.models.task import Task, WorkerCompletion
+    for i in range(count):
+        task = Task(title=f"Task {i}", description="Seeded", created_by=1)
+        task.worker_ids_list = [10 + i, 20 + i]
+        task.worker_completions = [WorkerCompletion(worker_id=10 + i)]
+        db.add(task)
+    db.commit()
+
+def test_task_list_query_count_is_constant(db):
+    seed_tasks(db, 3)
+    small_page = count_queries(lambda: client.get("/tasks/list"))
+    seed_tasks(db, 12)
+
+    response = None
+    def fetch():
+        nonlocal response
+        response = client.get("/tasks/list")
+    assert count_queries(fetch) == small_page
+
+    tasks = response.json()["tasks"]
+    assert len(tasks) == 15
+    assert sorted(tasks[0]["worker_ids"]) == [10, 20]
+    assert tasks[0]["worker_completions"][0]["worker_id"] == 10
+
+def test_task_full_list_query_count_is_constant(db):
+    seed_tasks(db, 2)
+    small_page = count_queries(lambda: client.get("/tasks"))
+    seed_tasks(db, 8)
+    assert count_queries(lambda: client.get("/tasks")) == small_page
+
+def test_worker_ids_setter_persists_assignments(db):
+    from app.models.task import Task
+    seed_tasks(db, 1)
+    task = db.query(Task).first()
+    task.worker_ids_list = [20, 30, 30]
+    db.commit()
+    db.expire_all()
+    assert sorted(db.query(Task).first().worker_ids) == [20, 30]
+
+def seed_timed_tasks(db, count, start_minute=0):
+    from datetime import datetime, timedelta
+    from app.models.task import Task
+    base = datetime(2024, 1, 1, 9, 0, 0)
+    for i in range(count):
+        # Pairs of tasks share a timestamp, the id breaks the tie
+        created_at = base + timedelta(minutes=start_minute + i // 2)
+        db.add(Task(title=f"Timed {start_minute + i}", description="", created_by=1,
+                    created_at=created_at, updated_at=created_at))
+    db.commit()
+
+def walk_pages(url, limit):
+    seen, cursor = [], None
+    while True:
+        response = client.get(url, params={"limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        data = response.json()
+        seen.extend(task["id"] for task in data["tasks"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            return seen
+
+def test_list_keyset_pagination_walks_every_task_once(db):
+    seed_timed_tasks(db, 11)
+    ids = walk_pages("/tasks/list", 4)
+    assert ids == sorted(ids)
+    assert len(ids) == 11
+
+    descending = walk_pages("/tasks/list?order=desc", 3)
+    assert descending == sorted(ids, reverse=True)
+
+def test_keyset_pages_are_stable_under_inserts(db):
+    seed_timed_tasks(db, 6)
+    first = client.get("/tasks/list", params={"limit": 3, "order": "desc"}).json()
+    # A newer task arrives while the client is paging
+    seed_timed_tasks(db, 2, start_minute=100)
+    second = client.get("/tasks/list", params={"limit": 3, "order": "desc", "cursor": first["next_cursor"]}).json()
+    first_ids = [task["id"] for task in first["tasks"]]
+    second_ids = [task["id"] for task in second["tasks"]]
+    assert not set(first_ids) & set(second_ids)
+    assert second_ids == [3, 2, 1]
+
+def test_tasks_next_cursor_header(db):
+    seed_timed_tasks(db, 5)
+    response = client.get("/tasks", params={"limit": 2, "sort": "updated_at"})
+    assert [task["id"] for task in response.json()] == [1, 2]
+    cursor = response.headers["x-next-cursor"]
+    response = client.get("/tasks", params={"limit": 2, "sort": "updated_at", "cursor": cursor})
+    assert [task["id"] for task in response.json()] == [3, 4]
+
+def test_invalid_cursor_is_rejected(db):
+    seed_timed_tasks(db, 3)
+    assert client.get("/tasks/list", params={"cursor": "not-a-cursor"}).status_code == 400
+    cursor = client.get("/tasks/list", params={"limit": 1}).json()["next_cursor"]
+    # A cursor only continues the ordering it was issued for
+    assert client.get("/tasks/list", params={"cursor": cursor, "order": "desc"}).status_code == 400
+
+def test_worker_tasks_are_paginated(db):
+    seed_timed_tasks(db, 3)
+    client.post("/tasks/2/add-worker/99")
+    client.post("/tasks/3/add-worker/99")
+    response = client.get("/tasks/worker/99", params={"limit": 1})
+    assert response.status_code == 200
+    page = response.json()
+    assert [task["id"] for task in page["items"]] == [2]
+    page = client.get("/tasks/worker/99", params={"limit": 1, "cursor": page["next_cursor"]}).json()
+    assert [task["id"] for task in page["items"]] == [3]
+    assert page["next_cursor"] is None
+
+def test_summary_view_returns_counts_without_relationships(db):
+    from app.models.task import Comment
+    seed_tasks(db, 2)
+    db.add_all([Comment(task_id=1, user_id=1, text="a"), Comment(task_id=1, user_id=2, text="b")])
+    db.commit()
+
+    responses = []
+    query_count = count_queries(lambda: responses.append(client.get("/tasks", params={"view": "summary"})))
+    rows = responses[0].json()
+
+    # A single SELECT with the counts as subqueries, no relationship loads
+    assert query_count == 1
+    assert rows[0]["comments_count"] == 2
+    assert rows[0]["completions_count"] == 1
+    assert rows[0]["workers_count"] == 2
+    assert rows[1]["comments_count"] == 0
+    assert "comments" not in rows[0] and "history" not in rows[0]
+
+def test_summary_fields_selection(db):
+    seed_timed_tasks(db, 3)
+    response = client.get("/tasks", params={"fields": "title,comments_count", "limit": 2})
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": 1, "title": "Timed 0", "comments_count": 0},
+        {"id": 2, "title": "Timed 1", "comments_count": 0},
+    ]
+    next_page = client.get("/tasks", params={"fields": "title", "cursor": response.headers["x-next-cursor"]})
+    assert next_page.json() == [{"id": 3, "title": "Timed 2"}]
+
+    assert client.get("/tasks", params={"fields": "title,description"}).status_code == 400
+
+def seed_filter_tasks(db):
+    from datetime import datetime, timedelta
+    from app.models.task import Task, TaskPriority, TaskStatus
+    base = datetime(2024, 1, 1, 9, 0, 0)
+    rows = [
+        ("Fix login form", "Button does nothing", TaskPriority.HIGH, TaskStatus.NEW, 1),
+        ("Write docs", "Describe the login flow", TaskPriority.LOW, TaskStatus.IN_PROGRESS, 2),
+        ("Deploy", "Roll out 100% of traffic", TaskPriority.CRITICAL, TaskStatus.NEW, 1),
+        ("Refactor reports", "Split the report builder", TaskPriority.HIGH, TaskStatus.REWORK, 2),
+        ("Login audit", "Check password policy", TaskPriority.MEDIUM, TaskStatus.COMPLETED, 1),
+    ]
+    for i, (title, description, priority, task_status, created_by) in enumerate(rows):
+        created_at = base + timedelta(days=i)
+        task = Task(title=title, description=description, priority=priority, status=task_status,
+                    created_by=created_by, created_at=created_at, updated_at=created_at + timedelta(hours=1))
+        task.worker_ids_list = [7] if i % 2 == 0 else [8]
+        db.add(task)
+    db.commit()
+
+def list_ids(**params):
+    response = client.get("/tasks/list", params=params)
+    assert response.status_code == 200, response.text
+    return [task["id"] for task in response.json()["tasks"]]
+
+def test_list_filters(db):
+    seed_filter_tasks(db)
+    assert list_ids(status=["new", "rework"]) == [1, 3, 4]
+    assert list_ids(priority="high") == [1, 4]
+    assert list_ids(created_by=2) == [2, 4]
+    assert list_ids(worker_id=7) == [1, 3, 5]
+    assert list_ids(created_from="2024-01-02T00:00:00", created_to="2024-01-04T00:00:00") == [2, 3]
+    assert list_ids(updated_from="2024-01-05T00:00:00") == [5]
+    assert list_ids(status="new", created_by=1, worker_id=7) == [1, 3]
+    # The same filters apply to the full and summary views
+    assert [task["id"] for task in client.get("/tasks", params={"priority": "high"}).json()] == [1, 4]
+    summary = client.get("/tasks", params={"fields": "title", "worker_id": 8}).json()
+    assert summary == [{"id": 2, "title": "Write docs"}, {"id": 4, "title": "Refactor reports"}]
+
+def test_search_matches_every_word_in_title_or_description(db):
+    seed_filter_tasks(db)
+    assert list_ids(q="login") == [1, 2, 5]
+    assert list_ids(q="LOGIN flow") == [2]
+    assert list_ids(q="100%") == [3]
+    assert list_ids(q="50%") == []
+
+def test_multi_key_sort_pages_with_mixed_directions(db):
+    seed_filter_tasks(db)
+    seed_timed_tasks(db, 5, start_minute=60 * 24 * 10)
+    sort = "-priority,created_at"
+    one_page = client.get("/tasks/list", params={"limit": 100, "sort": sort}).json()["tasks"]
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, "sort": sort, **({"cursor": cursor} if cursor else {})}
+        data = client.get("/tasks/list", params=params).json()
+        seen.extend(data["tasks"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+    assert [task["id"] for task in seen] == [task["id"] for task in one_page]
+    assert len(seen) == 10
+
+    # Each priority is one contiguous run, ascending by (created_at, id) inside it
+    priorities = [task["priority"] for task in seen]
+    runs = [p for i, p in enumerate(priorities) if i == 0 or priorities[i - 1] != p]
+    assert len(runs) == len(set(runs))
+    for prev, cur in zip(seen, seen[1:]):
+        if prev["priority"] == cur["priority"]:
+            assert (prev["created_at"], prev["id"]) < (cur["created_at"], cur["id"])
+
+def test_invalid_sort_is_rejected(db):
+    assert client.get("/tasks/list", params={"sort": "description"}).status_code == 400
+    assert client.get("/tasks", params={"sort": "created_at,created_at"}).status_code == 400
+    assert client.get("/tasks/list", params={"sort": "+title"}).status_code == 200
+
+def explain(db, query):
+    from sqlalchemy import text
+    sql = str(query.compile(engine, compile_kwargs={"literal_binds": True}))
+    return [row[3] for row in db.execute(text("EXPLAIN QUERY PLAN " + sql))]
+
+@pytest.mark.parametrize("filters, sort, index", [
+    ({"status": ["new"]}, "created_at", "ix_tasks_status_created_at_id"),
+    ({"priority": ["high"]}, "created_at", "ix_tasks_priority_created_at_id"),
+    ({"created_by": 1}, "created_at", "ix_tasks_created_by_created_at_id"),
+    ({"worker_id": 7}, "created_at", "ix_task_workers_worker_id_task_id"),
+    ({"created_from": "2024-01-01T00:00:00", "created_to": "2024-02-01T00:00:00"}, "created_at", "ix_tasks_created_at_id"),
+    ({"updated_from": "2024-01-01T00:00:00"}, "updated_at", "ix_tasks_updated_at_id"),
+    ({}, "-priority,created_at", "ix_tasks_priority_created_at_id"),
+])
+def test_filters_are_index_backed(db, filters, sort, index):
+    from app.models.task import Task
+    from app.schemas.task import TaskFilters
+    from app.services.task_service import TaskService, SORT_COLUMNS
+    from app.utils.pagination import parse_sort
+    from sqlalchemy import select
+    query = TaskService.apply_filters(db, select(Task.id), TaskFilters(**filters))
+    keys = parse_sort(sort)
+    query = query.order_by(
+        *(SORT_COLUMNS[key].desc() if direction == "desc" else SORT_COLUMNS[key] for key, direction in keys)
+    ).limit(101)
+    plan = explain(db, query)
+    assert any(index in step for step in plan), plan
+    # No step reads a table without an index
+    assert not [step for step in plan if step.startswith("SCAN") and "INDEX" not in step], plan
+
+def test_search_query_matches_gin_index_expression(db):
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.schema import CreateIndex
+    from app.models.task import Task
+    from app.services.task_service import TaskService
+    index = next(index for index in Task.__table__.indexes if index.name == "ix_tasks_search")
+    ddl = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+    assert "USING gin" in ddl
+    expression = ddl[ddl.index("(") + 1:ddl.rindex(")")]
+
+    from types import SimpleNamespace
+    postgres_session = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=postgresql.dialect()))
+    condition = TaskService.search_condition(postgres_session, "login form")
+    sql = str(condition.compile(dialect=postgresql.dialect())).replace("tasks.", "")
+    # Postgres only uses an expression index for the very same expression
+    assert sql.startswith(expression + " @@ plainto_tsquery('simple'::regconfig")
+
+def test_concurrent_requests_use_separate_async_sessions(db):
+    import asyncio
+    import httpx
+    seed_tasks(db, 5)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://tasks") as async_client:
+            reads = [async_client.get(f"/tasks/{task_id}") for task_id in range(1, 6)] * 4
+            writes = [
+                async_client.post(f"/tasks/{task_id}/comments", json={"text": f"note {task_id}"})
+                for task_id in range(1, 6)
+            ]
+            return await asyncio.gather(*reads, *writes)
+
+    responses = asyncio.run(run())
+    assert all(response.status_code == 200 for response in responses)
+    assert [response.json()["id"] for response in responses[:5]] == [1, 2, 3, 4, 5]
+    assert [len(client.get(f"/tasks/{task_id}/comments").json()) for task_id in range(1, 6)] == [1] * 5
+
+def test_comment_author_name_comes_from_user_replica(db):
+    from app.models.user import UserReplica
+    seed_tasks(db, 1)
+    db.add(UserReplica(id=1, full_name="Ann Smith", role="worker", is_active=True, is_deleted=False))
+    db.commit()
+
+    response = client.post("/tasks/1/comments", json={"text": "done", "full_name": "Someone Else"})
+    assert response.status_code == 200
+    assert response.json()["full_name"] == "Ann Smith"
+
+    # Users the replica does not know keep the name sent by the client
+    response = client.post("/tasks/1/comments?user_id=2", json={"text": "ok", "full_name": "Bob"})
+    assert response.json()["full_name"] == "Bob"
+
+def test_bulk_operations_in_one_request(db):
+    from app.models.outbox import OutboxEvent
+    from app.models.task import History, Task, TaskStatus, task_workers
+    seed_tasks(db, 4)
+
+    response = client.post("/tasks/bulk", json={"operations": [
+        {"action": "create", "tasks": [
+            {"title": "Bulk A", "description": "", "worker_ids": [7]},
+            {"title": "Bulk B", "description": "", "priority": "high"},
+        ]},
+        {"action": "status", "task_ids": [1, 2, 999], "status": "completed"},
+        {"action": "update", "task_ids": [3], "priority": "critical", "title": "Renamed"},
+        {"action": "assign", "task_ids": [1, 3], "worker_ids": [5, 6]},
+        {"action": "delete", "task_ids": [4, 4]},
+    ]})
+    assert response.status_code == 200
+    data = response.json()
+    assert [(r["operation"], r["task_id"], r["result"]) for r in data["results"]] == [
+        (0, 5, "created"), (0, 6, "created"),
+        (1, 1, "updated"), (1, 2, "updated"), (1, 999, "not_found"),
+        (2, 3, "updated"),
+        (3, 1, "updated"), (3, 3, "updated"),
+        (4, 4, "deleted"),
+    ]
+    assert (data["succeeded"], data["failed"]) == (8, 1)
+
+    db.expire_all()
+    tasks = {task.id: task for task in db.query(Task)}
+    assert 4 not in tasks and db.query(History).filter(History.task_id == 4).count() == 0
+    assert [tasks[1].status, tasks[2].status] == [TaskStatus.COMPLETED] * 2
+    assert (tasks[3].title, tasks[3].priority.value) == ("Renamed", "critical")
+    workers = sorted(db.execute(task_workers.select()).all())
+    assert [row for row in workers if row[0] in (1, 3, 5)] == [(1, 5), (1, 6), (3, 5), (3, 6), (5, 7)]
+    assert db.query(History).filter(History.event_type == "STATUS_CHANGED").count() == 2
+
+    # Two TASK_CREATED, then one TASK_UPDATED per changed task, committed with the changes
+    events = db.query(OutboxEvent).order_by(OutboxEvent.id).all()
+    assert [(e.event_type, e.aggregate_id) for e in events] == [
+        ("task.created", "5"), ("task.created", "6"),
+        ("task.updated", "1"), ("task.updated", "2"), ("task.updated", "3"),
+    ]
+    assert json.loads(events[4].data)["title"] == "Renamed"
+
+def test_bulk_statement_count_does_not_grow_with_items(db):
+    seed_tasks(db, 40)
+
+    def run(task_ids):
+        response = client.post("/tasks/bulk", json={"operations": [
+            {"action": "update", "task_ids": task_ids, "status": "in_progress", "priority": "low"},
+            {"action": "assign", "task_ids": task_ids, "worker_ids": [1, 2]},
+        ]})
+        assert response.status_code == 200
+
+    few = count_queries(lambda: run([1, 2]))
+    many = count_queries(lambda: run(list(range(3, 41))))
+    assert few == many
+
+def test_bulk_rejects_invalid_operations(db):
+    assert client.post("/tasks/bulk", json={"operations": [{"action": "status", "task_ids": [1]}]}).status_code == 422
+    assert client.post("/tasks/bulk", json={"operations": [{"action": "create"}]}).status_code == 422
+    assert client.post("/tasks/bulk", json={"operations": [
+        {"action": "delete", "task_ids": list(range(1001))}
+    ]}).status_code == 422
+
+def race_bulk_update(monkeypatch, write):
+    """Run write(session) in another request's transaction between bulk()'s state read and its UPDATE"""
+    from app.services.task_service import TaskService
+    bulk_update = TaskService._bulk_update
+
+    async def racing_update(*args, **kwargs):
+        async with TestingAsyncSessionLocal() as other:
+            await write(other)
+        monkeypatch.setattr(TaskService, "_bulk_update", staticmethod(bulk_update))
+        return await bulk_update(*args, **kwargs)
+
+    monkeypatch.setattr(TaskService, "_bulk_update", staticmethod(racing_update))
+
+def reconcile_counters():
+    import asyncio
+    from app.services.task_counters import TaskCounters
+
+    async def run():
+        async with TestingAsyncSessionLocal() as session:
+            return await TaskCounters.reconcile(session, fix=False)
+    return asyncio.run(run())
+
+def test_bulk_update_skips_tasks_changed_since_the_state_read(db, monkeypatch):
+    from app.models.task import History
+    from app.services.task_service import TaskService
+    first = client.post("/tasks", json={"title": "A", "description": "", "worker_ids": [1]}).json()["id"]
+    second = client.post("/tasks", json={"title": "B", "description": "", "worker_ids": [2]}).json()["id"]
+    race_bulk_update(monkeypatch, lambda other: TaskService.approve_task(other, first, admin_id=9))
+
+    response = client.post("/tasks/bulk", json={"operations": [
+        {"action": "status", "task_ids": [first, second], "status": "rework"},
+    ]})
+    assert [(r["task_id"], r["result"]) for r in response.json()["results"]] == [
+        (first, "conflict"), (second, "updated")
+    ]
+    assert (response.json()["succeeded"], response.json()["failed"]) == (1, 1)
+
+    # The approval is kept, and no history row claims the bulk moved the task away from "new"
+    assert client.get(f"/tasks/{first}").json()["status"] == "completed"
+    db.expire_all()
+    changed = db.query(History).filter(History.event_type == "STATUS_CHANGED").all()
+    assert [(row.task_id, row.details["from"], row.details["to"]) for row in changed] == [(second, "new", "rework")]
+    assert client.get("/tasks/stats").json()["by_status"] == {"new": 0, "in_progress": 0, "completed": 1, "rework": 1}
+    assert reconcile_counters() == []
+
+def test_task_events_are_committed_to_the_outbox(db):
+    from app.models.outbox import OutboxEvent
+    task_id = client.post("/tasks", json={"title": "Outboxed", "description": "", "worker_ids": []}).json()["id"]
+    client.put(f"/tasks/{task_id}", json={"status": "in_progress"})
+    client.post(f"/tasks/{task_id}/mark-completed?user_id=3")
+    client.post(f"/tasks/{task_id}/mark-completed?user_id=3")  # already completed, no new event
+
+    events = db.query(OutboxEvent).order_by(OutboxEvent.id).all()
+    assert [e.event_type for e in events] == ["task.created", "task.updated", "task.completed"]
+    assert json.loads(events[1].data)["status"] == "in_progress"
+    assert json.loads(events[2].data) == {"task_id": task_id, "worker_id": 3}
+
+# Statements per endpoint (SQLite, task 1 seeded with workers 10/20 and a completion by 10).
+# A detail response costs 5 SELECTs (task, workers, comments, history, completions);
+# writes must not read the task back after the commit. Writes that change the status
+# or the workers add one task_counters upsert; worker changes also UPDATE the task row
+# so that its version moves.
+QUERY_BUDGETS = [
+    ("post", "/tasks", {"title": "New", "description": "", "worker_ids": []}, 4),
+    ("get", "/tasks/1", None, 5),
+    ("put", "/tasks/1", {"status": "in_progress"}, 9),
+    ("post", "/tasks/1/comments", {"text": "hi"}, 3),
+    ("post", "/tasks/1/mark-completed?user_id=20", None, 4),
+    ("post", "/tasks/1/complete?user_id=20", None, 3),
+    ("post", "/tasks/1/approve", None, 8),
+    ("post", "/tasks/1/return-rework", None, 9),
+    ("post", "/tasks/1/rework", None, 9),
+    ("post", "/tasks/1/add-worker/30", None, 9),
+    ("post", "/tasks/1/remove-worker/10", None, 9),
+    ("post", "/tasks/1/assign?worker_id=30", None, 8),
+    ("post", "/tasks/1/unassign?worker_id=10", None, 8),
+    ("get", "/tasks/1/workers", None, 1),
+    ("get", "/tasks/stats", None, 1),
+    ("delete", "/tasks/1", None, 6),
+]
+
+@pytest.mark.parametrize("method,url,body,budget", QUERY_BUDGETS, ids=[f"{m} {u}" for m, u, _, _ in QUERY_BUDGETS])
+def test_endpoint_query_budget(db, method, url, body, budget):
+    seed_tasks(db, 1)
+    response = None
+
+    def call():
+        nonlocal response
+        response = client.request(method, url, **({"json": body} if body is not None else {}))
+
+    assert count_queries(call) <= budget
+    assert response.status_code < 300
+
+def test_write_responses_are_current_without_reading_back(db):
+    seed_tasks(db, 1)
+    created = client.post("/tasks", json={"title": "Fresh", "description": "", "worker_ids": [7]}).json()
+    assert created["created_at"] and created["updated_at"]
+    assert [h["event_type"] for h in created["history"]] == ["created"]
+    assert client.get(f"/tasks/{created['id']}/workers").json() == [7]
+
+    approved = client.post("/tasks/1/approve").json()
+    assert approved["status"] == "completed"
+    assert approved["history"][-1]["event_type"] == "approved"
+    assert approved["history"][-1]["created_at"] is not None
+
+    reworked = client.post("/tasks/1/rework").json()
+    assert reworked["status"] == "rework" and reworked["worker_completions"] == []
+    assert reworked == client.get("/tasks/1").json()
+
+    # assign used to append to a copy of the worker list and changed nothing
+    client.post("/tasks/1/assign?worker_id=30")
+    assert client.get("/tasks/1/workers").json() == [10, 20, 30]
+
+    completion = client.post("/tasks/1/complete?user_id=30").json()
+    assert completion["id"] and completion["completed_at"]
+    assert client.post("/tasks/1/complete?user_id=99").status_code == 403
+    assert client.post("/tasks/999/complete?user_id=30").status_code == 404
+
+def seed_history(db, task_id, count):
+    from datetime import datetime, timedelta
+    from app.models.task import History, HistoryEventType
+    start = datetime(2026, 1, 1)
+    # Pairs share a timestamp, so pages have to break ties on id
+    db.add_all(
+        History(task_id=task_id, event_type=HistoryEventType.STATUS_CHANGED, user_id=1,
+                details={"n": i}, created_at=start + timedelta(minutes=i // 2))
+        for i in range(count)
+    )
+    db.commit()
+
+def test_history_is_paginated_in_time_order(db):
+    seed_tasks(db, 2)
+    seed_history(db, 1, 7)
+    seed_history(db, 2, 3)
+
+    seen, cursor = [], None
+    while True:
+        response = client.get("/tasks/1/history", params={"limit": 3, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= 3
+        seen += [item["details"]["n"] for item in page]
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert seen == list(range(7))
+
+    newest = client.get("/tasks/1/history", params={"limit": 2, "order": "desc"})
+    assert [item["details"]["n"] for item in newest.json()] == [6, 5]
+    older = client.get("/tasks/1/history", params={"order": "desc", "cursor": newest.headers["x-next-cursor"]})
+    assert [item["details"]["n"] for item in older.json()] == [4, 3, 2, 1, 0]
+
+    # A cursor is bound to its order
+    assert client.get("/tasks/1/history", params={"cursor": newest.headers["x-next-cursor"]}).status_code == 400
+    assert client.get("/tasks/1/comments").json() == []
+    assert client.get("/tasks/999/history").status_code == 404
+    assert client.get("/tasks/999/comments").status_code == 404
+
+def test_timeline_export_streams_ndjson(db):
+    seed_tasks(db, 1)
+    seed_history(db, 1, 5)
+    client.post("/tasks/1/comments", json={"text": "first"})
+    client.post("/tasks/1/comments", json={"text": "second"})
+
+    response = client.get("/tasks/1/history/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["details"]["n"] for line in lines[:5]] == list(range(5))
+    assert [line["event_type"] for line in lines[5:]] == ["comment_added", "comment_added"]
+
+    comments = [json.loads(line) for line in client.get("/tasks/1/comments/export?order=desc").text.splitlines()]
+    assert [comment["text"] for comment in comments] == ["second", "first"]
+    assert client.get("/tasks/999/history/export").status_code == 404
+
+def test_requests_report_their_sql_statements(db):
+    from shared_db.profiling import reset_query_metrics
+    seed_tasks(db, 1)
+    reset_query_metrics()
+    response = None
+
+    def call():
+        nonlocal response
+        response = client.get("/tasks/1")
+
+    statements = count_queries(call)
+    timing = response.headers["server-timing"]
+    assert timing.startswith("db;dur=") and f'desc="{statements} queries"' in timing
+    get_task_cache().clear()  # read the task again rather than the cached body
+    client.get("/tasks/1")
+
+    routes = client.get("/metrics/queries").json()["routes"]
+    detail = routes["GET /tasks/{task_id}"]
+    assert detail["requests"] == 2
+    assert detail["queries"]["sum"] == 2 * statements
+    assert detail["queries"]["buckets"]["+Inf"] == 2
+
+def test_task_detail_is_cached_until_the_task_changes(db):
+    seed_tasks(db, 1)
+    first = client.get("/tasks/1").json()
+    assert count_queries(lambda: client.get("/tasks/1")) == 0
+    assert client.get("/tasks/2").status_code == 404
+    assert client.get("/tasks/2").status_code == 404  # not found is not cached
+
+    client.put("/tasks/1", json={"title": "Renamed"})
+    assert client.get("/tasks/1").json()["title"] == "Renamed"
+    client.post("/tasks/1/comments", json={"text": "note"})
+    detail = client.get("/tasks/1").json()
+    assert [comment["text"] for comment in detail["comments"]] == ["note"]
+    assert detail["updated_at"] == client.get("/tasks/1").json()["updated_at"]
+    assert detail["title"] != first["title"]
+
+    client.post("/tasks/bulk", json={"operations": [{"action": "delete", "task_ids": [1]}]})
+    assert client.get("/tasks/1").status_code == 404
+
+    stats = client.get("/metrics/task-cache").json()
+    assert stats["l1_hits"] == 2 and stats["misses"] == 6
+    assert stats["invalidations"] == 3
+    assert stats["hit_ratio"] == 0.25
+
+def test_history_analytics_aggregate_in_the_database(db):
+    seed_tasks(db, 2)
+    client.put("/tasks/1", json={"status": "in_progress"})
+    client.post("/tasks/1/approve")
+    client.post("/tasks/1/rework")
+    client.put("/tasks/2", json={"status": "in_progress"})
+
+    transitions = client.get("/tasks/analytics/history", params={
+        "group_by": "from_status,to_status", "event_type": ["status_changed", "approved", "returned"]
+    })
+    assert transitions.status_code == 200
+    assert {(row["from_status"], row["to_status"]): row["count"] for row in transitions.json()} == {
+        ("new", "in_progress"): 2,
+        ("in_progress", "completed"): 1,
+        ("completed", "rework"): 1,
+    }
+
+    reworked = client.get("/tasks/analytics/history", params={"group_by": "user_id,bucket", "to_status": "rework"})
+    [row] = reworked.json()
+    assert row["count"] == 1 and row["bucket"].endswith("T00:00:00") and row["event_type"] is None
+
+    by_type = {row["event_type"]: row["count"] for row in client.get("/tasks/analytics/history").json()}
+    assert by_type == {"status_changed": 2, "approved": 1, "returned": 1}
+    assert client.get("/tasks/analytics/history?group_by=title").status_code == 400
+
+    history = client.get("/tasks/1/history").json()
+    assert history[-1]["details"] == {"action": "task_returned_to_rework", "from": "completed", "to": "rework"}
+
+def test_time_spent_in_each_status(db):
+    from datetime import datetime
+    from app.models.task import History, HistoryEventType, Task
+    db.add(Task(id=1, title="Timed", created_by=1))
+    db.add_all([
+        History(task_id=1, event_type=HistoryEventType.CREATED, user_id=1, details={"title": "Timed"},
+                created_at=datetime(2026, 1, 1, 10, 0)),
+        History(task_id=1, event_type=HistoryEventType.STATUS_CHANGED, user_id=1,
+                details={"from": "new", "to": "in_progress"}, created_at=datetime(2026, 1, 1, 11, 0)),
+        History(task_id=1, event_type=HistoryEventType.COMMENT_ADDED, user_id=1,
+                details={"comment": "wip"}, created_at=datetime(2026, 1, 1, 11, 30)),
+        History(task_id=1, event_type=HistoryEventType.APPROVED, user_id=1,
+                details={"from": "in_progress", "to": "completed"}, created_at=datetime(2026, 1, 1, 14, 0)),
+        History(task_id=1, event_type=HistoryEventType.RETURNED, user_id=1,
+                details={"from": "completed", "to": "rework"}, created_at=datetime(2026, 1, 1, 14, 30)),
+        History(task_id=1, event_type=HistoryEventType.STATUS_CHANGED, user_id=1,
+                details={"from": "rework", "to": "in_progress"}, created_at=datetime(2026, 1, 1, 15, 0)),
+        History(task_id=1, event_type=HistoryEventType.APPROVED, user_id=1,
+                details={"from": "in_progress", "to": "completed"}, created_at=datetime(2026, 1, 1, 16, 0)),
+    ])
+    db.commit()
+
+    rows = {row["status"]: row for row in client.get("/tasks/analytics/status-durations?task_id=1").json()}
+    assert rows["new"]["total_seconds"] == pytest.approx(3600)
+    assert rows["in_progress"]["periods"] == 2
+    assert rows["in_progress"]["total_seconds"] == pytest.approx(4 * 3600)
+    assert rows["in_progress"]["avg_seconds"] == pytest.approx(2 * 3600)
+    assert rows["rework"]["total_seconds"] == pytest.approx(1800)
+    # Still completed: the open period runs until now
+    assert rows["completed"]["periods"] == 2 and rows["completed"]["total_seconds"] > 1800
+
+    late = client.get("/tasks/analytics/status-durations", params={"created_from": "2026-01-01T14:15:00"}).json()
+    assert [row["status"] for row in late] == ["completed", "in_progress", "rework"]
+
+def test_stats_follow_every_write_without_drift(db):
+    import asyncio
+    from app.services.task_counters import TaskCounters
+
+    def reconcile(fix=False):
+        async def run():
+            async with TestingAsyncSessionLocal() as session:
+                return await TaskCounters.reconcile(session, fix=fix)
+        return asyncio.run(run())
+
+    first = client.post("/tasks", json={"title": "A", "description": "", "worker_ids": [1, 2]}).json()["id"]
+    second = client.post("/tasks", json={"title": "B", "description": "", "worker_ids": [2]}).json()["id"]
+    third = client.post("/tasks", json={"title": "C", "description": ""}).json()["id"]
+    client.put(f"/tasks/{first}", json={"status": "in_progress", "worker_ids": [1, 3]})
+    client.post(f"/tasks/{second}/approve")
+    client.post(f"/tasks/{second}/rework")
+    client.post(f"/tasks/{second}/approve")
+    client.post(f"/tasks/{third}/add-worker/4")
+    client.post(f"/tasks/{third}/assign?worker_id=5")
+    client.post(f"/tasks/{third}/unassign?worker_id=4")
+    bulk = client.post("/tasks/bulk", json={"operations": [
+        {"action": "create", "tasks": [{"title": "D", "description": "", "worker_ids": [5]},
+                                       {"title": "E", "description": ""}]},
+        {"action": "status", "task_ids": [first], "status": "rework"},
+        {"action": "delete", "task_ids": [third]},
+    ]})
+    assert bulk.json()["failed"] == 0
+
+    stats = client.get("/tasks/stats").json()
+    assert stats == {
+        "total": 4,
+        "by_status": {"new": 2, "in_progress": 0, "completed": 1, "rework": 1},
+        "completion_ratio": 0.25,
+        "open_by_worker": {"1": 1, "3": 1, "5": 1},
+    }
+    assert reconcile() == []
+
+    client.delete(f"/tasks/{first}")
+    assert client.get("/tasks/stats").json()["open_by_worker"] == {"5": 1}
+    assert reconcile() == []
+
+def test_counters_stay_exact_when_a_bulk_update_races_a_single_write(db, monkeypatch):
+    from app.services.task_service import TaskService
+    first = client.post("/tasks", json={"title": "A", "description": "", "worker_ids": [1]}).json()["id"]
+    second = client.post("/tasks", json={"title": "B", "description": "", "worker_ids": [2]}).json()["id"]
+    race_bulk_update(monkeypatch, lambda other: TaskService.assign_worker(other, first, 3))
+
+    response = client.post("/tasks/bulk", json={"operations": [
+        {"action": "assign", "task_ids": [first, second], "worker_ids": [5]},
+    ]})
+    assert [result["result"] for result in response.json()["results"]] == ["conflict", "updated"]
+    assert sorted(client.get(f"/tasks/{first}/workers").json()) == [1, 3]
+    assert client.get("/tasks/stats").json()["open_by_worker"] == {"1": 1, "3": 1, "5": 1}
+    assert reconcile_counters() == []
+
+def test_reconciliation_reports_and_repairs_drift(db):
+    import asyncio
+    from app.services.task_counters import TaskCounters, initialize_task_counters
+
+    seed_tasks(db, 2)  # written behind TaskService's back
+    assert client.get("/tasks/stats").json()["total"] == 0
+    assert asyncio.run(initialize_task_counters(TestingAsyncSessionLocal)) == 5
+    assert client.get("/tasks/stats").json()["by_status"]["new"] == 2
+
+    db.execute(text("UPDATE task_counters SET value = 7 WHERE name = 'worker_open' AND key = '10'"))
+    db.commit()
+
+    async def run(fix):
+        async with TestingAsyncSessionLocal() as session:
+            return await TaskCounters.reconcile(session, fix=fix)
+
+    expected = [{"name": "worker_open", "key": "10", "stored": 7, "actual": 1}]
+    assert asyncio.run(run(fix=False)) == expected
+    assert asyncio.run(run(fix=True)) == expected
+    assert asyncio.run(run(fix=False)) == []
+    assert client.get("/tasks/stats").json()["open_by_worker"] == {"10": 1, "11": 1, "20": 1, "21": 1}
+
+def test_if_match_guards_updates_and_status_transitions(db):
+    seed_tasks(db, 1)
+    assert client.get("/tasks/1").headers["etag"] == '"1"'
+
+    updated = client.put("/tasks/1", json={"title": "Mine"}, headers={"If-Match": '"1"'})
+    assert updated.status_code == 200
+    assert updated.headers["etag"] == '"2"' and updated.json()["version"] == 2
+
+    # Someone who read version 1 would overwrite that change
+    stale = client.put("/tasks/1", json={"title": "Theirs"}, headers={"If-Match": '"1"'})
+    assert stale.status_code == 412 and stale.headers["etag"] == '"2"'
+    assert client.post("/tasks/1/return-rework", headers={"If-Match": '"1"'}).status_code == 412
+    assert client.get("/tasks/1").json()["title"] == "Mine"
+
+    # Weak (compressed by the gateway) and listed tags match as well
+    assert client.post("/tasks/1/approve", headers={"If-Match": 'W/"2"'}).headers["etag"] == '"3"'
+    reworked = client.post("/tasks/1/rework", headers={"If-Match": '"9", "3"'})
+    assert reworked.status_code == 200 and reworked.json()["status"] == "rework"
+    assert client.get("/tasks/1").headers["etag"] == '"4"'
+
+    # No precondition: the write applies to whatever is current
+    assert client.put("/tasks/1", json={"title": "Anyone"}).headers["etag"] == '"5"'
+    assert client.put("/tasks/1", json={"title": "Any"}, headers={"If-Match": "*"}).status_code == 200
+    # Worker changes and bulk updates move the version too
+    client.post("/tasks/1/add-worker/30")
+    client.post("/tasks/bulk", json={"operations": [{"action": "status", "task_ids": [1], "status": "in_progress"}]})
+    assert client.get("/tasks/1").json()["version"] == 8
+
+# TaskService write → its arguments after db, for a task 1 seeded with workers 10/20
+LOST_RACE_WRITES = {
+    "update": ("update_task", (1,), {"title": "Late"}),
+    "assign": ("assign_worker", (1, 30), {}),
+    "unassign": ("unassign_worker", (1, 10), {}),
+    "add-worker": ("add_worker_to_task", (1, 30, 1), {}),
+    "remove-worker": ("remove_worker_from_task", (1, 10, 1), {}),
+}
+
+@pytest.mark.parametrize("write", LOST_RACE_WRITES)
+def test_a_write_that_lost_the_race_is_rejected_without_locks(db, write):
+    import asyncio
+    from fastapi import HTTPException
+    from app.controllers.task_controller import versioned_write
+    from app.services.task_service import TaskService
+    seed_tasks(db, 1)
+    name, args, kwargs = LOST_RACE_WRITES[write]
+
+    async def race(expected):
+        async with TestingAsyncSessionLocal() as first, TestingAsyncSessionLocal() as second:
+            # Both requests read the task, the first one commits its change before the second writes
+            # (the reference keeps the second request's copy in its identity map)
+            read = await TaskService.load_task(second, 1)
+            assert read.version == 1 + (expected is not None)
+            await TaskService.approve_task(first, 1, admin_id=1)
+            with pytest.raises(HTTPException) as rejected:
+                await versioned_write(getattr(TaskService, name), 1, expected, second, *args, **kwargs)
+            return rejected.value.status_code
+
+    assert asyncio.run(race(None)) == 409
+    # The If-Match check passed on the version read, the UPDATE found a newer one
+    assert asyncio.run(race({2})) == 412
+    task = client.get("/tasks/1").json()
+    assert task["status"] == "completed" and task["title"] == "Task 0" and task["version"] == 3
+    assert client.get("/tasks/1/workers").json() == [10, 20]
+
+def test_worker_assignment_honours_if_match(db):
+    seed_tasks(db, 1)
+    assigned = client.post("/tasks/1/assign?worker_id=30", headers={"If-Match": '"1"'})
+    assert assigned.status_code == 200 and assigned.headers["etag"] == '"2"'
+    assert client.post("/tasks/1/unassign?worker_id=10", headers={"If-Match": '"1"'}).status_code == 412
+    assert client.post("/tasks/1/remove-worker/10", headers={"If-Match": '"2"'}).headers["etag"] == '"3"'
+    assert client.post("/tasks/1/add-worker/40", headers={"If-Match": '"2"'}).status_code == 412
+    assert client.post("/tasks/9/assign?worker_id=30").status_code == 404
+    assert client.get("/tasks/1/workers").json() == [20, 30]
@@ -0,0 +1,225 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.db.database import Base
+from app.services import user_validator
+from app.services.user_replica import UserReplicaService, UserReplicaSync, fetch_snapshot
+from app.services.user_validator import UserStatusCache, UserValidator
+from shared_events import Event, EventBus, EventType
+from shared_events import event_bus as event_bus_module
+
+
+class FakeEventBus:
+    """One consumer group over an in-memory log, with XREADGROUP pending/ack semantics"""
+
+    decode_message = staticmethod(EventBus.decode_message)
+
+    def __init__(self):
+        self.log = []
+        self.groups = {}
+        self.pending = []
+        self.dlq = []
+
+    def publish(self, event_type, user_id, data, timestamp):
+        self.log.append(EventBus._encode_event(Event(event_type, str(user_id), "user", data, timestamp)))
+
+    def ensure_group(self, event_types, group, start_id="$"):
+        if group in self.groups:
+            return False
+        self.groups[group] = len(self.log) if start_id == "$" else 0
+        return True
+
+    def read_group(self, event_types, group, consumer, count=100, block_ms=0, pending=False):
+        if pending:
+            return list(self.pending)
+        position = self.groups[group]
+        entries = [(f"events:{msg_data['type']}", str(position + i), msg_data)
+                   for i, msg_data in enumerate(self.log[position:position + count])]
+        self.groups[group] = position + len(entries)
+        self.pending.extend(entries)
+        return entries
+
+    def ack(self, group, entries):
+        acked = {msg_id for _, msg_id, _ in entries}
+        self.pending = [entry for entry in self.pending if entry[1] not in acked]
+
+    def dead_letter(self, msg_data, msg_id, error):
+        self.dlq.append(msg_id)
+
+
+class FakeStreams:
+    """The Redis stream commands EventBus.read_group/ack/dead_letter use"""
+
+    def __init__(self, pending):
+        self.pending = pending
+        self.acked = []
+        self.added = []
+
+    def ping(self):
+        return True
+
+    def xreadgroup(self, groupname, consumername, streams, count, block):
+        return [("events:user.updated", list(self.pending))]
+
+    def xack(self, stream, group, msg_id):
+        self.acked.append(msg_id)
+        self.pending = [entry for entry in self.pending if entry[0] != msg_id]
+
+    def xadd(self, stream, data):
+        self.added.append((stream, data))
+        return f"{len(self.added)}-0"
+
+
+class FakeAuthService:
+    def __init__(self, users):
+        self.users = users
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request.url.path)
+        if request.url.path == "/auth/users":
+            skip, limit = int(request.url.params["skip"]), int(request.url.params["limit"])
+            return httpx.Response(200, json=self.users[skip:skip + limit])
+        ids = json.loads(request.content)["ids"]
+        known = {user["id"]: user for user in self.users}
+        return httpx.Response(200, json={
+            "users": [known[user_id] for user_id in ids if user_id in known],
+            "missing": [user_id for user_id in ids if user_id not in known],
+        })
+
+
+def user(user_id, full_name, is_active=True, role="worker"):
+    return {"id": user_id, "full_name": full_name, "role": role, "is_active": is_active}
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/replica.db", poolclass=NullPool)
+
+    async def create():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create())
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+def auth_client(auth):
+    return httpx.AsyncClient(base_url="http://auth", transport=httpx.MockTransport(auth.handler))
+
+
+def replica_rows(sessions):
+    async def load():
+        async with sessions() as db:
+            users = await UserReplicaService.get_users(db, range(1, 10))
+            return {user_id: (u.full_name, u.is_active, u.is_deleted) for user_id, u in users.items()}
+    return asyncio.run(load())
+
+
+def test_snapshot_then_catch_up_after_downtime(sessions):
+    bus = FakeEventBus()
+    auth = FakeAuthService([user(1, "Ann"), user(2, "Bob"), user(3, "Cid", is_active=False)])
+
+    async def first_run():
+        sync = UserReplicaSync(bus, auth_client(auth), session_factory=sessions, consumer="tasks-1")
+        await sync.start()
+        # Delivered but not acknowledged when the process died
+        bus.publish(EventType.USER_UPDATED, 1, user(1, "Ann Smith"), "2026-01-01T10:00:00")
+        bus.read_group([], sync.group, sync.consumer)
+
+    asyncio.run(first_run())
+    assert replica_rows(sessions) == {1: ("Ann", True, False), 2: ("Bob", True, False), 3: ("Cid", False, False)}
+
+    # Published while tasks-service was down
+    bus.publish(EventType.USER_UPDATED, 2, user(2, "Bob", is_active=False), "2026-01-01T10:01:00")
+    bus.publish(EventType.USER_DELETED, 3, user(3, "Cid", is_active=False), "2026-01-01T10:02:00")
+    bus.publish(EventType.USER_CREATED, 4, user(4, "Dan"), "2026-01-01T10:03:00")
+
+    async def restart():
+        sync = UserReplicaSync(bus, auth_client(auth), session_factory=sessions, consumer="tasks-1")
+        await sync.start()
+        await sync.poll()
+        return sync
+
+    sync = asyncio.run(restart())
+    assert auth.requests == ["/auth/users"]  # the snapshot is taken once
+    assert bus.pending == []
+    assert sync.applied == 4
+    assert replica_rows(sessions) == {
+        1: ("Ann Smith", True, False),
+        2: ("Bob", False, False),
+        3: ("Cid", False, True),
+        4: ("Dan", True, False),
+    }
+
+
+def test_trimmed_and_malformed_entries_do_not_stall_the_group(sessions, monkeypatch):
+    good = EventBus._encode_event(Event(EventType.USER_UPDATED, "1", "user", user(1, "Ann"), "2026-01-01T10:00:00"))
+    bad = {**good, "data": "{not json"}
+    streams = FakeStreams([("1-0", {}), ("2-0", bad), ("3-0", good)])
+    monkeypatch.setattr(event_bus_module.redis, "from_url", lambda url, **kwargs: streams)
+    bus = EventBus("redis://fake")
+
+    async def scenario():
+        sync = UserReplicaSync(bus, auth_client(FakeAuthService([])), session_factory=sessions, consumer="tasks-1")
+        return sync, await sync.poll(pending=True), await sync.poll(pending=True)
+
+    sync, first, second = asyncio.run(scenario())
+    assert (first, second) == (2, 0)
+    assert streams.pending == [] and sorted(streams.acked) == ["1-0", "2-0", "3-0"]
+    assert [(stream, data["original_id"]) for stream, data in streams.added] == [("event_dlq", "2-0")]
+    assert (sync.applied, sync.skipped) == (1, 1)
+    assert replica_rows(sessions) == {1: ("Ann", True, False)}
+
+
+def test_out_of_order_events_do_not_overwrite_newer_state(sessions):
+    async def apply(*events):
+        async with sessions() as db:
+            results = [await UserReplicaService.apply_event(db, Event(*event)) for event in events]
+            await db.commit()
+            return results
+
+    updated = (EventType.USER_UPDATED, "5", "user", user(5, "Eve Adams"), "2026-01-01T10:05:00")
+    created = (EventType.USER_CREATED, "5", "user", user(5, "Eve"), "2026-01-01T10:00:00")
+    deleted = (EventType.USER_DELETED, "6", "user", user(6, "Fay"), "2026-01-01T10:00:00")
+    late_update = (EventType.USER_UPDATED, "6", "user", user(6, "Fay"), "2026-01-01T10:10:00")
+
+    assert asyncio.run(apply(updated, created, deleted, late_update)) == [True, False, True, False]
+    assert replica_rows(sessions) == {5: ("Eve Adams", True, False), 6: (None, True, True)}
+
+
+def test_snapshot_is_read_page_by_page():
+    auth = FakeAuthService([user(i, f"User {i}") for i in range(1, 6)])
+    users = asyncio.run(fetch_snapshot(auth_client(auth), page_size=2))
+    assert [u["id"] for u in users] == [1, 2, 3, 4, 5]
+    assert len(auth.requests) == 3
+
+
+def test_validation_is_answered_by_the_replica(sessions, monkeypatch):
+    auth = FakeAuthService([user(7, "Gus")])
+    monkeypatch.setattr(user_validator, "_auth_client", auth_client(auth))
+    monkeypatch.setattr(user_validator, "_status_cache", UserStatusCache(ttl=60))
+
+    async def scenario():
+        async with sessions() as db:
+            await UserReplicaService.apply_snapshot(db, [user(1, "Ann"), user(3, "Cid", is_active=False)])
+            await db.commit()
+            return [
+                await UserValidator.validate_active_users([1], db),
+                await UserValidator.validate_active_users([1, 3], db),
+                await UserValidator.validate_active_users([1, 7], db),
+            ]
+
+    assert asyncio.run(scenario()) == [
+        (True, None),
+        (False, "Worker Cid is inactive and cannot be assigned to tasks"),
+        (True, None),
+    ]
+    # Only the id the replica does not know yet went to auth-service
+    assert auth.requests == ["/auth/users/lookup"]
@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.services import user_validator
+from app.services.user_validator import UserStatusCache, UserValidator
+
+USERS = {
+    1: {"id": 1, "full_name": "Ann", "is_active": True},
+    2: {"id": 2, "full_name": "Bob", "is_active": True},
+    3: {"id": 3, "full_name": "Cid", "is_active": False},
+}
+
+
+class FakeAuthService:
+    def __init__(self):
+        self.lookups = []
+        self.down = False
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        if self.down:
+            raise httpx.ConnectError("auth-service unreachable", request=request)
+        assert request.url.path == "/auth/users/lookup"
+        ids = json.loads(request.content)["ids"]
+        self.lookups.append(ids)
+        return httpx.Response(200, json={
+            "users": [USERS[user_id] for user_id in ids if user_id in USERS],
+            "missing": [user_id for user_id in ids if user_id not in USERS],
+        })
+
+
+@pytest.fixture
+def auth(monkeypatch):
+    fake = FakeAuthService()
+    client = httpx.AsyncClient(base_url="http://auth", transport=httpx.MockTransport(fake.handler))
+    monkeypatch.setattr(user_validator, "_auth_client", client)
+    monkeypatch.setattr(user_validator, "_status_cache", UserStatusCache(ttl=60))
+    yield fake
+
+
+def validate(worker_ids):
+    return asyncio.run(UserValidator.validate_active_users(worker_ids))
+
+
+def test_all_workers_are_checked_in_one_lookup(auth):
+    assert validate([1, 2, 1]) == (True, None)
+    assert auth.lookups == [[1, 2]]
+
+
+def test_inactive_and_missing_workers_are_rejected(auth):
+    assert validate([1, 3]) == (False, "Worker Cid is inactive and cannot be assigned to tasks")
+    assert validate([2, 99]) == (False, "Worker with ID 99 not found")
+
+
+def test_statuses_are_cached_until_a_user_event(auth):
+    from shared_events import Event, EventType
+    validate([1, 2])
+    validate([2, 1])
+    assert auth.lookups == [[1, 2]]
+
+    UserValidator.handle_user_event(Event(EventType.USER_UPDATED, "2", "user", {"user_id": 2}))
+    validate([1, 2])
+    assert auth.lookups == [[1, 2], [2]]
+    assert user_validator.get_user_status_cache().get_stats()["invalidations"] == 1
+
+
+def test_cache_entries_expire():
+    now = [0.0]
+    cache = UserStatusCache(ttl=10, clock=lambda: now[0])
+    cache.put_many([USERS[1]])
+    assert cache.get_many([1, 2]) == ({1: USERS[1]}, [2])
+    now[0] = 11
+    assert cache.get_many([1]) == ({}, [1])
+
+
+def test_auth_service_outage_does_not_block_assignment(auth):
+    auth.down = True
+    assert validate([1, 2]) == (True, None)